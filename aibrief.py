@@ -453,68 +453,33 @@ from openpyxl import load_workbook
 
 
 from google_oauth import *
+from google_sheets import read_google_grid
 
 # don't be confused, googlelogin param is just userlogin param passed to identify which google token to use
 # this var name is misleading and i need to fix it.
 def read_google_rows(googlelogin, spreadsheet_url_or_id, sheet_name=None):
     """
-    Reads all rows from a Google Sheet, returns as list of lists.
+    Reads the used range of a Google Sheet tab, returns as list of lists.
     sheet_name: name of the sheet; defaults to first sheet if None.
     """
-    # Extract spreadsheet ID if URL is given
-    match = re.search(r"/spreadsheets/d/([a-zA-Z0-9-_]+)", spreadsheet_url_or_id)
-    spreadsheet_id = match.group(1) if match else spreadsheet_url_or_id.strip()
-
-    # Load user's saved credentials
-    creds = load_google_token(googlelogin)
-    if not creds or not creds.valid:
-        raise Exception(f"❌ User {googlelogin} not logged in to Google Drive")
-
-    service = build("sheets", "v4", credentials=creds)
-
-    # If no sheet_name provided, get the first sheet
-    if sheet_name is None:
-        metadata = service.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
-        sheet_name = metadata["sheets"][0]["properties"]["title"]
-
-    print(f"Reading Google Sheet ID={spreadsheet_id}, sheet='{sheet_name}' for user={googlelogin}")
-    result = service.spreadsheets().values().get(
-        spreadsheetId=spreadsheet_id,
-        range=sheet_name
-    ).execute()
-
-    return result.get("values", [])
+    return read_google_grid(googlelogin, spreadsheet_url_or_id, sheet_name).rows
 
 
 def read_google_sheet_as_openpyxl(spreadsheet_url_or_id, sheet_name, userlogin="default"):
     """
-    Read a Google Sheet and return an openpyxl-compatible worksheet object.
-    Uses existing read_google_rows() function for authentication and data retrieval.
-    
+    Read a Google Sheet tab and return a worksheet-like SheetGrid (see google_sheets.py).
+    It supports the parts of the openpyxl Worksheet API used here (iter_rows, cell,
+    .value/.row/.column/.coordinate) without building a Workbook cell by cell.
+
     Args:
         spreadsheet_url_or_id: Google Sheet ID or full URL
         sheet_name: Name of the worksheet/tab
-        userlogin: Google credentials identifier (passed to read_google_rows)
-    
+        userlogin: Google credentials identifier
+
     Returns:
-        openpyxl Worksheet object
+        SheetGrid
     """
-    from openpyxl import Workbook
-    
-    # Use your existing function to get the data
-    all_values = read_google_rows(userlogin, spreadsheet_url_or_id, sheet_name)
-    
-    # Create openpyxl workbook and worksheet
-    wb = Workbook()
-    ws = wb.active
-    ws.title = sheet_name
-    
-    # Populate the worksheet with data from Google Sheets
-    for row_idx, row_data in enumerate(all_values, start=1):
-        for col_idx, value in enumerate(row_data, start=1):
-            ws.cell(row=row_idx, column=col_idx, value=value)
-    
-    return ws
+    return read_google_grid(userlogin, spreadsheet_url_or_id, sheet_name)
 
 
 
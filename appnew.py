@@ -8,6 +8,7 @@ import shutil
 import requests
 import msal
 import uuid
+from msal_cache import get_token_cache, get_msal_app, has_token_cache, clear_token_cache
 from pathlib import Path
 from dotenv import load_dotenv, set_key 
 from flask import flash
@@ -29,6 +30,7 @@ os.environ['OAUTHLIB_RELAX_TOKEN_SCOPE'] = '1'  # Allow Google to return a super
 from flask_cors import CORS
 
 from vector_worker import resync_task_worker, process_url
+from vector_index import remove_document
 
 app = Flask(__name__)
 # Allow requests from your frontend domain
@@ -209,10 +211,6 @@ AUTHORITY = f"https://login.microsoftonline.com/{TENANT_ID}"
 REDIRECT_PATH = "/getAToken"
 REDIRECT_URI = f"https://demo.cloudcurio.com{REDIRECT_PATH}"  # overwritten after args parsed below
 
-# default token cache file used when private client auth flow. 
-# file name is overwritten later if using delegated auth flow.
-TOKEN_CACHE_FILE = "./config/token_cache.json"
-
 print (f"CLIENT_ID = {CLIENT_ID}")
 print (f"CLIENT_SECRET = {CLIENT_SECRET}")
 print (f"TENANT_ID = {TENANT_ID}")
@@ -222,36 +220,13 @@ print (f"AUTHORITY = {AUTHORITY}")
 
 
 def load_cache(userlogin=None):
-    global TOKEN_CACHE_FILE
-
-    cache = msal.SerializableTokenCache()
-
-    if userlogin:
-        TOKEN_CACHE_FILE = user_config_file(userlogin, "token_cache.json")
-    else:
-        TOKEN_CACHE_FILE = "./config/token_cache.json"
-    
-    if os.path.exists(TOKEN_CACHE_FILE):
-        print(f"Loading token cache from file={TOKEN_CACHE_FILE}")
-        cache.deserialize(open(TOKEN_CACHE_FILE, "r").read())
-    else:
-        print(f"load_cache could not find token file {TOKEN_CACHE_FILE}")
-
-    return cache
+    # token caches live in Redis (see msal_cache.py); the per-user token_cache.json
+    # files are only read once to migrate them.
+    return get_token_cache(userlogin)
     
 
 def save_cache(cache, userlogin=None):
-    #global TOKEN_CACHE_FILE
-    if cache.has_state_changed:
-
-        if userlogin:
-            TOKEN_CACHE_FILE = user_config_file(userlogin, "token_cache.json")
-        else:
-            TOKEN_CACHE_FILE = "./config/token_cache.json"
-
-        print(f"Saving token cache to file={TOKEN_CACHE_FILE}")
-        with open(TOKEN_CACHE_FILE, "w") as f:
-            f.write(cache.serialize())
+    cache.save()
 
 
 from urllib.parse import urlparse, quote, unquote
@@ -342,28 +317,14 @@ def get_delegated_token_for_user(userlogin: str) -> str:
 
 
 # for user delegated (saas appnew)
+# Apps are long-lived and shared per process so Azure AD discovery is not repeated
+# on every call (see msal_cache.py).
 def _build_msal_app(cache=None):
-    print("called _build_msal_app()")
-    print(f"AUTHORITY={AUTHORITY}")
-    print(f"CLIENT_ID={CLIENT_ID}")
-    return msal.ConfidentialClientApplication(
-        CLIENT_ID,
-        authority=AUTHORITY,
-        client_credential=CLIENT_SECRET,
-        token_cache=cache
-    )
+    return get_msal_app(CLIENT_ID, CLIENT_SECRET, AUTHORITY, cache)
 
 # client auth (on-prem appnew)
 def build_msal_app(cache=None):
-    print("called build_msap_app()")
-    print(f"AUTHORITY={AUTHORITY}")
-    print(f"CLIENT_ID={CLIENT_ID}")
-    return msal.ConfidentialClientApplication(
-        CLIENT_ID,
-        authority=AUTHORITY,
-        client_credential=CLIENT_SECRET,
-        token_cache=cache
-    )
+    return get_msal_app(CLIENT_ID, CLIENT_SECRET, AUTHORITY, cache)
 
 
 # -------------------------------
@@ -613,6 +574,7 @@ def prune_orphaned_docs(userlogin, removed_source_url):
     for url in orphaned_urls:
         safe_url = url.replace("/", "_").replace(":", "_")
         vector_dir = f"./config/{userlogin}/vectors/{safe_url}"
+        remove_document(f"./config/{userlogin}/vectors", url)
         if os.path.exists(vector_dir):
             shutil.rmtree(vector_dir)
             print(f"prune_orphaned_docs: deleted vector dir {vector_dir}")
@@ -758,6 +720,7 @@ from google_oauth_appnew import (
 )
 
 from googleapiclient.discovery import build
+from google_services import get_google_service
 
 @app.route("/auth/google")
 def auth_google():
@@ -1465,10 +1428,7 @@ def index():
     if (delegated_auth):
         print ("/ route is using delegated_auth flow")
         # Skip MSAL entirely if the user has no Azure token cache (e.g. Google-only users).
-        # _build_msal_app() hits the Azure AD discovery endpoint on every call, so avoid
-        # it when there is nothing to refresh.
-        _token_cache_path = user_config_file(userlogin, "token_cache.json")
-        if not os.path.exists(_token_cache_path):
+        if not has_token_cache(userlogin):
             print(f"No Azure token cache found for {userlogin}, skipping MSAL token refresh")
             session["is_logged_in"] = False
         else:
@@ -1757,14 +1717,11 @@ def logout_sharepoint():
     userlogin = current_user.username
     print("recvd /logout_sharepoint endpoint called")
     #if session['logged_in'] == True:
-    token_file = user_config_file(userlogin, "token_cache.json")
-    print(f"Revoking sharepoint access token for user={userlogin} token_file={token_file}")
-
-    if os.path.exists(token_file):
-        os.remove(token_file)
-        print(f"Deleted token file: {token_file}")
+    print(f"Revoking sharepoint access token for user={userlogin}")
+    if has_token_cache(userlogin):
+        clear_token_cache(userlogin)
     else:
-        print(f"No token file {token_file} found for user={userlogin}")
+        print(f"No token cache found for user={userlogin}")
     session["is_logged_in"] = False
   
     # Microsoft logout endpoint (kills AAD session cookies)
@@ -2773,6 +2730,7 @@ def remove_docslist():
             # Delete the vector directory for this URL
             safe_url = to_remove.replace("/", "_").replace(":", "_")
             vector_dir = f"./config/{userlogin}/vectors/{safe_url}"
+            remove_document(f"./config/{userlogin}/vectors", to_remove)
             if os.path.exists(vector_dir):
                 shutil.rmtree(vector_dir)
                 print(f"Deleted vector directory: {vector_dir}")
@@ -2874,7 +2832,7 @@ def sync_teams():
     for partition_info in stats.get("updated_partitions", {}).values():
         filepath = partition_info.get("filepath")
         if filepath:
-            task = embed_local_file.delay(userlogin, filepath)
+            task = embed_local_file.delay(userlogin, filepath, partition_info.get("appended_from"))
             redis_client.sadd(f"celery:tasks:{userlogin}", task.id)
             redis_client.expire(f"celery:tasks:{userlogin}", 3600)
             task_ids.append(task.id)
@@ -2956,7 +2914,7 @@ def teams_sync_scheduled():
     for partition_info in stats.get("updated_partitions", {}).values():
         filepath = partition_info.get("filepath")
         if filepath:
-            task = embed_local_file.delay(userlogin, filepath)
+            task = embed_local_file.delay(userlogin, filepath, partition_info.get("appended_from"))
             redis_client.sadd(f"celery:tasks:{userlogin}", task.id)
             redis_client.expire(f"celery:tasks:{userlogin}", 3600)
 
@@ -3354,10 +3312,8 @@ def touch_file(data):
         print(f"touch_file error: missing fileid")
         return jsonify({"error": "Missing fileId"}), 400
 
-    creds = load_google_token(userlogin)
-    service = build("drive", "v3", credentials=creds)
-
     try:
+        service = get_google_service(userlogin, "drive", "v3")
         # Perform a harmless request — get file metadata
         metadata = service.files().get(fileId=file_id, fields="id, name, mimeType").execute()
 
@@ -0,0 +1,104 @@
+# chunk_signatures.py
+"""
+MinHash signatures of chunk texts, for near-duplicate removal at query time.
+
+vector_worker writes one signature per chunk to signatures.npy next to
+chunks.bin when a document is vectorized.  A signature is SIG_PERMUTATIONS
+minimum hashes of the chunk's lower-cased word set, so the fraction of equal
+positions between two signatures estimates the Jaccard similarity of their word
+sets (what _jaccard_similarity in vector_rag_retriever used to compute by
+re-tokenizing both texts for every pair).
+
+dedup_indices() buckets the signatures with LSH banding and compares only the
+pairs that share a band, so removing duplicates from n results is close to
+linear instead of n x n text comparisons.
+"""
+import os
+import hashlib
+
+import numpy as np
+
+SIGNATURES_FILE = "signatures.npy"
+SIG_PERMUTATIONS = 64
+SIG_BANDS = 16          # 16 bands x 4 rows: pairs above ~0.5 Jaccard are compared
+
+_MASK32 = np.uint64(0xFFFFFFFF)
+_rng = np.random.default_rng(0x5EED)   # fixed seed: signatures must match across processes
+_A = _rng.integers(1, 2**63, SIG_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2**63, SIG_PERMUTATIONS, dtype=np.uint64)
+
+
+def _word_hashes(text):
+    words = set(text.lower().split())
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(w.encode("utf-8"), digest_size=8).digest(), "little") for w in words),
+        dtype=np.uint64, count=len(words))
+
+
+def minhash_signature(text):
+    """uint32[SIG_PERMUTATIONS] MinHash of the text's lower-cased word set."""
+    hashes = _word_hashes(text)
+    if hashes.size == 0:
+        # no words: every position at the maximum hash
+        return np.full(SIG_PERMUTATIONS, 0xFFFFFFFF, dtype=np.uint32)
+    # (a*x + b) mod 2^64, keeping the high 32 bits, as the permutation family
+    with np.errstate(over="ignore"):
+        permuted = (hashes[:, None] * _A[None, :] + _B[None, :]) >> np.uint64(32)
+    return (permuted.min(axis=0) & _MASK32).astype(np.uint32)
+
+
+def minhash_signatures(chunks):
+    """Signatures for a list of chunk texts, shape (len(chunks), SIG_PERMUTATIONS)."""
+    signatures = np.empty((len(chunks), SIG_PERMUTATIONS), dtype=np.uint32)
+    for i, chunk in enumerate(chunks):
+        signatures[i] = minhash_signature(chunk)
+    return signatures
+
+
+def save_signatures(doc_dir, signatures):
+    path = os.path.join(doc_dir, SIGNATURES_FILE)
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, np.ascontiguousarray(signatures, dtype=np.uint32))
+    os.replace(path + ".tmp", path)
+
+
+def load_signatures(doc_dir):
+    """The document's signatures (memory-mapped), or None for stores written before them."""
+    path = os.path.join(doc_dir, SIGNATURES_FILE)
+    if not os.path.exists(path):
+        return None
+    return np.load(path, mmap_mode="r")
+
+
+def estimated_similarity(sig1, sig2):
+    """Estimated Jaccard similarity of the two word sets."""
+    return float(np.count_nonzero(sig1 == sig2)) / SIG_PERMUTATIONS
+
+
+def dedup_indices(signatures, similarity_threshold=0.85):
+    """
+    Indices of the signatures to keep, in order: a signature is dropped when its
+    estimated similarity to an earlier kept one is >= similarity_threshold.
+    Returns (kept indices, [(dropped index, kept index it duplicates, similarity)]).
+    """
+    rows = SIG_PERMUTATIONS // SIG_BANDS
+    buckets = {}
+    kept, dropped = [], []
+    for i, sig in enumerate(signatures):
+        keys = [(b, sig[b * rows:(b + 1) * rows].tobytes()) for b in range(SIG_BANDS)]
+        candidates = set()
+        for key in keys:
+            candidates.update(buckets.get(key, ()))
+        duplicate = None
+        for j in sorted(candidates):
+            similarity = estimated_similarity(sig, signatures[j])
+            if similarity >= similarity_threshold:
+                duplicate = (i, j, similarity)
+                break
+        if duplicate:
+            dropped.append(duplicate)
+            continue
+        kept.append(i)
+        for key in keys:
+            buckets.setdefault(key, []).append(i)
+    return kept, dropped
@@ -0,0 +1,113 @@
+# chunk_store.py
+"""
+Compact, memory-mapped store for a document's chunk texts (chunks.bin).
+
+Layout (little-endian):
+    header   32 bytes: magic b"CHNK", version u16, reserved u16, count u32,
+             blob length u64, 12 bytes padding
+    offsets  (count + 1) x u64, byte offsets of each chunk within the blob
+    blob     all chunk texts, UTF-8, back to back
+
+The retriever maps the file and decodes only the chunks it returns, so fetching
+the top-k texts is k slices instead of parsing every chunk of the document as
+chunks.json required.  Files are written to a temp name and swapped in with
+os.replace, so an open mapping keeps seeing the version it opened.
+"""
+import os
+import json
+import mmap
+import struct
+
+import numpy as np
+
+CHUNKS_FILE = "chunks.bin"
+LEGACY_CHUNKS_FILE = "chunks.json"
+CHUNK_IDS_FILE = "chunk_ids.json"
+
+_MAGIC = b"CHNK"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHHIQ12x")   # 32 bytes
+
+
+def write_chunks(path, chunks):
+    """Write chunk texts to path in the chunks.bin format (atomically)."""
+    encoded = [c.encode("utf-8") for c in chunks]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    offsets[1:] = np.cumsum([len(b) for b in encoded], dtype=np.uint64)
+    with open(path + ".tmp", "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, 0, len(encoded), int(offsets[-1])))
+        f.write(offsets.tobytes())
+        for b in encoded:
+            f.write(b)
+    os.replace(path + ".tmp", path)
+
+
+def write_chunk_ids(doc_dir, chunk_ids):
+    """Write the stable chunk ids (text_chunker.chunk_document), in chunk order."""
+    path = os.path.join(doc_dir, CHUNK_IDS_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(list(chunk_ids), f)
+    os.replace(path + ".tmp", path)
+
+
+def read_chunk_ids(doc_dir):
+    """The document's chunk ids, or None for stores written before them."""
+    path = os.path.join(doc_dir, CHUNK_IDS_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+class ChunkStore:
+    """Read-only, memory-mapped view of a chunks.bin file; behaves like a list of str."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count, blob_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"Not a chunk store (magic={magic!r}, version={version}): {path}")
+        self._count = count
+        self._offsets = np.frombuffer(self._mm, dtype="<u8", count=count + 1, offset=_HEADER.size)
+        self._blob_start = _HEADER.size + (count + 1) * 8
+        if self._blob_start + blob_len > len(self._mm):
+            raise ValueError(f"Truncated chunk store: {path}")
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        start = self._blob_start + int(self._offsets[i])
+        end = self._blob_start + int(self._offsets[i + 1])
+        return self._mm[start:end].decode("utf-8")
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self[i]
+
+    @property
+    def nbytes(self):
+        """Heap memory held (the mapped file itself lives in the OS page cache)."""
+        return self._offsets.nbytes
+
+
+def chunks_path(doc_dir):
+    """The document's chunk file: chunks.bin, or chunks.json for stores not rewritten yet."""
+    path = os.path.join(doc_dir, CHUNKS_FILE)
+    if os.path.exists(path):
+        return path
+    return os.path.join(doc_dir, LEGACY_CHUNKS_FILE)
+
+
+def open_chunks(doc_dir):
+    """Open a document's chunks as a sequence of str (mapped chunks.bin or a legacy list)."""
+    path = chunks_path(doc_dir)
+    if path.endswith(CHUNKS_FILE):
+        return ChunkStore(path)
+    with open(path, "r") as f:
+        return json.load(f)
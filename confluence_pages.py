@@ -0,0 +1,152 @@
+# confluence_pages.py
+"""
+Confluence page-id resolution cache and bulk version checks.
+
+A Confluence URL (/spaces/<key>/pages/<legacy id>/<title>) is resolved to its
+content id with a v1 title search.  The id of a page never changes, so resolved
+ids are kept in a SQLite table (config/confluence_ids.db) and the search is made
+once per URL, not on every process_url.
+
+page_versions() asks for the current version of many pages at once with a CQL
+`id in (...)` search expanded with version, CQL_BATCH ids per request.  The
+resync fan-out in refresh.py uses it (through vector_worker.queue_changed_urls)
+so only pages whose version moved are downloaded again.
+"""
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+
+import requests
+
+from my_utils import _CONFIG_DIR
+
+logger = logging.getLogger(__name__)
+
+CONFLUENCE_IDS_DB = os.path.join(_CONFIG_DIR, "confluence_ids.db")
+CQL_BATCH = 50
+
+_write_lock = threading.Lock()
+
+
+def _db():
+    conn = sqlite3.connect(CONFLUENCE_IDS_DB, timeout=30)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS page_ids ("
+        " url TEXT PRIMARY KEY, content_id TEXT NOT NULL, resolved_at INTEGER NOT NULL)")
+    return conn
+
+
+def parse_confluence_url(url):
+    """(space key, legacy page id, title) from a Confluence page URL, or None."""
+    m = re.search(r'/spaces/([^/]+)/pages/(\d+)/(.*)$', url)
+    if not m:
+        return None
+    return m.group(1), m.group(2), m.group(3).replace("+", " ")
+
+
+def cached_content_id(url):
+    try:
+        conn = _db()
+        try:
+            row = conn.execute("SELECT content_id FROM page_ids WHERE url = ?", (url,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+    except sqlite3.Error as e:
+        print(f"⚠️ Confluence id cache read failed: {e}")
+        return None
+
+
+def _store_content_id(url, content_id):
+    try:
+        with _write_lock:
+            conn = _db()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO page_ids (url, content_id, resolved_at) VALUES (?, ?, ?)",
+                        (url, content_id, int(time.time())))
+            finally:
+                conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠️ Confluence id cache write failed: {e}")
+
+
+def forget_content_id(url):
+    """Drop a cached id (e.g. the page was moved and the id no longer resolves)."""
+    try:
+        with _write_lock:
+            conn = _db()
+            try:
+                with conn:
+                    conn.execute("DELETE FROM page_ids WHERE url = ?", (url,))
+            finally:
+                conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠️ Confluence id cache write failed: {e}")
+
+
+def resolve_content_id(url, confluence_url, auth):
+    """Content id of a Confluence page URL: cached, else a v1 title search (falling
+    back to the legacy id in the URL, which is not cached).  None if the URL can't be parsed."""
+    content_id = cached_content_id(url)
+    if content_id:
+        logger.info(f"[DEBUG] Cached content ID for {url}: {content_id}")
+        return content_id
+
+    parsed = parse_confluence_url(url)
+    if not parsed:
+        return None
+    space_key, legacy_page_id, title = parsed
+    logger.info(f"[DEBUG] Extracted from URL:")
+    logger.info(f"        Space Key: {space_key}")
+    logger.info(f"        Legacy Page ID: {legacy_page_id}")
+    logger.info(f"        Title: {title}")
+
+    search_url = (
+        f"{confluence_url}/wiki/rest/api/content"
+        f"?title={requests.utils.quote(title)}"
+        f"&spaceKey={requests.utils.quote(space_key)}"
+    )
+    logger.info(f"[DEBUG] v1 Search URL: {search_url}")
+    resp = requests.get(search_url, auth=auth, timeout=30)
+
+    if resp.ok:
+        v1_ids = [entry.get("id") for entry in resp.json().get("results", [])]
+        logger.info(f"[DEBUG] v1 Search returned IDs: {v1_ids}")
+        if v1_ids and v1_ids[0]:
+            _store_content_id(url, v1_ids[0])
+            return v1_ids[0]
+
+    logger.warning(
+        f"[DEBUG] No v1 search match found for title '{title}' "
+        f"in space '{space_key}', falling back to legacy ID {legacy_page_id}"
+    )
+    return legacy_page_id
+
+
+def page_versions(confluence_url, auth, content_ids):
+    """{content id: version number} for the given pages, CQL_BATCH per request.
+    Pages missing from the answer (deleted, no permission) are left out; a batch
+    whose request fails is left out too, so callers treat its pages as changed."""
+    versions = {}
+    content_ids = list(dict.fromkeys(content_ids))
+    for i in range(0, len(content_ids), CQL_BATCH):
+        batch = content_ids[i:i + CQL_BATCH]
+        try:
+            resp = requests.get(
+                f"{confluence_url}/wiki/rest/api/content/search",
+                params={"cql": f"id in ({','.join(batch)})", "expand": "version", "limit": len(batch)},
+                headers={"Accept": "application/json"}, auth=auth, timeout=30)
+            resp.raise_for_status()
+        except requests.RequestException as e:
+            logger.warning(f"Confluence version check failed for {len(batch)} page(s): {e}")
+            continue
+        for entry in resp.json().get("results", []):
+            number = entry.get("version", {}).get("number")
+            if number is not None:
+                versions[str(entry.get("id"))] = number
+    return versions
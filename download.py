@@ -7,6 +7,7 @@ from dotenv import load_dotenv
 from urllib.parse import urlparse, quote, unquote
 import shutil
 from my_utils import user_config_file, _CONFIG_DIR
+from msal_cache import get_token_cache, get_msal_app
 
 
 
@@ -23,39 +24,16 @@ TENANT_ID = os.environ["TENANT_ID"]
 SCOPES = ["https://graph.microsoft.com/.default"] # only neded for app-only auth. Delegated user-auth needs to override SCOPES to use user-specific scopes (see SCOPES further donw) 
 AUTHORITY = f"https://login.microsoftonline.com/{TENANT_ID}"
 
-#TOKEN_CACHE_FILE = "./config/token_cache.json"
-TOKEN_CACHE_FILE = os.path.join(_CONFIG_DIR, "token_cache.json")
 
 
 # -------------------------------
-# used user-specific OAuth token cache.
-# NOTE: FIX LATER - for now persistent between run across ALL files 
-#  and ALL users regardless of which user is downloading whatever file.  Not good security-wise.)
+# user-specific OAuth token cache, shared with appnew through Redis (see msal_cache.py)
 def load_cache(userlogin=None):
-    global TOKEN_CACHE_FILE
-    if userlogin:
-        TOKEN_CACHE_FILE = user_config_file(userlogin, "token_cache.json")
-
     print(f"load_cache({userlogin})")
-    cache = msal.SerializableTokenCache()
-    if os.path.exists(TOKEN_CACHE_FILE):
-        cache.deserialize(open(TOKEN_CACHE_FILE, "r").read())
-        print(f"loaded cache from file '{TOKEN_CACHE_FILE}'")
-    else:
-        print(f"load_cahce failed to find path '{TOKEN_CACHE_FILE}' cwd={os.getcwd()}'")
-    return cache
+    return get_token_cache(userlogin)
 
-# -------------------------------
-# used user-specific OAuth token cache.
-# NOTE: FIX LATER - for now persistent between run across ALL files 
-#  and ALL users regardless of which user is downloading whatever file.  Not good security-wise.)
-def save_cache(cache, userLogin=None):
-    if cache.has_state_changed:
-        global TOKEN_CACHE_FILE
-        if userlogin:
-            TOKEN_CACHE_FILE = user_config_file(userlogin, "token_cache.json")
-        print(f"saved cache to file '{TOKEN_CACHE_FILE}'")
-        open(TOKEN_CACHE_FILE, "w").write(cache.serialize())
+def save_cache(cache, userlogin=None):
+    cache.save()
 
 
 # -------------------------------
@@ -88,12 +66,7 @@ def get_app_token_delegated():
     print(f"🔑 Acquiring delegated user app token for userlogin={userlogin}...")
     cache = load_cache(userlogin)  # ✅ Load the cache here
 
-    cca = msal.ConfidentialClientApplication(
-        CLIENT_ID,
-        authority=AUTHORITY,
-        client_credential=CLIENT_SECRET,
-        token_cache=cache  # ✅ Attach cache
-    )
+    cca = get_msal_app(CLIENT_ID, CLIENT_SECRET, AUTHORITY, cache)
 
     accounts = cca.get_accounts()
     if accounts:
@@ -101,6 +74,7 @@ def get_app_token_delegated():
         result = cca.acquire_token_silent(SCOPES, account=accounts[0])
         if result and "access_token" in result:
             print("✅ Using cached user token.")
+            save_cache(cache, userlogin)
             return result["access_token"]
 
     raise Exception("❌ No cached user token found. Please log in through the Flask app first.")
@@ -110,12 +84,12 @@ def get_app_token_delegated():
 # -------------------------------
 def get_app_token():
     print("🔑 Acquiring app token...")
-    cca = msal.ConfidentialClientApplication(
-        CLIENT_ID, authority=AUTHORITY, client_credential=CLIENT_SECRET
-    )
+    cache = load_cache()
+    cca = get_msal_app(CLIENT_ID, CLIENT_SECRET, AUTHORITY, cache)
     result = cca.acquire_token_for_client(scopes=SCOPES)
     if "access_token" not in result:
         raise Exception(f"❌ Failed to get token: {result}")
+    save_cache(cache)
     print("✅ Access token acquired.")
     return result["access_token"]
 
@@ -0,0 +1,130 @@
+# embedding_cache.py
+"""
+Chunk-level embedding cache for incremental re-vectorization.
+
+Embeddings are stored in a SQLite table (config/embedding_cache.db) keyed by
+(embedder name, sha256 of the chunk text), as float16 BLOBs.  When a page
+changes, vector_worker re-chunks it but only encodes the chunks whose text is
+new; unchanged chunks are read back from the cache.  Because Confluence pages are
+usually edited a paragraph at a time, most chunks are cache hits.
+
+All vectors returned by encode_chunks() have gone through float16, whether they
+were hits or freshly encoded, so a document's embeddings don't depend on what
+happened to be cached.  Rows not used for EMBED_CACHE_DAYS are dropped by
+prune_embedding_cache(), which vector_worker.compact_vector_stores runs every
+VECTOR_GC_HOURS.
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+import numpy as np
+
+from my_utils import _CONFIG_DIR
+
+EMBEDDING_CACHE_DB = os.path.join(_CONFIG_DIR, "embedding_cache.db")
+EMBED_CACHE_DAYS = int(os.getenv("EMBED_CACHE_DAYS", "90"))
+
+_write_lock = threading.Lock()
+
+
+def _db():
+    conn = sqlite3.connect(EMBEDDING_CACHE_DB, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS chunk_embeddings ("
+        " embedder TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL, last_used INTEGER NOT NULL,"
+        " PRIMARY KEY (embedder, hash))")
+    return conn
+
+
+def chunk_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _cached_vectors(embedder_name, hashes):
+    """Return {hash: float16 vector} for the hashes already in the cache."""
+    found = {}
+    try:
+        conn = _db()
+        try:
+            for i in range(0, len(hashes), 500):  # stay under SQLite's bound-parameter limit
+                chunk = hashes[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT hash, vector FROM chunk_embeddings WHERE embedder = ? "
+                    f"AND hash IN ({','.join('?' * len(chunk))})",
+                    [embedder_name] + chunk).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float16)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠️ Embedding cache read failed: {e}")
+    return found
+
+
+def _store_vectors(embedder_name, vectors_by_hash, touched):
+    """Insert new vectors and bump last_used of the ones that were reused."""
+    now = int(time.time())
+    try:
+        with _write_lock:
+            conn = _db()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO chunk_embeddings (embedder, hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                        [(embedder_name, h, v.tobytes(), now) for h, v in vectors_by_hash.items()])
+                    conn.executemany(
+                        "UPDATE chunk_embeddings SET last_used = ? WHERE embedder = ? AND hash = ?",
+                        [(now, embedder_name, h) for h in touched])
+            finally:
+                conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠️ Embedding cache write failed: {e}")
+
+
+def encode_chunks(embedder, chunks):
+    """Embeddings (float32, one row per chunk) for chunks, encoding only cache misses."""
+    if not chunks:
+        return np.zeros((0, embedder.get_dimension()), dtype=np.float32)
+
+    name = embedder.get_name()
+    hashes = [chunk_hash(c) for c in chunks]
+    cached = _cached_vectors(name, list(set(hashes)))
+
+    # encode each distinct missing text once
+    missing = {}
+    for h, c in zip(hashes, chunks):
+        if h not in cached and h not in missing:
+            missing[h] = c
+    fresh = {}
+    if missing:
+        vectors = np.asarray(embedder.encode(list(missing.values())), dtype=np.float32)
+        fresh = {h: v.astype(np.float16) for h, v in zip(missing, vectors)}
+
+    print(f"Embedding cache: {len(chunks) - sum(1 for h in hashes if h in fresh)}/{len(chunks)} "
+          f"chunks reused, {len(fresh)} encoded")
+    _store_vectors(name, fresh, list(cached))
+
+    vectors = {**cached, **fresh}
+    return np.vstack([vectors[h] for h in hashes]).astype(np.float32)
+
+
+def prune_embedding_cache(days=EMBED_CACHE_DAYS):
+    """Drop cached embeddings not used for `days` days.  Returns the number removed."""
+    cutoff = int(time.time()) - days * 86400
+    try:
+        with _write_lock:
+            conn = _db()
+            try:
+                with conn:
+                    removed = conn.execute("DELETE FROM chunk_embeddings WHERE last_used < ?", (cutoff,)).rowcount
+            finally:
+                conn.close()
+        print(f"Pruned {removed} cached embedding(s) unused for {days} days")
+        return removed
+    except sqlite3.Error as e:
+        print(f"⚠️ Embedding cache prune failed: {e}")
+        return 0
@@ -0,0 +1,22 @@
+from vector_worker import extract_text_from_html
+
+# Confluence storage format: a code macro's text is CDATA inside ac:plain-text-body
+storage = (
+    '<p>before</p>'
+    '<ac:structured-macro ac:name="code">'
+    '<ac:parameter ac:name="language">python</ac:parameter>'
+    '<ac:plain-text-body><![CDATA[print(1)\nif a < b and c > d:\n    pass]]></ac:plain-text-body>'
+    '</ac:structured-macro>'
+    '<p>after</p>'
+)
+text = extract_text_from_html(storage)
+print(text)
+assert text == "before\npython\nprint(1)\nif a < b and c > d:\npass\nafter", repr(text)
+
+# Regular HTML: headings, table rows, dropped script
+page = "<h2>Title</h2><table><tr><td>a</td><td>b</td></tr></table><script>x()</script><p>end</p>"
+text = extract_text_from_html(page)
+print(text)
+assert text == "## Title\na | b\nend", repr(text)
+
+print("ok")
@@ -25,6 +25,7 @@ import httplib2
 from googleapiclient.discovery import build
 from google_auth_httplib2 import AuthorizedHttp
 #from google_oauth import load_google_token
+from google_services import get_google_service
 
 _GOOGLE_API_TIMEOUT = 30  # seconds
 
@@ -33,12 +34,8 @@ def get_google_drive_filename(userlogin: str, file_id: str) -> str | None:
     Returns the filename (title) of a Google Drive file given its ID.
     Works for Google Sheets, Docs, Slides, etc.
     """
-    creds = load_google_token(userlogin)
-    if not creds or not creds.valid:
-        raise Exception(f"❌ User {userlogin} not logged in to Google Drive")
-
-    http = AuthorizedHttp(creds, http=httplib2.Http(timeout=_GOOGLE_API_TIMEOUT))
-    service = build("drive", "v3", http=http)
+    # Reused per user (see google_services.py) instead of built per call
+    service = get_google_service(userlogin, "drive", "v3")
 
     # Retrieve file metadata (name)
     file = service.files().get(fileId=file_id, fields="name").execute()
@@ -11,6 +11,7 @@ from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
 from google_auth_httplib2 import AuthorizedHttp
 from google_oauth import load_google_token
+from google_services import get_google_service, forget_google_user
 
 _GOOGLE_API_TIMEOUT = 30  # seconds
 
@@ -19,14 +20,8 @@ def get_google_drive_filename(userlogin: str, file_id: str) -> str | None:
     Returns the filename (title) of a Google Drive file given its ID.
     Works for Google Sheets, Docs, Slides, etc.
     """
-    creds = load_google_token(userlogin)
-    if not creds or not creds.valid:
-        raise Exception(f"❌ User {userlogin} not logged in to Google Drive")
-
-    # Build Drive API service with an explicit socket timeout so the Celery
-    # task doesn't hang for minutes waiting on a slow/unreachable Google endpoint.
-    http = AuthorizedHttp(creds, http=httplib2.Http(timeout=_GOOGLE_API_TIMEOUT))
-    service = build("drive", "v3", http=http)
+    # Reused per user (see google_services.py) instead of built per call
+    service = get_google_service(userlogin, "drive", "v3")
 
     # Retrieve file metadata (name)
     file = service.files().get(fileId=file_id, fields="name").execute()
@@ -132,3 +127,4 @@ def logout_google(userlogin):
     if os.path.exists(token_file):
         os.remove(token_file)
         print(f"🧹 Removed Google token for user={userlogin}")
+    forget_google_user(userlogin)
@@ -0,0 +1,123 @@
+# google_services.py
+"""
+Per-user registry of built Google API service objects.
+
+googleapiclient's build() parses a discovery document and wires up a new HTTP
+client every time it is called, which costs a few hundred milliseconds per Drive or
+Sheets call.  Here each (user, api, version) service is built once, from the
+discovery documents bundled with google-api-python-client (static_discovery), and
+reused.
+
+Credentials are loaded from config/<user>/google_token.json once per process and
+refreshed only when they are within REFRESH_MARGIN of expiring.  If the token file
+changes (re-login) or disappears (logout) the user's cached credentials and
+services are dropped on the next call.
+
+httplib2.Http is not thread-safe, so built services are kept per thread; the
+credentials are shared.
+"""
+import os
+import json
+import threading
+from datetime import datetime, timedelta
+
+import httplib2
+from googleapiclient.discovery import build
+from google_auth_httplib2 import AuthorizedHttp
+from google.oauth2.credentials import Credentials
+from google.auth.transport.requests import Request
+from google.auth.exceptions import RefreshError
+
+from my_utils import user_config_file
+
+_GOOGLE_API_TIMEOUT = 30                    # seconds
+REFRESH_MARGIN = timedelta(minutes=5)       # refresh access tokens this long before expiry
+
+_lock = threading.Lock()
+_user_locks = {}        # userlogin -> Lock guarding refresh of that user's credentials
+_creds = {}             # userlogin -> (token file mtime, Credentials)
+_local = threading.local()
+
+
+def _token_file(userlogin):
+    return user_config_file(userlogin, "google_token.json")
+
+
+def _user_lock(userlogin):
+    with _lock:
+        return _user_locks.setdefault(userlogin, threading.Lock())
+
+
+def _needs_refresh(creds):
+    if not creds.expiry:
+        return not creds.token
+    # google-auth keeps expiry as a naive UTC datetime
+    return creds.expiry - datetime.utcnow() < REFRESH_MARGIN
+
+
+def get_google_credentials(userlogin):
+    """Return cached Credentials for a user, refreshing only near expiry.
+    Returns None if the user has no usable Google token."""
+    token_file = _token_file(userlogin)
+    with _user_lock(userlogin):
+        try:
+            mtime = os.path.getmtime(token_file)
+        except OSError:
+            _creds.pop(userlogin, None)
+            print(f"❌ No Google token file={token_file} for user={userlogin}")
+            return None
+
+        cached = _creds.get(userlogin)
+        if cached and cached[0] == mtime:
+            creds = cached[1]
+        else:
+            with open(token_file, "r") as f:
+                print(f"🔑 Loading Google token for user={userlogin} from {token_file}")
+                creds = Credentials.from_authorized_user_info(json.load(f))
+
+        if _needs_refresh(creds) and creds.refresh_token:
+            try:
+                creds.refresh(Request())
+            except RefreshError as e:
+                print(f"❌ Failed to refresh Google token for user={userlogin}: {e}")
+                _creds.pop(userlogin, None)
+                return None
+            with open(token_file, "w") as f:
+                f.write(creds.to_json())
+            mtime = os.path.getmtime(token_file)
+            print(f"🔄 Refreshed Google token for user={userlogin}")
+
+        _creds[userlogin] = (mtime, creds)
+        return creds
+
+
+def get_google_service(userlogin, api, version):
+    """Return a reusable googleapiclient Resource for this user, e.g. ("sheets", "v4")."""
+    creds = get_google_credentials(userlogin)
+    if not creds or not creds.valid:
+        raise Exception(f"❌ User {userlogin} not logged in to Google Drive")
+
+    services = getattr(_local, "services", None)
+    if services is None:
+        services = _local.services = {}
+
+    key = (userlogin, api, version)
+    cached = services.get(key)
+    if cached and cached[0] is creds:
+        return cached[1]
+
+    # explicit socket timeout so a Celery task doesn't hang on an unreachable endpoint
+    http = AuthorizedHttp(creds, http=httplib2.Http(timeout=_GOOGLE_API_TIMEOUT))
+    service = build(api, version, http=http, static_discovery=True, cache_discovery=False)
+    services[key] = (creds, service)
+    return service
+
+
+def forget_google_user(userlogin):
+    """Drop a user's cached credentials (services in other threads are rebuilt on next use)."""
+    with _user_lock(userlogin):
+        _creds.pop(userlogin, None)
+    services = getattr(_local, "services", None)
+    if services:
+        for key in [k for k in services if k[0] == userlogin]:
+            del services[key]
@@ -0,0 +1,172 @@
+# google_sheets.py
+"""
+Range-limited Google Sheets reads.
+
+All tabs needed by a step are fetched with a single spreadsheets.values.batchGet
+call, asking only for the values (partial response) of each tab's used range.
+The Sheets API already trims trailing empty rows/columns from a value range, so
+nothing beyond the last non-empty cell is transferred.
+
+Results come back as SheetGrid objects: plain lists of row values with just enough
+of the openpyxl Worksheet API (iter_rows(), cell(), max_row, max_column) for the
+table scanners in scope.py, update_excel.py and aibrief.py, so we no longer build a
+throwaway openpyxl Workbook cell by cell for every Google-backed sheet.
+"""
+import re
+from openpyxl.styles import Font, Alignment
+from openpyxl.utils import get_column_letter
+
+from google_services import get_google_service
+
+
+def extract_spreadsheet_id(spreadsheet_url_or_id):
+    """Return the spreadsheet ID from a full docs.google.com URL or a raw ID."""
+    match = re.search(r"/spreadsheets/d/([a-zA-Z0-9-_]+)", spreadsheet_url_or_id)
+    return match.group(1) if match else spreadsheet_url_or_id.strip()
+
+
+def _a1_tab(sheet_name):
+    """Quote a tab title for use as an A1 range (handles spaces and apostrophes)."""
+    return "'" + str(sheet_name).replace("'", "''") + "'"
+
+
+def _sheets_service(userlogin):
+    return get_google_service(userlogin, "sheets", "v4")
+
+
+class GridCell:
+    """Lightweight stand-in for an openpyxl Cell that reads/writes through to its SheetGrid.
+    Styles are accepted but not kept: formatting for Google sheets is applied later by
+    update_googlesheet.py from changes.txt."""
+
+    __slots__ = ("_grid", "row", "column")
+
+    def __init__(self, grid, row, column):
+        self._grid = grid
+        self.row = row          # 1-based, like openpyxl
+        self.column = column    # 1-based, like openpyxl
+
+    @property
+    def value(self):
+        return self._grid.get_value(self.row, self.column)
+
+    @value.setter
+    def value(self, v):
+        self._grid.set_value(self.row, self.column, v)
+
+    @property
+    def coordinate(self):
+        return f"{get_column_letter(self.column)}{self.row}"
+
+    @property
+    def font(self):
+        return Font()
+
+    @font.setter
+    def font(self, _):
+        pass
+
+    @property
+    def alignment(self):
+        return Alignment()
+
+    @alignment.setter
+    def alignment(self, _):
+        pass
+
+    def __repr__(self):
+        return f"<GridCell {self._grid.title}.{self.coordinate}>"
+
+
+class SheetGrid:
+    """Values of one worksheet as a list of rows (ragged, as returned by the Sheets API).
+    first_row > 1 holds just a region of a sheet (rows above it read as empty)."""
+
+    def __init__(self, title, rows, first_row=1):
+        self.title = title
+        self.rows = rows
+        self.first_row = first_row
+        self.max_row = first_row + len(rows) - 1
+        self.max_column = max((len(r) for r in rows), default=0)
+
+    def get_value(self, row, column):
+        i = row - self.first_row
+        if i < 0 or i >= len(self.rows):
+            return None
+        r = self.rows[i]
+        if column < 1 or column > len(r):
+            return None
+        v = r[column - 1]
+        return None if v == "" else v
+
+    def set_value(self, row, column, value):
+        i = row - self.first_row
+        if i < 0:
+            raise IndexError(f"row {row} is above this grid's first row {self.first_row}")
+        while len(self.rows) <= i:
+            self.rows.append([])
+        r = self.rows[i]
+        if len(r) < column:
+            r.extend([""] * (column - len(r)))
+        r[column - 1] = value
+        self.max_row = max(self.max_row, row)
+        self.max_column = max(self.max_column, column)
+
+    def cell(self, row, column, value=None):
+        c = GridCell(self, row, column)
+        if value is not None:
+            c.value = value
+        return c
+
+    def iter_rows(self, min_row=None, max_row=None, values_only=False):
+        """Yield rows padded to max_column, as tuples of GridCell (or values)."""
+        width = self.max_column
+        first = self.first_row if min_row is None else max(min_row, self.first_row)
+        last = self.max_row if max_row is None else min(max_row, self.max_row)
+        for row_idx in range(first, last + 1):
+            if values_only:
+                yield tuple(self.get_value(row_idx, c) for c in range(1, width + 1))
+            else:
+                yield tuple(GridCell(self, row_idx, c) for c in range(1, width + 1))
+
+
+def read_google_tabs(userlogin, spreadsheet_url_or_id, sheet_names=None):
+    """
+    Read one or more tabs of a Google Sheet with a single values.batchGet call.
+
+    sheet_names: list of tab titles, or None for just the first tab.
+    Returns an ordered dict {tab title: SheetGrid}.
+    """
+    spreadsheet_id = extract_spreadsheet_id(spreadsheet_url_or_id)
+    service = _sheets_service(userlogin)
+
+    if not sheet_names:
+        # partial response: titles only, not the full spreadsheet resource
+        metadata = service.spreadsheets().get(
+            spreadsheetId=spreadsheet_id,
+            fields="sheets.properties.title"
+        ).execute()
+        sheet_names = [metadata["sheets"][0]["properties"]["title"]]
+
+    print(f"Reading Google Sheet ID={spreadsheet_id}, tabs={sheet_names} for user={userlogin}")
+    result = service.spreadsheets().values().batchGet(
+        spreadsheetId=spreadsheet_id,
+        ranges=[_a1_tab(name) for name in sheet_names],
+        majorDimension="ROWS",
+        fields="valueRanges(values)"
+    ).execute()
+
+    # valueRanges come back in the same order as the requested ranges
+    value_ranges = result.get("valueRanges", [])
+    grids = {}
+    for i, name in enumerate(sheet_names):
+        values = value_ranges[i].get("values", []) if i < len(value_ranges) else []
+        grids[name] = SheetGrid(name, values)
+    return grids
+
+
+def read_google_grid(userlogin, spreadsheet_url_or_id, sheet_name=None):
+    """Read a single tab (first tab if sheet_name is not a tab title) as a SheetGrid."""
+    names = [sheet_name] if isinstance(sheet_name, str) and sheet_name else None
+    grids = read_google_tabs(userlogin, spreadsheet_url_or_id, names)
+    return next(iter(grids.values()))
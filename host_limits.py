@@ -0,0 +1,102 @@
+# host_limits.py
+"""
+Per-host politeness limits for the URL fetch workers.
+
+The url worker runs many process_url fetches at once (a threads pool, possibly
+in several containers), so a docs.json full of Confluence pages would otherwise
+send all of them to one site together.  host_slot(url) is held around each
+page fetch:
+
+    at most HOST_MAX_CONCURRENCY fetches per host are in flight, across every
+    worker process: slot i of a host is the Redis key hostslot:<host>:<i>, taken
+    with SET NX and an expiry (HOST_SLOT_TTL) so a crashed worker's slot frees itself
+    fetches to one host start at least HOST_MIN_INTERVAL_MS apart: hosttick:<host>
+    is set with NX and that expiry in milliseconds, so only one start per interval wins
+
+Keys live in Redis db 2 next to the url states.  If Redis can't be reached, a
+per-process semaphore limits concurrency alone.
+"""
+import os
+import time
+import uuid
+import random
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import redis
+
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+HOST_MAX_CONCURRENCY = int(os.getenv("HOST_MAX_CONCURRENCY", "4"))
+HOST_MIN_INTERVAL_MS = int(os.getenv("HOST_MIN_INTERVAL_MS", "250"))
+HOST_SLOT_TTL = 300             # seconds; longer than any single page fetch
+HOST_WAIT_SECONDS = 600         # give up waiting for a slot after this long
+
+r = redis.Redis(host=REDIS_HOST, port=6379, db=2, decode_responses=True)
+
+# delete the slot only if this holder still owns it (it may have expired and been retaken)
+_RELEASE = r.register_script(
+    "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0")
+
+_local_slots = {}               # host -> BoundedSemaphore, used when Redis is down
+_local_lock = threading.Lock()
+
+
+def _local_semaphore(host):
+    with _local_lock:
+        if host not in _local_slots:
+            _local_slots[host] = threading.BoundedSemaphore(HOST_MAX_CONCURRENCY)
+        return _local_slots[host]
+
+
+def _acquire(host, token):
+    deadline = time.monotonic() + HOST_WAIT_SECONDS
+    while True:
+        for i in random.sample(range(HOST_MAX_CONCURRENCY), HOST_MAX_CONCURRENCY):
+            key = f"hostslot:{host}:{i}"
+            if r.set(key, token, nx=True, ex=HOST_SLOT_TTL):
+                break
+        else:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"No fetch slot for {host} after {HOST_WAIT_SECONDS}s")
+            time.sleep(0.2 + random.random() * 0.3)
+            continue
+        break
+    try:
+        if HOST_MIN_INTERVAL_MS > 0:
+            while not r.set(f"hosttick:{host}", token, nx=True, px=HOST_MIN_INTERVAL_MS):
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"No fetch start for {host} after {HOST_WAIT_SECONDS}s")
+                time.sleep(HOST_MIN_INTERVAL_MS / 2000)
+    except BaseException:
+        _release(key, token)
+        raise
+    return key
+
+
+def _release(key, token):
+    try:
+        _RELEASE(keys=[key], args=[token])
+    except redis.RedisError as e:
+        print(f"⚠️ Could not release fetch slot {key} (expires in {HOST_SLOT_TTL}s): {e}")
+
+
+@contextmanager
+def host_slot(url):
+    """Hold one of the url's host fetch slots for the duration of the block."""
+    host = (urlparse(url).hostname or "").lower()
+    token = uuid.uuid4().hex
+    try:
+        key = _acquire(host, token)
+    except redis.RedisError as e:
+        print(f"⚠️ Redis unavailable for host limits ({e}); limiting {host} in this process only")
+        key = None
+
+    if key is None:
+        with _local_semaphore(host):
+            yield
+        return
+    try:
+        yield
+    finally:
+        _release(key, token)
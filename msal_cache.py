@@ -0,0 +1,218 @@
+# msal_cache.py
+"""
+Process-wide MSAL application objects and a Redis-backed token cache.
+
+Every page load and pipeline step used to build a new ConfidentialClientApplication
+(which fetches the Azure AD authority/OpenID discovery documents) and read/write a
+token_cache.json file.  This module keeps one long-lived application per
+(client_id, authority, cache partition) per process and shares a single MSAL
+http_cache between them, persisted in Redis, so discovery is done once and reused
+by appnew and by the download/update subprocesses.
+
+Token caches are stored in Redis, one partition per user login (plus "_app" for
+the client-credentials flow), and writes are serialized across processes with a
+Redis lock.  An existing config/<user>/token_cache.json is imported into Redis the
+first time that user's partition is read.
+
+Typical use:
+    cache = get_token_cache(userlogin)
+    cca = get_msal_app(CLIENT_ID, CLIENT_SECRET, AUTHORITY, cache)
+    result = cca.acquire_token_silent(SCOPES, account=cca.get_accounts()[0])
+    cache.save()
+"""
+import os
+import json
+import pickle
+import threading
+from collections.abc import MutableMapping
+
+import msal
+import redis
+
+from my_utils import user_config_file, _CONFIG_DIR
+
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+r = redis.Redis(host=REDIS_HOST, port=6379, db=2, decode_responses=True)
+# http_cache values are pickled MSAL response objects, so they need a raw-bytes client
+r_raw = redis.Redis(host=REDIS_HOST, port=6379, db=2)
+
+APP_PARTITION = "_app"          # token cache partition used by the client-credentials flow
+LOCK_TIMEOUT = 30               # seconds before a crashed holder's lock expires
+LOCK_WAIT = 10                  # seconds to wait for another process to finish writing
+
+
+def _cache_key(partition):
+    return f"msal:token_cache:{partition}"
+
+
+def _lock_key(partition):
+    return f"msal:lock:{partition}"
+
+
+def _cache_file(partition):
+    if partition == APP_PARTITION:
+        return os.path.join(_CONFIG_DIR, "token_cache.json")
+    return user_config_file(partition, "token_cache.json")
+
+
+class RedisHttpCache(MutableMapping):
+    """Dict-like MSAL http_cache stored in Redis so discovery responses survive across processes.
+    MSAL stores its own expiry alongside each entry, so no Redis TTL is set here."""
+
+    PREFIX = "msal:http:"
+
+    def _k(self, key):
+        return f"{self.PREFIX}{key}"
+
+    def __getitem__(self, key):
+        data = r_raw.get(self._k(key))
+        if data is None:
+            raise KeyError(key)
+        return pickle.loads(data)
+
+    def __setitem__(self, key, value):
+        r_raw.set(self._k(key), pickle.dumps(value))
+
+    def __delitem__(self, key):
+        if not r_raw.delete(self._k(key)):
+            raise KeyError(key)
+
+    def __iter__(self):
+        for k in r_raw.scan_iter(match=f"{self.PREFIX}*"):
+            yield k.decode("utf-8")[len(self.PREFIX):]
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def _make_http_cache():
+    try:
+        r_raw.ping()
+        return RedisHttpCache()
+    except redis.RedisError as e:
+        print(f"⚠️ Redis unavailable for MSAL http cache ({e}); using in-process cache")
+        return {}
+
+
+class RedisTokenCache(msal.SerializableTokenCache):
+    """SerializableTokenCache whose state lives in Redis under one partition (user login)."""
+
+    def __init__(self, partition):
+        super().__init__()
+        self.partition = partition
+        self._blob = None  # serialized state as last read from / written to Redis
+        self.reload()
+
+    def reload(self):
+        """Pick up changes written by other processes.  Cheap when nothing changed."""
+        blob = r.get(_cache_key(self.partition))
+        if blob is None:
+            blob = self._import_file()
+        if blob and blob != self._blob:
+            self.deserialize(blob)
+            self._blob = blob
+        elif not blob and self._blob:
+            # partition was cleared elsewhere (e.g. logout)
+            self.deserialize("{}")
+            self._blob = None
+
+    def _import_file(self):
+        """One-time migration of an existing token_cache.json into Redis."""
+        path = _cache_file(self.partition)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            blob = f.read()
+        if blob.strip():
+            print(f"Importing token cache file '{path}' into Redis partition '{self.partition}'")
+            r.setnx(_cache_key(self.partition), blob)
+            return r.get(_cache_key(self.partition))
+        return None
+
+    def save(self):
+        """Write back to Redis if MSAL changed anything.  Entries written by another
+        process since our last reload are kept; ours win on conflicting keys."""
+        if not self.has_state_changed:
+            return
+        with r.lock(_lock_key(self.partition), timeout=LOCK_TIMEOUT, blocking_timeout=LOCK_WAIT):
+            remote = r.get(_cache_key(self.partition))
+            ours = json.loads(self.serialize())
+            if remote and remote != self._blob:
+                merged = json.loads(remote)
+                for section, entries in ours.items():
+                    if isinstance(entries, dict):
+                        merged.setdefault(section, {}).update(entries)
+                    else:
+                        merged[section] = entries
+                ours = merged
+            blob = json.dumps(ours, indent=4)
+            r.set(_cache_key(self.partition), blob)
+            self.deserialize(blob)  # resets has_state_changed
+            self._blob = blob
+        print(f"Saved token cache for partition '{self.partition}' to Redis")
+
+
+_lock = threading.Lock()
+_token_caches = {}   # partition -> RedisTokenCache
+_apps = {}           # (client_id, authority, partition) -> ConfidentialClientApplication
+_http_cache = None
+
+
+def get_token_cache(userlogin=None):
+    """Return this process's token cache for a user (or the app-only partition),
+    refreshed from Redis."""
+    partition = userlogin or APP_PARTITION
+    with _lock:
+        cache = _token_caches.get(partition)
+        if cache is None:
+            cache = RedisTokenCache(partition)
+            _token_caches[partition] = cache
+            return cache
+    cache.reload()
+    return cache
+
+
+def get_msal_app(client_id, client_secret, authority, cache=None):
+    """Return the long-lived ConfidentialClientApplication for this client/authority/cache.
+    All apps share one http_cache so authority discovery is not repeated."""
+    global _http_cache
+    if cache is None:
+        cache = get_token_cache()
+    key = (client_id, authority, cache.partition)
+    with _lock:
+        app = _apps.get(key)
+        if app is None:
+            if _http_cache is None:
+                _http_cache = _make_http_cache()
+            print(f"Building MSAL app for authority={authority} partition={cache.partition}")
+            app = msal.ConfidentialClientApplication(
+                client_id,
+                authority=authority,
+                client_credential=client_secret,
+                token_cache=cache,
+                http_cache=_http_cache,
+            )
+            _apps[key] = app
+    return app
+
+
+def has_token_cache(userlogin):
+    """True if the user has Azure tokens stored (in Redis or a not-yet-imported file)."""
+    if r.exists(_cache_key(userlogin)):
+        return True
+    return os.path.exists(_cache_file(userlogin))
+
+
+def clear_token_cache(userlogin):
+    """Forget a user's Azure tokens everywhere (logout)."""
+    partition = userlogin or APP_PARTITION
+    with r.lock(_lock_key(partition), timeout=LOCK_TIMEOUT, blocking_timeout=LOCK_WAIT):
+        r.delete(_cache_key(partition))
+        path = _cache_file(partition)
+        if os.path.exists(path):
+            os.remove(path)
+            print(f"Deleted token file: {path}")
+    with _lock:
+        cache = _token_caches.get(partition)
+    if cache is not None:
+        cache.reload()
@@ -128,10 +128,66 @@ def excel_escape_quotes(s: str) -> str:
     # Excel doubles double-quotes inside string literals
     return s.replace('"', '""')
 
-# use TinyURL when hyperlink length exceeds 255 which break excel hyperlinks
+# use TinyURL when hyperlink length exceeds 255 which break excel hyperlinks.
+# Shortened links are kept in a small SQLite cache (config/tinyurl_cache.db) so the same
+# JQL link is only sent to tinyurl.com once, not on every refresh.
 import requests
-def shorten_url(url: str) -> str:
-    """Shorten a URL using TinyURL."""
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_HYPERLINK_URL_LEN = 255     # Excel's HYPERLINK() formula limit for URLs is ~255 characters
+TINYURL_CACHE_DB = os.path.join(_CONFIG_DIR, "tinyurl_cache.db")
+TINYURL_MAX_WORKERS = 8
+
+_tinyurl_lock = threading.Lock()
+_pending_short_urls = {}        # placeholder -> long url, see make_hyperlink_formula(defer=True)
+
+
+def _tinyurl_db():
+    conn = sqlite3.connect(TINYURL_CACHE_DB, timeout=10)
+    conn.execute("CREATE TABLE IF NOT EXISTS short_urls (long_url TEXT PRIMARY KEY, short_url TEXT NOT NULL)")
+    return conn
+
+
+def _cached_short_urls(urls):
+    """Return {long_url: short_url} for the urls already in the cache."""
+    found = {}
+    urls = list(urls)
+    try:
+        conn = _tinyurl_db()
+        try:
+            for i in range(0, len(urls), 500):  # stay under SQLite's bound-parameter limit
+                chunk = urls[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT long_url, short_url FROM short_urls WHERE long_url IN ({','.join('?' * len(chunk))})",
+                    chunk).fetchall()
+                found.update(rows)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠️ TinyURL cache read failed: {e}")
+    return found
+
+
+def _store_short_urls(mapping):
+    if not mapping:
+        return
+    try:
+        with _tinyurl_lock:
+            conn = _tinyurl_db()
+            try:
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO short_urls (long_url, short_url) VALUES (?, ?)",
+                                     list(mapping.items()))
+            finally:
+                conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠️ TinyURL cache write failed: {e}")
+
+
+def _tinyurl_request(url: str) -> str | None:
     try:
         api_url = f"http://tinyurl.com/api-create.php?url={url}"
         response = requests.get(api_url, timeout=5)
@@ -139,22 +195,69 @@ def shorten_url(url: str) -> str:
             return response.text.strip()
     except Exception as e:
         print(f"⚠️ URL shortening failed for {url}: {e}")
-    return url  # fallback to original if shortening fails
+    return None
+
+
+def shorten_urls(urls) -> dict:
+    """Shorten many URLs: cache hits first, then all misses concurrently.
+    Returns {long_url: short_url}; a URL that could not be shortened maps to itself."""
+    urls = list(dict.fromkeys(urls))
+    result = _cached_short_urls(urls)
+    misses = [u for u in urls if u not in result]
+    if misses:
+        print(f"Shortening {len(misses)} URLs with TinyURL ({len(result)} cached)...")
+        with ThreadPoolExecutor(max_workers=min(TINYURL_MAX_WORKERS, len(misses))) as pool:
+            shortened = dict(zip(misses, pool.map(_tinyurl_request, misses)))
+        new_entries = {u: s for u, s in shortened.items() if s}
+        _store_short_urls(new_entries)
+        for u in misses:
+            result[u] = new_entries.get(u, u)  # fallback to original if shortening fails
+    return result
 
 
-def make_hyperlink_formula(url: str, text: str) -> str:
-    """Create an Excel HYPERLINK formula; shorten URL only if it's too long."""
+def shorten_url(url: str) -> str:
+    """Shorten a URL using TinyURL (cached)."""
+    return shorten_urls([url])[url]
+
+
+def make_hyperlink_formula(url: str, text: str, defer: bool = False) -> str:
+    """Create an Excel HYPERLINK formula; shorten URL only if it's too long.
+
+    defer=True: a long URL gets a placeholder instead of a cache lookup or blocking TinyURL
+    call; resolve_short_urls() later looks all placeholders up in the cache at once and
+    shortens the misses in one batch."""
     text = text.replace("\n", " ")
 
-    # Excel's HYPERLINK() formula limit for URLs is ~255 characters
     short_url = url
-    if len(url) > 255:
-        print(f"URL too long ({len(url)} chars), shortening with TinyURL...")
-        short_url = shorten_url(url)
+    if len(url) > MAX_HYPERLINK_URL_LEN:
+        if defer:
+            short_url = "{{tinyurl:" + hashlib.sha1(url.encode("utf-8")).hexdigest() + "}}"
+            _pending_short_urls[short_url] = url
+        else:
+            print(f"URL too long ({len(url)} chars), shortening with TinyURL...")
+            short_url = shorten_url(url)
 
     return f'=HYPERLINK("{excel_escape_quotes(short_url)}","{excel_escape_quotes(text)}")'
 
 
+def resolve_short_urls(entries: list[str]) -> list[str]:
+    """Replace the placeholders left by make_hyperlink_formula(defer=True) in a list of
+    change entries, shortening all pending URLs in one concurrent batch."""
+    if not _pending_short_urls:
+        return entries
+    pending = dict(_pending_short_urls)
+    _pending_short_urls.clear()
+    short = shorten_urls(pending.values())
+    resolved = []
+    for entry in entries:
+        if "{{tinyurl:" in entry:
+            for placeholder, long_url in pending.items():
+                if placeholder in entry:
+                    entry = entry.replace(placeholder, excel_escape_quotes(short[long_url]))
+        resolved.append(entry)
+    return resolved
+
+
 import os
 from dotenv import load_dotenv, set_key, unset_key
 from pathlib import Path
@@ -0,0 +1,142 @@
+# query_cache.py
+"""
+Process-wide cache of query embeddings.
+
+aibrief, the read_jira AI fields and the MCP server send the same prompt strings
+to the retriever again and again, and encoding them is most of a small corpus's
+search time.  encode_queries() keeps an LRU of (embedder name, normalized query)
+-> float32 vector, QUERY_CACHE_SIZE entries per process, and only encodes the
+queries it has not seen, in one encode call.
+
+With QUERY_CACHE_REDIS=1 the vectors are also shared through Redis (db 2, key
+qemb:<embedder>:<sha256 of the query>, expiring after QUERY_CACHE_TTL seconds),
+so the web app, the scheduler and the MCP server warm each other's caches.  If
+Redis can't be reached the in-process cache is used alone.
+
+Queries are normalized by stripping and collapsing whitespace only; case is kept
+because some embedders are case-sensitive.  query_cache_stats() returns the hit
+and miss counters.
+"""
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import redis
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_REDIS = os.getenv("QUERY_CACHE_REDIS", "0") == "1"
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", str(7 * 86400)))
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+
+_cache = OrderedDict()      # (embedder name, normalized query) -> float32 vector
+_stats = {"hits": 0, "redis_hits": 0, "misses": 0}
+_lock = threading.Lock()
+_redis = None               # raw-bytes client, created on first use; False once Redis failed
+
+
+def normalize_query(query):
+    return re.sub(r"\s+", " ", query).strip()
+
+
+def _redis_key(embedder_name, query):
+    return f"qemb:{embedder_name}:{hashlib.sha256(query.encode('utf-8')).hexdigest()}"
+
+
+def _redis_client():
+    global _redis
+    if _redis is None:
+        try:
+            client = redis.Redis(host=REDIS_HOST, port=6379, db=2)
+            client.ping()
+            _redis = client
+        except redis.RedisError as e:
+            print(f"⚠️ Redis unavailable for query embedding cache ({e}); using in-process cache")
+            _redis = False
+    return _redis or None
+
+
+def _redis_get(embedder_name, queries):
+    """{query: vector} for the queries found in Redis."""
+    client = _redis_client() if QUERY_CACHE_REDIS else None
+    if client is None or not queries:
+        return {}
+    try:
+        blobs = client.mget([_redis_key(embedder_name, q) for q in queries])
+    except redis.RedisError as e:
+        print(f"⚠️ Query embedding cache read failed: {e}")
+        return {}
+    return {q: np.frombuffer(b, dtype=np.float32) for q, b in zip(queries, blobs) if b is not None}
+
+
+def _redis_put(embedder_name, vectors_by_query):
+    client = _redis_client() if QUERY_CACHE_REDIS else None
+    if client is None or not vectors_by_query:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        for q, v in vectors_by_query.items():
+            pipe.set(_redis_key(embedder_name, q), v.tobytes(), ex=QUERY_CACHE_TTL)
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"⚠️ Query embedding cache write failed: {e}")
+
+
+def _remember(key, vector):
+    with _lock:
+        _cache[key] = vector
+        _cache.move_to_end(key)
+        while len(_cache) > QUERY_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def encode_queries(embedder, queries):
+    """Embeddings (float32, one row per query) for queries, encoding only cache misses."""
+    if not queries:
+        return np.zeros((0, embedder.get_dimension()), dtype=np.float32)
+    name = embedder.get_name()
+    normalized = [normalize_query(q) for q in queries]
+
+    found = {}
+    with _lock:
+        for q in dict.fromkeys(normalized):
+            vector = _cache.get((name, q))
+            if vector is not None:
+                _cache.move_to_end((name, q))
+                found[q] = vector
+    hits = sum(1 for q in normalized if q in found)
+
+    missing = [q for q in dict.fromkeys(normalized) if q not in found]
+    shared = _redis_get(name, missing)
+    redis_hits = sum(1 for q in normalized if q in shared)
+    missing = [q for q in missing if q not in shared]
+
+    fresh = {}
+    if missing:
+        vectors = np.asarray(embedder.encode(missing), dtype=np.float32)
+        fresh = dict(zip(missing, vectors))
+        _redis_put(name, fresh)
+    for q, v in {**shared, **fresh}.items():
+        _remember((name, q), v)
+        found[q] = v
+
+    with _lock:
+        _stats["hits"] += hits
+        _stats["redis_hits"] += redis_hits
+        _stats["misses"] += len(normalized) - hits - redis_hits
+    if hits or redis_hits:
+        print(f"Query embedding cache: {hits + redis_hits}/{len(normalized)} query(s) reused, {len(fresh)} encoded")
+    return np.vstack([found[q] for q in normalized]).astype(np.float32, copy=False)
+
+
+def query_cache_stats():
+    """Hit/miss counters since the process started, with the current cache size."""
+    with _lock:
+        return {**_stats, "size": len(_cache)}
+
+
+def clear_query_cache():
+    with _lock:
+        _cache.clear()
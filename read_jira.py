@@ -268,6 +268,17 @@ field_args = data.get('field_args', {})
 if (field_args):
     print(f"Found field_args={field_args} in {yaml_file}")
 
+_rag_results = None
+
+def get_rag_result(prompt):
+    """RAG context for a field_args prompt.  All prompts are retrieved in one batch on
+    first use; every row with the same prompt reuses the result."""
+    global _rag_results
+    if _rag_results is None:
+        from vector_rag_retriever import search_and_prepare_for_llm_batch
+        _rag_results = search_and_prepare_for_llm_batch(userlogin, list(dict.fromkeys(field_args.values())))
+    return _rag_results.get(prompt)
+
 import_mode = False
 execsummary_mode = False
 
@@ -518,8 +529,7 @@ if filtered_ids:  # make sure we have some JIRA IDs in the excel file otherwise
             if field in field_args:
                 print(f"found field_args[{field}] = {field_args.get(field)}")
 
-                from vector_rag_retriever import *
-                rag_result = search_and_prepare_for_llm(field_args[field], userlogin)
+                rag_result = get_rag_result(field_args[field])
                 if rag_result and rag_result.get('has_context'):
                     context = rag_result.get('context', '')
                     print(f"RAG context for field {field}: {context[:500]}{'...' if len(context) > 500 else ''}")
@@ -820,8 +830,7 @@ if jql_ids:
                 if field in field_args:
                     print(f"found field_args[{field}] = {field_args.get(field)}")
 
-                    from vector_rag_retriever import *
-                    rag_result = search_and_prepare_for_llm(field_args[field], userlogin)
+                    rag_result = get_rag_result(field_args[field])
                     if rag_result and rag_result.get('has_context'):
                         context = rag_result.get('context', '')
                         print(f"RAG context for field {field}: {context[:500]}{'...' if len(context) > 500 else ''}")
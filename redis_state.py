@@ -24,4 +24,11 @@ def update_url_state(user_id, url, **kwargs):
     """Update state for a specific user's URL."""
     state = get_url_state(user_id, url) or {}
     state.update(kwargs)
-    set_url_state(user_id, url, state)
\ No newline at end of file
+    set_url_state(user_id, url, state)
+
+def track_task(user_id, task_id, ttl=3600):
+    """Add a Celery task id to the user's task set (celery:tasks:<user>), the set
+    appnew reads to show running tasks."""
+    key = f"celery:tasks:{user_id}"
+    r.sadd(key, task_id)
+    r.expire(key, ttl)
\ No newline at end of file
@@ -20,7 +20,7 @@ import calendar
 import glob
 import hashlib
 from bs4 import BeautifulSoup
-from my_utils import user_config_file, _CONFIG_DIR
+from my_utils import user_config_file, _CONFIG_DIR, make_hyperlink_formula, resolve_short_urls
 
 
 # Cache dictionary to avoid repeated calls
@@ -433,38 +433,10 @@ def parse_runrate_params(runrate_params_list):
 
 
 
-# Without escaping, Excel would see the unescaped quote as the end of the string, breaking the formula:
-# So _excel_escape_quotes() prevents that by doubling the quotes inside the formula string
-# the correct way to represent quotes inside Excel string literals.
-def _excel_escape_quotes(s: str) -> str:
-    # Excel doubles double-quotes inside string literals
-    return s.replace('"', '""')
-
-# use TinyURL when hyperlink length exceeds 255 which break excel hyperlinks
-import requests
-def shorten_url(url: str) -> str:
-    """Shorten a URL using TinyURL."""
-    try:
-        api_url = f"http://tinyurl.com/api-create.php?url={url}"
-        response = requests.get(api_url, timeout=5)
-        if response.status_code == 200:
-            return response.text.strip()
-    except Exception as e:
-        print(f"⚠️ URL shortening failed for {url}: {e}")
-    return url  # fallback to original if shortening fails
-
-
 def _make_hyperlink_formula(url: str, text: str) -> str:
-    """Create an Excel HYPERLINK formula; shorten URL only if it's too long."""
-    text = text.replace("\n", " ")
-
-    # Excel's HYPERLINK() formula limit for URLs is ~255 characters
-    short_url = url
-    if len(url) > 255:
-        print(f"URL too long ({len(url)} chars), shortening with TinyURL...")
-        short_url = shorten_url(url)
-
-    return f'=HYPERLINK("{_excel_escape_quotes(short_url)}","{_excel_escape_quotes(text)}")'
+    """Create an Excel HYPERLINK formula; long URLs are shortened (cached, batched) via my_utils."""
+    # placeholders for uncached long URLs are resolved in one batch before changes are written
+    return make_hyperlink_formula(url, text, defer=True)
 
 
 # takes jira issue object (that include changelog) previously returned by jira client search. this new function will 
@@ -1302,6 +1274,7 @@ changes_file = yaml_file.replace("scope.yaml","import.changes.txt")
 print(f"Writing changes to {changes_file}")
 
 if changes_list:
+    changes_list = resolve_short_urls(changes_list)   # shorten deferred long JQL links in one batch
     with open(changes_file, "w") as f:
         #f.write("sheet = ", sheet)  #save sheet name for update_sharepoint downstream
         for entry in changes_list:
@@ -29,6 +29,8 @@ APPNEW_HOST = os.getenv("APPNEW_HOST", "http://localhost:7000")
 SCHEDULE_FILE = "./config/schedules.json"
 SCHEDULE_LOCK = "./config/schedules.json.lock"
 SCHEDULE_CHECK_INTERVAL = 60  # Check for schedule changes every 60 seconds
+VECTOR_GC_HOURS = float(os.getenv("VECTOR_GC_HOURS", "24"))  # vector store compaction interval, 0 disables
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 LOG_DIR = "./logs"
 
 # Load environment variables
@@ -310,6 +312,17 @@ def call_resync(filename: str, userlogin: str):
     return response
 
 
+def queue_vector_gc():
+    """Queue vector store compaction on the vector worker (vector_worker.compact_vector_stores)."""
+    from celery import Celery
+    try:
+        client = Celery("scheduler", broker=f"redis://{REDIS_HOST}:6379/0")
+        result = client.send_task("vector_worker.compact_vector_stores", queue="embed_queue")
+        logger.info(f"Queued vector store compaction: task_id={result.id}")
+    except Exception as e:
+        logger.error(f"Could not queue vector store compaction: {e}")
+
+
 def call_teams_sync(userlogin: str):
     """Invoke the Teams chat sync endpoint for a specific user."""
     endpoint = f"{APPNEW_HOST}/teams/sync_scheduled"
@@ -353,6 +366,17 @@ def main():
         max_instances=1
     )
     
+    if VECTOR_GC_HOURS > 0:
+        scheduler.add_job(
+            queue_vector_gc,
+            "interval",
+            hours=VECTOR_GC_HOURS,
+            id="__vector_gc__",
+            replace_existing=True,
+            misfire_grace_time=3600,
+            max_instances=1
+        )
+
     scheduler.start()
     logger.info("Scheduler started")
     
@@ -9,6 +9,8 @@ import httplib2
 from googleapiclient.discovery import build
 from google_auth_httplib2 import AuthorizedHttp
 from google_oauth import *
+from google_sheets import read_google_grid
+from vector_index import remove_document
 
 _GOOGLE_API_TIMEOUT = 30  # seconds
 
@@ -60,33 +62,10 @@ def read_excel_rows(filename, sheet_name=0):
 # rename the googlelogin param to userlogin because that what is used as
 def read_google_rows(googlelogin, spreadsheet_url_or_id, sheet_name=None):
     """
-    Reads all rows from a Google Sheet, returns as list of lists.
+    Reads the used range of a Google Sheet tab, returns as list of lists.
     sheet_name: name of the sheet; defaults to first sheet if None.
     """
-    # Extract spreadsheet ID if URL is given
-    match = re.search(r"/spreadsheets/d/([a-zA-Z0-9-_]+)", spreadsheet_url_or_id)
-    spreadsheet_id = match.group(1) if match else spreadsheet_url_or_id.strip()
-
-    # Load user's saved credentials
-    creds = load_google_token(googlelogin)
-    if not creds or not creds.valid:
-        raise Exception(f"❌ User {googlelogin} not logged in to Google Drive")
-
-    http = AuthorizedHttp(creds, http=httplib2.Http(timeout=_GOOGLE_API_TIMEOUT))
-    service = build("sheets", "v4", http=http)
-
-    # If no sheet_name provided, get the first sheet
-    if sheet_name is None:
-        metadata = service.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
-        sheet_name = metadata["sheets"][0]["properties"]["title"]
-
-    print(f"Reading Google Sheet ID={spreadsheet_id}, sheet='{sheet_name}' for user={googlelogin}")
-    result = service.spreadsheets().values().get(
-        spreadsheetId=spreadsheet_id,
-        range=sheet_name
-    ).execute()
-
-    return result.get("values", [])
+    return read_google_grid(googlelogin, spreadsheet_url_or_id, sheet_name).rows
 
 
 def set_output_filename(filename, sheet, table_name, timestamp, import_found=False, jira_create_found=False, runrate_found=False) -> str:
@@ -1049,6 +1028,7 @@ if __name__ == "__main__":
                 existing_docs_list.remove(entry)
                 safe_url = entry["url"].replace("/", "_").replace(":", "_")
                 vector_dir = os.path.join(CONFIG_DIR, userlogin, "vectors", safe_url)
+                remove_document(os.path.join(CONFIG_DIR, userlogin, "vectors"), entry["url"])
                 if os.path.exists(vector_dir):
                     shutil.rmtree(vector_dir)
                     print(f"Deleted orphaned vector dir: {vector_dir}")
@@ -0,0 +1,179 @@
+# sparse_index.py
+"""
+Compact BM25 inverted index of a document's chunks (bm25.npz), for hybrid search.
+
+vector_worker writes one next to chunks.bin for every document.  It is plain
+numpy arrays in CSR layout, not a pickled rank_bm25 object:
+    terms    int64[T]    sorted term hashes (first 8 bytes of blake2b, as int64)
+    indptr   int64[T+1]  postings of terms[i] are postings[indptr[i]:indptr[i+1]]
+    postings int32[P]    chunk index
+    tf       float32[P]  term frequency in that chunk
+    lengths  int32[N]    tokens per chunk
+A query term is looked up with a binary search on terms, so scoring touches only
+the postings of the query's terms.
+
+Tokens are lower-cased runs of letters and digits, keeping hyphen/underscore joined
+identifiers whole: "PROJ-123" is the single token "proj-123", which is what makes
+Jira keys and acronyms rank well lexically when embeddings blur them.
+
+BM25 statistics (document frequency, average chunk length) are summed over every
+index being searched, so scores are comparable across a user's documents.
+merge_sparse_indexes() concatenates a corpus's per-document indexes into one, so
+an unfiltered search does one lookup per query term however many documents there are.
+"""
+import os
+import re
+import math
+import hashlib
+from collections import Counter
+
+import numpy as np
+
+SPARSE_INDEX_FILE = "bm25.npz"
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_][a-z0-9]+)*")
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+def term_hash(term):
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+class SparseIndex:
+    """Read side of bm25.npz.  A merged index also has ids: the vector id of each chunk."""
+
+    def __init__(self, terms, indptr, postings, tf, lengths, ids=None):
+        self.terms = terms
+        self.indptr = indptr
+        self.postings = postings
+        self.tf = tf
+        self.lengths = lengths
+        self.ids = ids
+        self.total_length = int(lengths.sum())
+
+    @property
+    def num_chunks(self):
+        return len(self.lengths)
+
+    @property
+    def nbytes(self):
+        arrays = (self.terms, self.indptr, self.postings, self.tf, self.lengths, self.ids)
+        return sum(a.nbytes for a in arrays if a is not None)
+
+    def lookup(self, term_hash_value):
+        """(chunk indexes, term frequencies) of one term; empty arrays if absent."""
+        i = int(np.searchsorted(self.terms, term_hash_value))
+        if i >= len(self.terms) or self.terms[i] != term_hash_value:
+            return self.postings[:0], self.tf[:0]
+        lo, hi = self.indptr[i], self.indptr[i + 1]
+        return self.postings[lo:hi], self.tf[lo:hi]
+
+
+def build_sparse_index(chunks):
+    """SparseIndex over a list of chunk texts."""
+    by_term = {}
+    lengths = np.zeros(len(chunks), dtype=np.int32)
+    for chunk_idx, chunk in enumerate(chunks):
+        tokens = tokenize(chunk)
+        lengths[chunk_idx] = len(tokens)
+        for term, count in Counter(tokens).items():
+            by_term.setdefault(term_hash(term), []).append((chunk_idx, count))
+
+    terms = np.array(sorted(by_term), dtype=np.int64)
+    indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+    postings, tf = [], []
+    for i, h in enumerate(terms):
+        entries = by_term[int(h)]
+        indptr[i + 1] = indptr[i] + len(entries)
+        postings.extend(c for c, _ in entries)
+        tf.extend(n for _, n in entries)
+    return SparseIndex(terms, indptr, np.array(postings, dtype=np.int32),
+                       np.array(tf, dtype=np.float32), lengths)
+
+
+def merge_sparse_indexes(indexes):
+    """
+    One SparseIndex over several.  indexes is a list of (first vector id, SparseIndex);
+    chunk c of an index becomes chunk number offset + c of the merged one, whose
+    ids[offset + c] is first vector id + c.
+    """
+    if not indexes:
+        empty = np.zeros(0, dtype=np.int64)
+        return SparseIndex(empty, np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32),
+                           np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int32), empty)
+    offsets = np.cumsum([0] + [index.num_chunks for _, index in indexes])
+    # one (term, chunk, tf) row per posting, then grouped by term (stable, so chunks stay sorted)
+    terms = np.concatenate([np.repeat(index.terms, np.diff(index.indptr)) for _, index in indexes])
+    postings = np.concatenate([index.postings.astype(np.int32) + np.int32(offset)
+                               for (_, index), offset in zip(indexes, offsets)])
+    tf = np.concatenate([index.tf for _, index in indexes])
+    order = np.argsort(terms, kind="stable")
+    terms, postings, tf = terms[order], postings[order], tf[order]
+
+    unique_terms, starts = np.unique(terms, return_index=True)
+    indptr = np.append(starts, len(terms)).astype(np.int64)
+    lengths = np.concatenate([index.lengths for _, index in indexes])
+    ids = np.concatenate([np.arange(first, first + index.num_chunks, dtype=np.int64) for first, index in indexes])
+    return SparseIndex(unique_terms, indptr, postings, tf, lengths, ids)
+
+
+def save_sparse_index(doc_dir, index):
+    path = os.path.join(doc_dir, SPARSE_INDEX_FILE)
+    with open(path + ".tmp", "wb") as f:
+        np.savez(f, terms=index.terms, indptr=index.indptr, postings=index.postings,
+                 tf=index.tf, lengths=index.lengths)
+    os.replace(path + ".tmp", path)
+
+
+def load_sparse_index(doc_dir):
+    """The document's SparseIndex, or None for stores written before them."""
+    path = os.path.join(doc_dir, SPARSE_INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return SparseIndex(data["terms"], data["indptr"], data["postings"], data["tf"], data["lengths"])
+
+
+def bm25_search(query, indexes, k):
+    """
+    Top k (key, chunk index, score) for query over several SparseIndexes, best first.
+    indexes is a list of (key, SparseIndex); document frequency and average chunk
+    length are taken over all of them.
+    """
+    hashes = [term_hash(t) for t in set(tokenize(query))]
+    if not hashes or not indexes:
+        return []
+    num_chunks = sum(index.num_chunks for _, index in indexes)
+    if num_chunks == 0:
+        return []
+    avg_length = max(sum(index.total_length for _, index in indexes) / num_chunks, 1.0)
+
+    # postings per term per index, and document frequency over all indexes
+    found = [[index.lookup(h) for h in hashes] for _, index in indexes]
+    df = [sum(len(found[i][t][0]) for i in range(len(indexes))) for t in range(len(hashes))]
+    idf = [math.log(1 + (num_chunks - n + 0.5) / (n + 0.5)) for n in df]
+
+    candidates = []
+    for (key, index), postings_by_term in zip(indexes, found):
+        scores = None
+        for t, (chunk_ids, tf) in enumerate(postings_by_term):
+            if len(chunk_ids) == 0:
+                continue
+            if scores is None:
+                scores = np.zeros(index.num_chunks, dtype=np.float32)
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * index.lengths[chunk_ids] / avg_length)
+            scores[chunk_ids] += idf[t] * tf * (BM25_K1 + 1) / (tf + norm)
+        if scores is None:
+            continue
+        top = np.flatnonzero(scores)
+        if len(top) > k:
+            top = top[np.argpartition(-scores[top], k - 1)[:k]]
+        candidates.extend((key, int(c), float(scores[c])) for c in top)
+
+    candidates.sort(key=lambda hit: -hit[2])
+    return candidates[:k]
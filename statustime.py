@@ -2,7 +2,7 @@ from datetime import datetime
 from collections import defaultdict
 from typing import List, Dict, Any, Tuple
 import statistics
-from my_utils import user_config_file, _CONFIG_DIR
+from my_utils import user_config_file, _CONFIG_DIR, resolve_short_urls
 
 def calculate_average_status_transition_time(jira_issues: List[Any]) -> Dict[Tuple[str, str], Dict[str, Any]]:
     """
@@ -815,7 +815,7 @@ for chain_str, data in sorted_chains:
     jql = jql.rstrip(",") + ") order by key asc"
 
     from my_utils import *
-    hyperlink = make_hyperlink_formula(f"{JIRA_URL}/issues/?jql={jql}", f"{data['count']}") + " || "
+    hyperlink = make_hyperlink_formula(f"{JIRA_URL}/issues/?jql={jql}", f"{data['count']}", defer=True) + " || "
     changes_list.append(f"{get_column_letter(excel_col + 6)}{r} =  {hyperlink} || ")
 
     r += 1
@@ -924,7 +924,7 @@ for (from_status, to_status), data in sorted_transitions:
     jql = jql.rstrip(",") + ")"
 
     from my_utils import *
-    hyperlink = make_hyperlink_formula(f"{JIRA_URL}/issues/?jql={jql}", f"{data['count']}") + " || "
+    hyperlink = make_hyperlink_formula(f"{JIRA_URL}/issues/?jql={jql}", f"{data['count']}", defer=True) + " || "
     changes_list.append(f"{get_column_letter(excel_col + 7)}{r} =  {hyperlink} || ")
     #changes_list.append(f"{get_column_letter(excel_col + 4)}{r} = INSERT {data['count']} issues || ")
     
@@ -954,6 +954,7 @@ changes_file = yaml_file.replace("scope.yaml","import.changes.txt")
 print(f"Writing changes to {changes_file}")
 
 if changes_list:
+    changes_list = resolve_short_urls(changes_list)   # shorten deferred long JQL links in one batch
     with open(changes_file, "w") as f:
         for entry in changes_list:
             if "||None" in entry:
@@ -19,6 +19,18 @@ Partition granularity is controlled by config["partition_by"]:
 
 Changing partition_by invalidates existing files. A warning is logged and the
 manifest is reset so next run rebuilds from the lookback window.
+
+Syncs are incremental.  The manifest keeps a high-water mark per chat, the
+createdDateTime of the newest message written ("last_message_at"), and the newest
+message seen ("last_seen_at"; later for chats still under min_messages, which are
+re-read from last_message_at until they qualify).  The chat list is fetched with
+each chat's lastMessagePreview, so chats with nothing newer than last_seen_at are
+not read at all.  The remaining chats are read concurrently
+("max_workers" threads), and each asks Graph only for messages modified after its
+mark.  All requests share one rate budget ("requests_per_second"), and a 429 pauses
+every worker for its Retry-After.  Graph has no delta query for 1:1/group chats,
+and getAllMessages needs application permissions, so this is the delegated
+(Chat.Read) equivalent.
 """
 
 import json
@@ -26,7 +38,9 @@ import logging
 import os
 import re
 import time
+import threading
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
 import requests
@@ -46,6 +60,8 @@ DEFAULT_CONFIG = {
     "include_one_on_one": True,
     "min_messages": 1,
     "output_subdir": "teams",
+    "max_workers": 8,             # chats fetched concurrently
+    "requests_per_second": 10,    # Graph request budget shared by all workers
 }
 
 
@@ -134,14 +150,41 @@ def _check_partition_change(manifest: dict, cfg: dict) -> bool:
 # Graph API helpers
 # ---------------------------------------------------------------------------
 
-def _get(url: str, token: str, params: dict = None, retries: int = 3) -> dict:
+class _GraphBudget:
+    """Request budget shared by the fetch workers of one sync: at most
+    requests_per_second requests are started, and a 429 pauses all of them."""
+
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, seconds: float):
+        with self.lock:
+            self.next_slot = max(self.next_slot, time.monotonic() + seconds)
+
+
+def _get(url: str, token: str, params: dict = None, retries: int = 3, budget: _GraphBudget = None) -> dict:
     headers = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
     for attempt in range(retries):
+        if budget:
+            budget.wait()
         resp = requests.get(url, headers=headers, params=params, timeout=30)
         if resp.status_code == 429:
             wait = int(resp.headers.get("Retry-After", 10))
             logger.warning("Graph API rate-limited, waiting %ds", wait)
-            time.sleep(wait)
+            if budget:
+                budget.pause(wait)
+            else:
+                time.sleep(wait)
             continue
         if not resp.ok:
             logger.error("Graph API %s %s — %s", resp.status_code, url, resp.text)
@@ -150,11 +193,11 @@ def _get(url: str, token: str, params: dict = None, retries: int = 3) -> dict:
     raise RuntimeError(f"Graph API request failed after {retries} retries: {url}")
 
 
-def _paginate(url: str, token: str, params: dict = None) -> list:
+def _paginate(url: str, token: str, params: dict = None, budget: _GraphBudget = None) -> list:
     results = []
     next_url = url
     while next_url:
-        data = _get(next_url, token, params=params if next_url == url else None)
+        data = _get(next_url, token, params=params if next_url == url else None, budget=budget)
         results.extend(data.get("value", []))
         next_url = data.get("@odata.nextLink")
     return results
@@ -164,10 +207,14 @@ def _paginate(url: str, token: str, params: dict = None) -> list:
 # Graph fetch
 # ---------------------------------------------------------------------------
 
-def _fetch_chats(token: str, cfg: dict) -> list:
+def _fetch_chats(token: str, cfg: dict, budget: _GraphBudget = None) -> list:
     url = f"{GRAPH_BASE}/me/chats"
-    params = {"$expand": "members", "$top": "50"}
-    chats = _paginate(url, token, params)
+    try:
+        chats = _paginate(url, token, {"$expand": "members,lastMessagePreview", "$top": "50"}, budget)
+    except requests.HTTPError as e:
+        # without the preview every chat is read, as before
+        logger.warning("Chat list with lastMessagePreview failed (%s), listing without it", e)
+        chats = _paginate(url, token, {"$expand": "members", "$top": "50"}, budget)
 
     filtered = []
     for chat in chats:
@@ -182,20 +229,41 @@ def _fetch_chats(token: str, cfg: dict) -> list:
     return filtered
 
 
-def _fetch_messages(token: str, chat_id: str, since_iso: str = None) -> list:
+def _has_new_messages(chat: dict, since_iso: str = None) -> bool:
+    """False only when the chat's lastMessagePreview shows nothing after since_iso."""
+    preview = chat.get("lastMessagePreview") or {}
+    last = preview.get("createdDateTime")
+    return not (since_iso and last and last <= since_iso)
+
+
+def _fetch_messages(token: str, chat_id: str, since_iso: str = None, budget: _GraphBudget = None):
     """
-    Fetch messages newest-first and stop early when we reach messages older
-    than since_iso. Graph API does not support $filter on createdDateTime.
+    Messages created after since_iso, and the createdDateTime of the newest message
+    seen (the chat's new high-water mark).  Graph can only filter on
+    lastModifiedDateTime, which is never earlier than createdDateTime, so the
+    server-side filter returns a superset and messages edited after the mark but
+    created before it are dropped here.  Without since_iso (or if the filter is
+    rejected) messages are paged newest-first until since_iso is reached.
     """
     url = f"{GRAPH_BASE}/me/chats/{chat_id}/messages"
     params = {"$top": "50"}
+    if since_iso:
+        params = {"$top": "50", "$orderby": "lastModifiedDateTime desc",
+                  "$filter": f"lastModifiedDateTime gt {since_iso}"}
 
     results = []
     next_url = url
     while next_url:
-        data = _get(next_url, token, params=params if next_url == url else None)
+        try:
+            data = _get(next_url, token, params=params if next_url == url else None, budget=budget)
+        except requests.HTTPError as e:
+            if "$filter" not in params or next_url != url:
+                raise
+            logger.warning("Filtered message list failed for chat %s (%s), paging newest-first", chat_id, e)
+            params = {"$top": "50"}
+            continue
         page = data.get("value", [])
-        if since_iso:
+        if since_iso and "$filter" not in params:
             for msg in page:
                 if msg.get("createdDateTime", "") <= since_iso:
                     next_url = None  # stop pagination
@@ -206,12 +274,16 @@ def _fetch_messages(token: str, chat_id: str, since_iso: str = None) -> list:
         if next_url:
             next_url = data.get("@odata.nextLink")
 
-    return [
+    if since_iso:
+        results = [m for m in results if m.get("createdDateTime", "") > since_iso]
+    high_water = max((m.get("createdDateTime", "") for m in results), default=since_iso)
+    messages = [
         m for m in results
         if m.get("messageType") == "message"
         and not m.get("deletedDateTime")
         and _extract_body(m).strip()
     ]
+    return messages, high_water
 
 
 # ---------------------------------------------------------------------------
@@ -319,49 +391,85 @@ def fetch_and_save_teams_chats(token: str, userlogin: str, cfg: dict = None) ->
         cutoff_dt -= timedelta(days=cfg["lookback_days"])
         lookback_cutoff = cutoff_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
 
-    chats = _fetch_chats(token, cfg)
+    budget = _GraphBudget(cfg.get("requests_per_second", DEFAULT_CONFIG["requests_per_second"]))
+    chats = _fetch_chats(token, cfg, budget)
     stats = {
         "total_chats": len(chats),
         "new_messages": 0,
         "partitions_updated": 0,
         "skipped_chats": 0,
+        "unchanged_chats": 0,
+        "failed_chats": 0,
         "output_dir": teams_dir,
         "partition_by": partition_by,
-        "updated_partitions": {},   # key → {filename, filepath} for caller to embed
+        "updated_partitions": {},   # key → {filename, filepath, appended_from, ...} for caller to embed
     }
 
-    # Collect new messages per chat, then bucket by partition key
+    # High-water mark per chat (stores written before it have last_fetched_at only)
+    since_by_chat, seen_by_chat = {}, {}
+    for chat in chats:
+        prev = manifest["chats"].get(chat["id"], {})
+        since = prev.get("last_message_at") or prev.get("last_fetched_at") or lookback_cutoff
+        since_by_chat[chat["id"]] = since
+        seen_by_chat[chat["id"]] = max(filter(None, (since, prev.get("last_seen_at"))), default=None)
+
+    # Fetch new messages of the chats that have any, concurrently
+    to_fetch = [c for c in chats if _has_new_messages(c, seen_by_chat[c["id"]])]
+    stats["unchanged_chats"] = len(chats) - len(to_fetch)
+
+    def fetch(chat):
+        try:
+            return _fetch_messages(token, chat["id"], since_by_chat[chat["id"]], budget)
+        except Exception as e:
+            # the chat keeps its mark and is fetched again on the next sync
+            logger.error("Fetching messages of chat %s failed: %s", chat["id"], e)
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, cfg.get("max_workers", 1))) as pool:
+        fetched = dict(zip([c["id"] for c in to_fetch], pool.map(fetch, to_fetch)))
+    logger.info("Fetched %d of %d chats (%d unchanged since last sync)",
+                len(to_fetch), len(chats), stats["unchanged_chats"])
+
+    # Bucket new messages by partition key, in chat list order
     # Structure: {partition_key: [(chat, [messages])]}
     buckets: dict[str, list] = defaultdict(list)
 
     for chat in chats:
         chat_id = chat["id"]
         prev = manifest["chats"].get(chat_id, {})
-        since = prev.get("last_fetched_at") or lookback_cutoff
-
-        messages = _fetch_messages(token, chat_id, since_iso=since)
-
-        existing_count = prev.get("message_count", 0)
-        if not messages:
-            if existing_count < cfg["min_messages"]:
-                stats["skipped_chats"] += 1
+        result = fetched.get(chat_id)
+        if chat_id in fetched and result is None:
+            stats["failed_chats"] += 1
             continue
+        messages, high_water = result if result else ([], None)
 
+        existing_count = prev.get("message_count", 0)
         if existing_count + len(messages) < cfg["min_messages"]:
             stats["skipped_chats"] += 1
+            if chat_id in fetched:
+                # nothing written: keep the mark so these messages are fetched again
+                # (and written) once the chat reaches min_messages; last_seen_at only
+                # spares re-reading it while nothing new arrives
+                manifest["chats"][chat_id] = {**prev, "last_seen_at": high_water}
             continue
 
-        # Bucket messages by their partition key
-        per_partition: dict[str, list] = defaultdict(list)
-        for msg in messages:
-            ts = msg.get("createdDateTime", "")
-            if ts:
-                key = _partition_key_from_iso(ts, partition_by)
-                per_partition[key].append(msg)
+        if messages:
+            # Bucket messages by their partition key
+            per_partition: dict[str, list] = defaultdict(list)
+            for msg in messages:
+                ts = msg.get("createdDateTime", "")
+                if ts:
+                    key = _partition_key_from_iso(ts, partition_by)
+                    per_partition[key].append(msg)
 
-        for key, msgs in per_partition.items():
-            buckets[key].append((chat, msgs))
+            for key, msgs in per_partition.items():
+                buckets[key].append((chat, msgs))
+            stats["new_messages"] += len(messages)
 
+        if chat_id not in fetched:
+            continue
+        # the new mark is kept even when only system events/deleted messages came back,
+        # otherwise lastMessagePreview stays newer than it and the chat is re-read every sync
         now_iso = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
         manifest["chats"][chat_id] = {
             "topic": chat.get("topic") or "",
@@ -370,14 +478,16 @@ def fetch_and_save_teams_chats(token: str, userlogin: str, cfg: dict = None) ->
             "created": chat.get("createdDateTime", ""),
             "message_count": existing_count + len(messages),
             "last_fetched_at": now_iso,
+            "last_message_at": high_water or prev.get("last_message_at"),
+            "last_seen_at": high_water or prev.get("last_seen_at"),
         }
-        stats["new_messages"] += len(messages)
 
     # Write partition files
     now_label = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
     for key, chat_message_pairs in buckets.items():
         filename = _partition_filename(key)
         filepath = os.path.join(teams_dir, filename)
+        size_before = os.path.getsize(filepath) if os.path.exists(filepath) else 0
 
         with open(filepath, "a", encoding="utf-8") as f:
             f.write(f"\n\n{'#' * 72}\n")
@@ -390,9 +500,12 @@ def fetch_and_save_teams_chats(token: str, userlogin: str, cfg: dict = None) ->
             "filename": filename,
             "filepath": filepath,
             "last_updated": now_label,
+            "size": os.path.getsize(filepath),
+            "new_messages": sum(len(messages) for _, messages in chat_message_pairs),
         }
         manifest["partitions"][key] = partition_entry
-        stats["updated_partitions"][key] = partition_entry
+        # appended_from lets the embedder read only this run's block (embed_local_file)
+        stats["updated_partitions"][key] = {**partition_entry, "appended_from": size_before}
         stats["partitions_updated"] += 1
         logger.info("Wrote %d chat(s) to %s", len(chat_message_pairs), filename)
 
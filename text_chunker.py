@@ -0,0 +1,135 @@
+# text_chunker.py
+"""
+Shared structure-aware chunker for vector_worker and vectorize.py.
+
+Input is line-structured text: one block per line, as produced by
+vector_worker.extract_text_from_html (headings as "#"-prefixed lines, table rows
+as "a | b | c") or a plain/markdown local file.  Lines without any word character
+(separator rules) are dropped.  Blocks are packed into chunks of at most
+CHUNK_MAX_TOKENS tokens without cutting through a paragraph, sentence or table
+row unless a single one is over budget.  Each heading starts a new
+section; its heading line is repeated at the top of every chunk of the section
+and consecutive chunks of a section share about CHUNK_OVERLAP_TOKENS tokens.
+
+Tokens are estimated as words plus punctuation marks, which is close to (and a
+little under) the word-piece count of the sentence-transformers models; the
+default budget keeps chunks inside all-MiniLM-L6-v2's 256-token window, so no
+chunk text is silently truncated by the embedder.
+
+Sections are chunked independently, and each chunk's id is a hash of its section
+heading and text, so editing one section leaves the chunks and ids of the others
+unchanged (their embeddings then come straight from embedding_cache).
+"""
+import os
+import re
+import hashlib
+from typing import Callable, List, Tuple
+
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "200"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "30"))
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_HEADING_RE = re.compile(r"^#{1,6}\s+\S")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"\w")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(_TOKEN_RE.findall(text))
+
+
+def _sections(text: str) -> List[Tuple[str, List[str]]]:
+    """[(heading line or "", [block lines])] in document order."""
+    sections = [("", [])]
+    for line in text.splitlines():
+        line = line.strip()
+        if not _WORD_RE.search(line):
+            continue    # blank, or a rule/separator line ("-----", "#####", "|---|---|")
+        if _HEADING_RE.match(line):
+            sections.append((line, []))
+        else:
+            sections[-1][1].append(line)
+    return [(heading, blocks) for heading, blocks in sections if heading or blocks]
+
+
+def _pieces(block: str, budget: int, count_tokens: Callable[[str], int]) -> List[str]:
+    """A block as pieces of at most budget tokens: whole, else by sentence, else by word."""
+    if count_tokens(block) <= budget:
+        return [block]
+    pieces = []
+    for sentence in _SENTENCE_RE.split(block):
+        if count_tokens(sentence) <= budget:
+            pieces.append(sentence)
+            continue
+        current, current_tokens = [], 0
+        for word in sentence.split():
+            tokens = count_tokens(word)
+            if current and current_tokens + tokens > budget:
+                pieces.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(word)
+            current_tokens += tokens
+        if current:
+            pieces.append(" ".join(current))
+    return pieces
+
+
+def _overlap(pieces: List[str], limit: int, count_tokens: Callable[[str], int]) -> List[str]:
+    """The tail of a chunk's pieces, at most limit tokens, to start the next chunk with:
+    whole trailing pieces, then the last words of the first piece that doesn't fit."""
+    carried, carried_tokens = [], 0
+    for piece in reversed(pieces):
+        piece_tokens = count_tokens(piece)
+        if carried_tokens + piece_tokens <= limit:
+            carried.insert(0, piece)
+            carried_tokens += piece_tokens
+            continue
+        words = []
+        for word in reversed(piece.split()):
+            word_tokens = count_tokens(word)
+            if carried_tokens + word_tokens > limit:
+                break
+            words.insert(0, word)
+            carried_tokens += word_tokens
+        if words:
+            carried.insert(0, " ".join(words))
+        break
+    return carried
+
+
+def _pack(heading: str, blocks: List[str], max_tokens: int, overlap_tokens: int,
+          count_tokens: Callable[[str], int]) -> List[str]:
+    heading_tokens = count_tokens(heading) if heading else 0
+    budget = max(max_tokens - heading_tokens, 1)
+    pieces = [p for block in blocks for p in _pieces(block, budget, count_tokens)]
+    if not pieces:
+        return []   # heading with nothing under it
+
+    chunks, current, current_tokens = [], [], 0
+    for piece in pieces:
+        tokens = count_tokens(piece)
+        if current and current_tokens + tokens > budget:
+            chunks.append(current)
+            current = _overlap(current, min(overlap_tokens, budget - tokens), count_tokens)
+            current_tokens = sum(count_tokens(p) for p in current)
+        current.append(piece)
+        current_tokens += tokens
+    chunks.append(current)
+
+    prefix = [heading] if heading else []
+    return ["\n".join(prefix + chunk) for chunk in chunks]
+
+
+def chunk_document(text: str, max_tokens: int = CHUNK_MAX_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+                   count_tokens: Callable[[str], int] = estimate_tokens) -> List[Tuple[str, str]]:
+    """Split text into [(chunk id, chunk text)], see the module docstring."""
+    chunks, seen = [], {}
+    for heading, blocks in _sections(text):
+        for chunk in _pack(heading, blocks, max_tokens, overlap_tokens, count_tokens):
+            chunk_id = hashlib.sha1(f"{heading}\x00{chunk}".encode("utf-8")).hexdigest()[:16]
+            # identical chunks (repeated boilerplate) get distinct, still stable, ids
+            seen[chunk_id] = seen.get(chunk_id, 0) + 1
+            if seen[chunk_id] > 1:
+                chunk_id = f"{chunk_id}-{seen[chunk_id]}"
+            chunks.append((chunk_id, chunk))
+    return chunks
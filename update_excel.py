@@ -108,6 +108,7 @@ def convert_row_col_to_excel_coordinate(row, col):
 import httplib2
 from google_auth_httplib2 import AuthorizedHttp
 from google_oauth import *
+from google_sheets import read_google_grid, SheetGrid
 
 _GOOGLE_API_TIMEOUT = 30  # seconds
 
@@ -115,64 +116,72 @@ _GOOGLE_API_TIMEOUT = 30  # seconds
 # this var name is misleading and i need to fix it.
 def read_google_rows(googlelogin, spreadsheet_url_or_id, sheet_name=None):
     """
-    Reads all rows from a Google Sheet, returns as list of lists.
+    Reads the used range of a Google Sheet tab, returns as list of lists.
     sheet_name: name of the sheet; defaults to first sheet if None.
     """
-    # Extract spreadsheet ID if URL is given
-    match = re.search(r"/spreadsheets/d/([a-zA-Z0-9-_]+)", spreadsheet_url_or_id)
-    spreadsheet_id = match.group(1) if match else spreadsheet_url_or_id.strip()
-
-    # Load user's saved credentials
-    creds = load_google_token(googlelogin)
-    if not creds or not creds.valid:
-        raise Exception(f"❌ User {googlelogin} not logged in to Google Drive")
-
-    http = AuthorizedHttp(creds, http=httplib2.Http(timeout=_GOOGLE_API_TIMEOUT))
-    service = build("sheets", "v4", http=http)
-
-    # If no sheet_name provided, get the first sheet
-    if sheet_name is None:
-        metadata = service.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
-        sheet_name = metadata["sheets"][0]["properties"]["title"]
-
-    print(f"Reading Google Sheet ID={spreadsheet_id}, sheet='{sheet_name}' for user={googlelogin}")
-    result = service.spreadsheets().values().get(
-        spreadsheetId=spreadsheet_id,
-        range=sheet_name
-    ).execute()
-
-    return result.get("values", [])
+    return read_google_grid(googlelogin, spreadsheet_url_or_id, sheet_name).rows
 
 
 def read_google_sheet_as_openpyxl(spreadsheet_url_or_id, sheet_name, userlogin="default"):
     """
-    Read a Google Sheet and return an openpyxl-compatible worksheet object.
-    Uses existing read_google_rows() function for authentication and data retrieval.
-    
+    Read a Google Sheet tab and return a worksheet-like SheetGrid (see google_sheets.py).
+    It supports the parts of the openpyxl Worksheet API used here (iter_rows, cell,
+    .value/.row/.column/.coordinate) without building a Workbook cell by cell.
+
     Args:
         spreadsheet_url_or_id: Google Sheet ID or full URL
         sheet_name: Name of the worksheet/tab
-        userlogin: Google credentials identifier (passed to read_google_rows)
-    
+        userlogin: Google credentials identifier
+
     Returns:
-        openpyxl Worksheet object
+        SheetGrid
     """
-    from openpyxl import Workbook
-    
-    # Use your existing function to get the data
-    all_values = read_google_rows(userlogin, spreadsheet_url_or_id, sheet_name)
-    
-    # Create openpyxl workbook and worksheet
-    wb = Workbook()
-    ws = wb.active
-    ws.title = sheet_name
-    
-    # Populate the worksheet with data from Google Sheets
-    for row_idx, row_data in enumerate(all_values, start=1):
-        for col_idx, value in enumerate(row_data, start=1):
-            ws.cell(row=row_idx, column=col_idx, value=value)
-    
-    return ws
+    return read_google_grid(userlogin, spreadsheet_url_or_id, sheet_name)
+
+
+
+def is_table_header(value, table_name):
+    """True if a cell value is the '<table name> <jira> ...' tag for table_name."""
+    cleaned_value = str(value).strip().replace(" ", "_")
+    return "<jira>" in cleaned_value and cleaned_value.split("<jira>")[0].strip("_") == table_name
+
+
+def read_table_region(filename, worksheet, table_name, field_index_map):
+    """
+    Phase 1 for local workbooks: stream the sheet in read-only, values-only mode and keep
+    only the rows from the table's <jira> header down, and only the columns the table uses.
+    Returns a SheetGrid starting at the header row (empty grid if the table isn't found),
+    which process_jira_table_blocks() then diffs against jira.csv cell by cell.
+    A large workbook is never fully materialized as openpyxl Cell objects.
+    """
+    width = max(field_index_map.values()) + 1 if field_index_map else 0
+    wb = load_workbook(filename, read_only=True)
+    try:
+        ws = wb[worksheet]
+        rows = []
+        first_row = None
+        for row_idx, values in enumerate(ws.iter_rows(values_only=True), start=1):
+            if first_row is None:
+                for col_idx, value in enumerate(values, start=1):
+                    if value is not None and is_table_header(value, table_name):
+                        print(f"Found table header '{table_name}' at row {row_idx} col {col_idx} (streaming scan)")
+                        first_row = row_idx
+                        width = max(width, col_idx)
+                        break
+                if first_row is None:
+                    continue
+            rows.append(list(values[:width]))
+    finally:
+        wb.close()
+
+    if first_row is None:
+        print(f"Table '{table_name}' not found in {filename} sheet '{worksheet}'")
+        return SheetGrid(worksheet, [])
+
+    grid = SheetGrid(worksheet, rows, first_row=first_row)
+    grid.max_column = max(grid.max_column, width)
+    print(f"Loaded rows {first_row}-{grid.max_row} x {grid.max_column} cols for table '{table_name}'")
+    return grid
 
 
 def extract_jira_id(hyperlink_str: str) -> str:
@@ -218,8 +227,9 @@ def process_jira_table_blocks(filename, worksheet, userlogin):
         ws = read_google_sheet_as_openpyxl(filename, worksheet, userlogin)
 
     else:
-        wb = load_workbook(filename)
-        ws = wb[worksheet]
+        # read-only streaming scan; cell writes below only feed change_list (the workbook
+        # itself is never saved here, update_sharepoint.py applies changes.txt)
+        ws = read_table_region(filename, worksheet, file_info["table"], field_index_map)
 
     printing = False  # Flag to track when we're in a Jira Table block
     printing_import_mode = False # flag to track when we're in a jira table block in import mode
@@ -245,10 +255,8 @@ def process_jira_table_blocks(filename, worksheet, userlogin):
 
         for cell in row:
             #print(f"Processing cell {cell.coordinate}: {cell.value}")
-            cleaned_value = str(cell.value).strip().replace(" ", "_")
-            #print(f"Cleaned cell value: {cleaned_value}" + f" | file_info['table']: {file_info['table']}")
             #if file_info["table"] in str(cell).strip().replace(" ", "_"):
-            if "<jira>" in cleaned_value and cleaned_value.split("<jira>")[0].strip("_") == file_info["table"]:
+            if is_table_header(cell.value, file_info["table"]):
                 print(f"Found table header '{file_info['table']}' in cell {cell.coordinate}")
                 printing = True
                 table_row = cell.row
@@ -7,6 +7,7 @@ from collections import defaultdict
 from urllib.parse import unquote
 from dotenv import load_dotenv
 from google_oauth import load_google_token, get_google_drive_filename
+from google_services import get_google_service
 from my_utils import user_config_file, _CONFIG_DIR
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
@@ -304,16 +305,10 @@ def execute_all_updates(service, spreadsheet_id, value_data, format_requests):
 # MAIN LOGIC
 # -------------------------------
 
-# Load Google credentials
-creds = load_google_token(userlogin)
-if not creds or not creds.valid:
-    raise Exception(f"❌ User {userlogin} not logged in to Google. Please authenticate first.")
-
+# Google Sheets service (credentials loaded/refreshed by google_services.py, raises if not logged in)
+service = get_google_service(userlogin, "sheets", "v4")
 print(f"✅ Loaded valid Google credentials for user={userlogin}")
 
-# Build Google Sheets service
-service = build('sheets', 'v4', credentials=creds)
-
 # Extract sheet ID from URL
 file_url = unquote(file_url)
 spreadsheet_id = extract_sheet_id(file_url)
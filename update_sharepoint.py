@@ -13,6 +13,7 @@ import re
 from dotenv import load_dotenv
 import time
 from my_utils import user_config_file, _CONFIG_DIR
+from msal_cache import get_token_cache, get_msal_app
 
 # -------------------------------
 # Config from environment variables
@@ -25,57 +26,40 @@ CLIENT_ID = os.environ["CLIENT_ID"]
 CLIENT_SECRET = os.environ["CLIENT_SECRET"]
 TENANT_ID = os.environ["TENANT_ID"]
 AUTHORITY = f"https://login.microsoftonline.com/{TENANT_ID}"
-TOKEN_CACHE_FILE = os.path.join(_CONFIG_DIR, "token_cache.json")
 
 # -------------------------------
-# Token cache functions
+# Token cache functions (Redis-backed and shared with appnew, see msal_cache.py)
 # -------------------------------
 def load_cache(userlogin=None):
-    global TOKEN_CACHE_FILE
-    if userlogin:
-        TOKEN_CACHE_FILE = user_config_file(userlogin, "token_cache.json")
-    
-    cache = msal.SerializableTokenCache()
-    if os.path.exists(TOKEN_CACHE_FILE):
-        cache.deserialize(open(TOKEN_CACHE_FILE, "r").read())
-        print(f"Loaded cache from '{TOKEN_CACHE_FILE}'")
-    return cache
+    return get_token_cache(userlogin)
 
 def save_cache(cache, userlogin=None):
-    if cache.has_state_changed:
-        global TOKEN_CACHE_FILE
-        if userlogin:
-            TOKEN_CACHE_FILE = user_config_file(userlogin, "token_cache.json")
-        open(TOKEN_CACHE_FILE, "w").write(cache.serialize())
+    cache.save()
 
 def get_app_token_delegated(userlogin):
     print(f"🔑 Acquiring delegated user token for user={userlogin}")
     cache = load_cache(userlogin)
     
-    cca = msal.ConfidentialClientApplication(
-        CLIENT_ID,
-        authority=AUTHORITY,
-        client_credential=CLIENT_SECRET,
-        token_cache=cache
-    )
+    cca = get_msal_app(CLIENT_ID, CLIENT_SECRET, AUTHORITY, cache)
     
     accounts = cca.get_accounts()
     if accounts:
         result = cca.acquire_token_silent(SCOPES, account=accounts[0])
         if result and "access_token" in result:
             print("✅ Using cached user token")
+            save_cache(cache, userlogin)
             return result["access_token"]
     
     raise Exception("❌ No cached user token found. Please log in first.")
 
 def get_app_token():
     authority = f"https://login.microsoftonline.com/{TENANT_ID}"
-    cca = msal.ConfidentialClientApplication(
-        CLIENT_ID, authority=authority, client_credential=CLIENT_SECRET
-    )
+    cache = load_cache()
+    cca = get_msal_app(CLIENT_ID, CLIENT_SECRET, authority, cache)
     result = cca.acquire_token_for_client(scopes=SCOPES)
     if "access_token" not in result:
         raise Exception(f"Failed to get token: {result}")
+    save_cache(cache)
     return result["access_token"]
 
 # -------------------------------
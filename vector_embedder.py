@@ -1,12 +1,25 @@
 """
 Embedding strategies for vector generation.
 Configure via environment variable: EMBEDDER_TYPE=sentence_transformer|openai
+
+get_embedder() returns one shared embedder per process, so the model is loaded
+once and not per VectorRetriever.  Calls to encode() from concurrent threads
+(gunicorn request threads, batched RAG lookups) are merged into micro-batches:
+whatever is queued while the model is busy goes into the next batch, and under
+load the batcher waits up to EMBED_BATCH_WAIT_MS for more, up to EMBED_MAX_BATCH
+texts per model call.
 """
 import os
+import time
+import queue
+import threading
 import numpy as np
 from abc import ABC, abstractmethod
 from typing import List
 
+EMBED_BATCH_WAIT_MS = float(os.getenv("EMBED_BATCH_WAIT_MS", "5"))
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "64"))
+
 
 class EmbedderInterface(ABC):
     """Abstract base class for embedding strategies."""
@@ -113,20 +126,118 @@ class CohereEmbedder(EmbedderInterface):
         return f"cohere:{self.model}"
 
 
+class _EncodeRequest:
+    __slots__ = ("texts", "result", "error", "done")
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class BatchingEmbedder(EmbedderInterface):
+    """Shares one embedder between threads, merging concurrent encode() calls into micro-batches."""
+
+    def __init__(self, embedder: EmbedderInterface,
+                 max_wait_ms: float = EMBED_BATCH_WAIT_MS, max_batch: int = EMBED_MAX_BATCH):
+        self.embedder = embedder
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._pid = None          # batcher thread is (re)started lazily, also after a fork
+        self._queue = None
+        self._busy = False        # last batch held more than one request, so wait for company
+
+    def _ensure_thread(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, name="embed-batcher", daemon=True).start()
+                self._pid = os.getpid()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.get_dimension()), dtype=np.float32)
+        self._ensure_thread()
+        request = _EncodeRequest(texts)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        size = len(batch[0].texts)
+        deadline = time.monotonic() + (self.max_wait if self._busy else 0)
+        while size < self.max_batch:
+            try:
+                # take whatever queued up while the model was busy; wait only under load
+                timeout = deadline - time.monotonic()
+                request = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.texts)
+        self._busy = len(batch) > 1
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                vectors = np.asarray(self.embedder.encode([t for r in batch for t in r.texts]))
+                start = 0
+                for request in batch:
+                    request.result = vectors[start:start + len(request.texts)]
+                    start += len(request.texts)
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            finally:
+                for request in batch:
+                    request.done.set()
+
+    def get_dimension(self) -> int:
+        return self.embedder.get_dimension()
+
+    def get_name(self) -> str:
+        return self.embedder.get_name()
+
+
+_embedders = {}
+_embedders_lock = threading.Lock()
+
+
 def get_embedder() -> EmbedderInterface:
     """
-    Factory function to get the configured embedder.
+    Get the configured embedder, shared by every caller in this process.
     
     Environment variables:
         EMBEDDER_TYPE: sentence_transformer|openai|cohere (default: sentence_transformer)
         EMBEDDER_MODEL: Specific model name (optional)
     
     Returns:
-        Configured embedder instance
+        Configured embedder instance (micro-batching wrapper, loaded once)
     """
     embedder_type = os.getenv("EMBEDDER_TYPE", "sentence_transformer").lower()
     model_name = os.getenv("EMBEDDER_MODEL")
-    
+    key = (embedder_type, model_name)
+
+    with _embedders_lock:
+        embedder = _embedders.get(key)
+        if embedder is None:
+            embedder = BatchingEmbedder(_create_embedder(embedder_type, model_name))
+            _embedders[key] = embedder
+    return embedder
+
+
+def _create_embedder(embedder_type: str, model_name: str) -> EmbedderInterface:
+    """Build a new embedder of the given type (loads the model)."""
     if embedder_type == "sentence_transformer":
         model = model_name or "all-MiniLM-L6-v2"
         return SentenceTransformerEmbedder(model)
@@ -0,0 +1,189 @@
+# vector_gc.py
+"""
+Garbage collection and compaction of users' vector stores.
+
+Removing a document (prune_orphaned_docs / remove_docslist in appnew, scope's
+orphan cleanup) deletes its directory, corpus ids and Redis url state one step
+at a time; when a step fails or is skipped, leftovers stay behind and every
+query keeps paying for them.  compact_user_store() reconciles the three sources
+for one user:
+
+    docs.json          the documents the user still has
+    config/<user>/vectors/   one directory per vectorized document, plus corpus.*
+    Redis db 2         user:<user>:url:<url> state kept by vector_worker
+
+A document is live if its url is in docs.json, or if it is a local file (Teams
+chat partitions, embedded by vector_worker.embed_local_file) that still exists.
+Everything else is deleted: corpus entries (the index is rebuilt when that
+leaves dead or stray ids), document directories not touched for GC_GRACE_HOURS
+(so a store being written right now is never collected), and Redis url states.
+
+The embed worker runs it for every user (vector_worker.compact_vector_stores,
+queued by scheduler.py every VECTOR_GC_HOURS); `python vector_gc.py [user ...]`
+runs it by hand, with --dry-run to only report.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+
+import redis
+
+from my_utils import _CONFIG_DIR
+from redis_state import r, redis_key
+from vector_index import (
+    CORPUS_INDEX_FILE, CORPUS_LOCK_FILE, CORPUS_TABLE_FILE, compact_corpus, read_manifest, safe_dir_name,
+)
+
+GC_GRACE_HOURS = float(os.getenv("GC_GRACE_HOURS", "6"))
+_CORPUS_FILES = (CORPUS_INDEX_FILE, CORPUS_TABLE_FILE, CORPUS_LOCK_FILE)
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _last_modified(path):
+    latest = os.path.getmtime(path)
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                latest = max(latest, os.path.getmtime(os.path.join(root, name)))
+            except OSError:
+                pass
+    return latest
+
+
+def docs_json_urls(user_dir):
+    """Urls in the user's docs.json, or None when it is missing or unreadable (then
+    nothing is collected: an empty set would mean deleting every document)."""
+    path = os.path.join(user_dir, "docs.json")
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not read {path}: {e}")
+        return None
+    return {entry["url"] for entry in data.get("docs", []) if entry.get("url")}
+
+
+def _is_live(url, source_type, live_urls):
+    if url in live_urls:
+        return True
+    if source_type == "local_file" or os.path.isabs(url):
+        return os.path.exists(url)
+    return False
+
+
+def _dir_url(doc_dir):
+    """(url, source type) recorded in a document directory's metadata.json, or (None, None)."""
+    try:
+        with open(os.path.join(doc_dir, "metadata.json"), "r") as f:
+            metadata = json.load(f)
+        return metadata.get("url"), metadata.get("source_type")
+    except (OSError, ValueError):
+        return None, None
+
+
+def compact_user_store(user_id, config_dir=_CONFIG_DIR, dry_run=False):
+    """Reconcile one user's docs.json, vectors directory and Redis url states (see
+    the module docstring).  Returns a report dict, or None if the user has no docs.json."""
+    user_dir = os.path.join(config_dir, user_id)
+    vectors_dir = os.path.join(user_dir, "vectors")
+    live_urls = docs_json_urls(user_dir)
+    if live_urls is None:
+        return None
+
+    report = {"user": user_id, "live_documents": len(live_urls), "removed_documents": [],
+              "removed_dirs": [], "removed_redis_keys": 0, "index_rebuilt": False, "bytes_reclaimed": 0}
+
+    # 1. corpus entries
+    def keep(url, entry):
+        return _is_live(url, entry.get("source_type"), live_urls)
+
+    if dry_run:
+        try:
+            table = read_manifest(vectors_dir)
+            report["removed_documents"] = [url for url, entry in table["docs"].items() if not keep(url, entry)]
+        except FileNotFoundError:
+            pass
+    else:
+        removed, reclaimed, rebuilt = compact_corpus(vectors_dir, keep)
+        report["removed_documents"] = removed
+        report["index_rebuilt"] = rebuilt
+        report["bytes_reclaimed"] += max(reclaimed, 0)
+
+    # 2. document directories
+    kept_dirs = {safe_dir_name(url) for url in live_urls}
+    cutoff = time.time() - GC_GRACE_HOURS * 3600
+    if os.path.isdir(vectors_dir):
+        for name in sorted(os.listdir(vectors_dir)):
+            doc_dir = os.path.join(vectors_dir, name)
+            if name in _CORPUS_FILES or name in kept_dirs or not os.path.isdir(doc_dir):
+                continue
+            url, source_type = _dir_url(doc_dir)
+            if url and _is_live(url, source_type, live_urls):
+                continue
+            if _last_modified(doc_dir) > cutoff:
+                continue
+            size = _dir_size(doc_dir)
+            if not dry_run:
+                shutil.rmtree(doc_dir, ignore_errors=True)
+            report["removed_dirs"].append(name)
+            report["bytes_reclaimed"] += size
+
+    # 3. Redis url states
+    prefix = redis_key(user_id, "")
+    try:
+        stale = [key for key in r.scan_iter(match=f"{prefix}*", count=500)
+                 if not _is_live(key[len(prefix):], None, live_urls)]
+        if stale and not dry_run:
+            r.delete(*stale)
+        report["removed_redis_keys"] = len(stale)
+    except redis.RedisError as e:
+        print(f"⚠️ Redis unavailable, url states not collected for {user_id}: {e}")
+
+    action = "Would remove" if dry_run else "Removed"
+    print(f"🧹 [{user_id}] {action} {len(report['removed_documents'])} corpus document(s), "
+          f"{len(report['removed_dirs'])} director(ies), {report['removed_redis_keys']} Redis state(s); "
+          f"{report['bytes_reclaimed'] / 1e6:.1f} MB reclaimed"
+          + (", index rebuilt" if report["index_rebuilt"] else ""))
+    return report
+
+
+def compact_all_stores(config_dir=_CONFIG_DIR, dry_run=False):
+    """compact_user_store() for every user directory with a docs.json."""
+    reports = []
+    for user_id in sorted(os.listdir(config_dir)):
+        if not os.path.isdir(os.path.join(config_dir, user_id)):
+            continue
+        try:
+            report = compact_user_store(user_id, config_dir, dry_run)
+        except Exception as e:
+            print(f"✗ Vector store compaction failed for {user_id}: {e}")
+            continue
+        if report is not None:
+            reports.append(report)
+    total = sum(rep["bytes_reclaimed"] for rep in reports)
+    print(f"🧹 Vector store compaction: {len(reports)} user(s), {total / 1e6:.1f} MB reclaimed")
+    return reports
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "--dry-run"]
+    dry = "--dry-run" in sys.argv
+    if args:
+        for uid in args:
+            compact_user_store(uid, dry_run=dry)
+    else:
+        compact_all_stores(dry_run=dry)
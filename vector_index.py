@@ -0,0 +1,577 @@
+# vector_index.py
+"""
+Per-user consolidated FAISS index.
+
+Each vectorized document (a URL or a local file) keeps its own directory under
+config/<user>/vectors/<safe url>/ with chunks.bin, embeddings.npy and
+metadata.json, as written by vector_worker.build_vector_store.  On top of those,
+all of a user's vectors live in one IndexIDMap (vectors/corpus.faiss), so a query
+is a single FAISS search over the whole corpus instead of one search per document.
+
+Vector ids encode their document: id = (doc number << CHUNK_ID_BITS) | chunk index.
+The side table vectors/corpus.json maps document numbers to url and directory, so
+a document is added, removed or replaced as one id range, and a search hit
+resolves to (url, chunk_index) without per-vector bookkeeping.
+
+corpus.json doubles as the user's document manifest: each entry under "docs"
+(keyed by url) holds the document number, directory, chunk count, source type
+("web", "confluence", "local_file"), version (content checksum) and update time,
+next to the corpus-wide embedder and dimension.  The retriever reads only this
+file to decide which documents a filtered search covers and whether the corpus
+matches the current embedder, before opening any FAISS or chunk file.
+
+Writers (vector_worker, and appnew/scope when a document is dropped) serialize on
+a lock file in the vectors directory.  The index and table are each replaced
+atomically; a hit whose document number is not in the table is simply skipped.
+
+Index type is chosen per user with VECTOR_INDEX_TYPE (user env file, else the
+process environment):
+    flat   exact search (IndexFlatL2), the default
+    hnsw   HNSW graph; no training, but vectors can't be removed, so replaced or
+           removed documents stay in the graph as dead ids until the next rebuild
+    ivfpq  IVF + product quantization; compact, needs training, so it is only used
+           once there are enough vectors to train on (flat until then)
+    auto   flat below AUTO_HNSW_MIN_VECTORS, hnsw below AUTO_IVFPQ_MIN_VECTORS,
+           ivfpq above
+The index is rebuilt from the documents' embeddings.npy files when the chosen type
+changes, when dead ids pass DEAD_REBUILD_FRACTION, or when an IVF index has
+outgrown the data it was trained on.  Each rebuild of an approximate index records
+a recall-versus-latency report (recall@k against exact search) in corpus.json;
+`python vector_index.py <vectors dir>` prints a fresh one.
+
+Vector storage is chosen per user with VECTOR_STORAGE (same lookup):
+    f32    float32 vectors searched by L2 distance, the default
+    f16    L2-normalized vectors stored as float16 (IndexScalarQuantizer fp16),
+           searched by inner product: half the memory of f32
+    int8   as f16 with 8-bit scalar quantization: a quarter of the memory; the
+           quantizer is trained on the first document and retrained as the
+           corpus grows, like IVF
+With f16/int8 the metric ("ip" in corpus.json) is cosine similarity, and the
+retriever reports it as 2 - 2*cos, the squared L2 distance of the unit vectors,
+so scores stay lower-is-better and a score threshold is a fixed cosine.  Changing
+the setting rebuilds the index.  embeddings.npy is written as float16 either way
+(encode_chunks already rounds every vector through float16, so nothing is lost).
+"""
+import os
+import sys
+import json
+import math
+import time
+import fcntl
+from contextlib import contextmanager
+
+import faiss
+import numpy as np
+
+CORPUS_INDEX_FILE = "corpus.faiss"
+CORPUS_TABLE_FILE = "corpus.json"
+CORPUS_LOCK_FILE = ".corpus.lock"
+EMBEDDINGS_FILE = "embeddings.npy"
+LEGACY_INDEX_FILE = "index.faiss"       # per-document index written by older versions
+
+CHUNK_ID_BITS = 20                      # up to ~1M chunks per document
+CHUNK_ID_MASK = (1 << CHUNK_ID_BITS) - 1
+
+INDEX_TYPES = ("flat", "hnsw", "ivfpq", "auto")
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "flat").lower()
+STORAGE_TYPES = ("f32", "f16", "int8")
+VECTOR_STORAGE = os.getenv("VECTOR_STORAGE", "f32").lower()
+_SQ_CODES = {"f16": "SQfp16", "int8": "SQ8"}
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+AUTO_HNSW_MIN_VECTORS = 20_000
+AUTO_IVFPQ_MIN_VECTORS = 200_000
+IVF_MIN_POINTS_PER_LIST = 39            # k-means needs ~39 points per centroid
+IVF_MAX_TRAINING_POINTS = 100_000
+IVF_RETRAIN_GROWTH = 4                  # retrain once the corpus is this many times the training set
+PQ_NBITS = 8
+DEAD_REBUILD_FRACTION = 0.2             # rebuild an hnsw index once this share of its ids are dead
+
+
+def safe_dir_name(url):
+    """Directory name used for a document's files (same rule as vector_worker/appnew)."""
+    return url.replace("/", "_").replace(":", "_")
+
+
+def doc_id_range(doc_no):
+    """[lo, hi) range of vector ids belonging to one document."""
+    return doc_no << CHUNK_ID_BITS, (doc_no + 1) << CHUNK_ID_BITS
+
+
+def split_vector_id(vector_id):
+    """Vector id -> (doc number, chunk index)."""
+    vector_id = int(vector_id)
+    return vector_id >> CHUNK_ID_BITS, vector_id & CHUNK_ID_MASK
+
+
+def empty_table(embedder=None, dimension=None, index_setting=None, storage_setting=None):
+    storage = choose_storage(storage_setting or VECTOR_STORAGE)
+    return {"embedder": embedder, "dimension": dimension,
+            "index_setting": index_setting or VECTOR_INDEX_TYPE, "index_type": "flat",
+            "storage_setting": storage, "storage": storage, "metric": corpus_metric(storage),
+            "trained_on": 0, "dead": 0, "next_doc": 0, "docs": {}}
+
+
+def choose_storage(setting):
+    """Resolve a VECTOR_STORAGE setting."""
+    setting = (setting or "f32").lower()
+    if setting not in STORAGE_TYPES:
+        print(f"⚠ Unknown VECTOR_STORAGE '{setting}', using f32")
+        return "f32"
+    return setting
+
+
+def corpus_metric(storage):
+    """"l2" for float32 storage, "ip" (inner product of unit vectors) for f16/int8."""
+    return "l2" if storage == "f32" else "ip"
+
+
+def prepare_vectors(embeddings, metric):
+    """embeddings as contiguous float32; an L2-normalized copy when the corpus metric is "ip"."""
+    if metric != "ip":
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+    vectors = np.array(embeddings, dtype=np.float32, order="C")
+    if len(vectors):
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+def needs_training(storage):
+    return storage == "int8"
+
+
+def live_vectors(table):
+    return sum(entry["num_chunks"] for entry in table["docs"].values())
+
+
+def _ivf_nlist(num_vectors):
+    return max(16, min(65536, int(4 * math.sqrt(num_vectors))))
+
+
+def _pq_m(dimension):
+    """Sub-quantizers for PQ: about 8 dimensions each (48 bytes/vector for 384-d MiniLM)."""
+    for sub_dim in (8, 4, 16, 2):
+        if dimension % sub_dim == 0:
+            return dimension // sub_dim
+    return dimension
+
+
+def ivfpq_trainable(num_vectors):
+    return num_vectors >= max(IVF_MIN_POINTS_PER_LIST * _ivf_nlist(num_vectors),
+                              IVF_MIN_POINTS_PER_LIST * (1 << PQ_NBITS))
+
+
+def choose_index_type(setting, num_vectors):
+    """Resolve a VECTOR_INDEX_TYPE setting to the index type to build for num_vectors."""
+    setting = (setting or "flat").lower()
+    if setting not in INDEX_TYPES:
+        print(f"⚠ Unknown VECTOR_INDEX_TYPE '{setting}', using flat")
+        return "flat"
+    if setting == "auto":
+        if num_vectors < AUTO_HNSW_MIN_VECTORS:
+            return "flat"
+        if num_vectors < AUTO_IVFPQ_MIN_VECTORS or not ivfpq_trainable(num_vectors):
+            return "hnsw"
+        return "ivfpq"
+    if setting == "ivfpq" and not ivfpq_trainable(num_vectors):
+        return "flat"   # not enough vectors to train on yet
+    return setting
+
+
+def make_index(index_type, dimension, training_vectors=None, storage="f32"):
+    """Empty index of the given type and storage that accepts add_with_ids.  ivfpq
+    is trained on training_vectors (IVF keeps its own ids, so it is not wrapped in
+    an IDMap); so is int8 storage, which is left untrained without them."""
+    metric = faiss.METRIC_INNER_PRODUCT if corpus_metric(storage) == "ip" else faiss.METRIC_L2
+    codes = _SQ_CODES.get(storage)
+    if index_type == "hnsw":
+        factory = f"IDMap,HNSW{HNSW_M}" + (f",{codes}" if codes else "")
+        index = faiss.index_factory(dimension, factory, metric)
+        hnsw = faiss.downcast_index(index.index).hnsw
+        hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        hnsw.efSearch = HNSW_EF_SEARCH
+    elif index_type == "ivfpq":
+        nlist = _ivf_nlist(len(training_vectors))
+        index = faiss.index_factory(dimension, f"IVF{nlist},PQ{_pq_m(dimension)}x{PQ_NBITS}", metric)
+        index.nprobe = max(8, nlist // 64)
+    else:
+        index = faiss.index_factory(dimension, f"IDMap,{codes or 'Flat'}", metric)
+    if not index.is_trained and training_vectors is not None and len(training_vectors):
+        index.train(training_vectors)
+    return index
+
+
+def corpus_paths(vectors_dir):
+    return (os.path.join(vectors_dir, CORPUS_INDEX_FILE),
+            os.path.join(vectors_dir, CORPUS_TABLE_FILE))
+
+
+def corpus_exists(vectors_dir):
+    return all(os.path.exists(p) for p in corpus_paths(vectors_dir))
+
+
+@contextmanager
+def corpus_lock(vectors_dir):
+    """Exclusive lock for writers of one user's corpus (works across containers sharing config/)."""
+    os.makedirs(vectors_dir, exist_ok=True)
+    with open(os.path.join(vectors_dir, CORPUS_LOCK_FILE), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def read_manifest(vectors_dir):
+    """Return the table (corpus.json) alone.  Raises FileNotFoundError if there is no corpus yet."""
+    _, table_path = corpus_paths(vectors_dir)
+    with open(table_path, "r") as f:
+        table = json.load(f)
+    # corpora written before VECTOR_STORAGE hold float32 vectors
+    table.setdefault("storage", "f32")
+    table.setdefault("metric", corpus_metric(table["storage"]))
+    for key, value in empty_table().items():
+        table.setdefault(key, value)
+    return table
+
+
+def read_corpus(vectors_dir):
+    """Return (index, table) from disk.  Raises FileNotFoundError if there is no corpus yet."""
+    table = read_manifest(vectors_dir)
+    index = faiss.read_index(corpus_paths(vectors_dir)[0])
+    return index, table
+
+
+def _write_corpus(vectors_dir, index, table):
+    index_path, table_path = corpus_paths(vectors_dir)
+    faiss.write_index(index, index_path + ".tmp")
+    os.replace(index_path + ".tmp", index_path)
+    with open(table_path + ".tmp", "w") as f:
+        json.dump(table, f, indent=2)
+    os.replace(table_path + ".tmp", table_path)
+
+
+def save_doc_embeddings(doc_dir, embeddings):
+    """Write a document's embeddings (one row per chunk) next to its chunks, as
+    float16 (they come from encode_chunks, already rounded through float16)."""
+    path = os.path.join(doc_dir, EMBEDDINGS_FILE)
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, np.asarray(embeddings, dtype=np.float16))
+    os.replace(path + ".tmp", path)
+
+
+def load_doc_embeddings(doc_dir):
+    """A document's embeddings, or None.  Stores written before the consolidated
+    index only have index.faiss; their vectors are read back out of it."""
+    path = os.path.join(doc_dir, EMBEDDINGS_FILE)
+    if os.path.exists(path):
+        return np.load(path).astype(np.float32, copy=False)
+    legacy = os.path.join(doc_dir, LEGACY_INDEX_FILE)
+    if os.path.exists(legacy):
+        index = faiss.read_index(legacy)
+        return index.reconstruct_n(0, index.ntotal)
+    return None
+
+
+def _add_document(index, table, url, dir_name, embeddings, info=None):
+    doc_no = table["next_doc"]
+    table["next_doc"] += 1
+    lo, _ = doc_id_range(doc_no)
+    ids = np.arange(lo, lo + len(embeddings), dtype=np.int64)
+    embeddings = prepare_vectors(embeddings, table["metric"])
+    if not index.is_trained:
+        # int8 storage: the quantizer's ranges come from the first document, and
+        # _maybe_rebuild retrains once the corpus has outgrown them
+        index.train(embeddings)
+        table["trained_on"] = len(embeddings)
+    index.add_with_ids(embeddings, ids)
+    table["docs"][url] = {"doc": doc_no, "dir": dir_name, "num_chunks": len(embeddings),
+                          "source_type": None, "version": None, "updated": None, **(info or {})}
+
+
+def manifest_info(metadata):
+    """Manifest fields for a document, from its metadata.json contents."""
+    return {"source_type": metadata.get("source_type"), "version": metadata.get("checksum"),
+            "updated": metadata.get("last_processed")}
+
+
+def _remove_document(index, table, url):
+    entry = table["docs"].pop(url, None)
+    if entry is None:
+        return False
+    if table.get("index_type") == "hnsw":
+        # HNSW can't delete; the ids resolve to no document and are skipped at search time
+        table["dead"] += entry["num_chunks"]
+    else:
+        lo, hi = doc_id_range(entry["doc"])
+        index.remove_ids(faiss.IDSelectorRange(lo, hi))
+    return True
+
+
+def _live_embeddings(vectors_dir, table):
+    """Yield (url, entry, embeddings) for each document in the table, one at a time."""
+    for url, entry in table["docs"].items():
+        embeddings = load_doc_embeddings(os.path.join(vectors_dir, entry["dir"]))
+        if embeddings is None or len(embeddings) != entry["num_chunks"]:
+            print(f"  ⚠ Embeddings for {url} missing or stale; it will be re-added when re-vectorized")
+            continue
+        yield url, entry, embeddings
+
+
+def _training_sample(vectors_dir, table, limit=IVF_MAX_TRAINING_POINTS, seed=0):
+    rng = np.random.default_rng(seed)
+    keep = min(1.0, limit / max(live_vectors(table), 1))
+    parts = [e[rng.random(len(e)) < keep] for _, _, e in _live_embeddings(vectors_dir, table)]
+    return prepare_vectors(np.concatenate(parts), table["metric"])
+
+
+def _rebuild_index(vectors_dir, table, index_type):
+    """New index of index_type holding every live document, keeping document numbers.
+    The index takes the table's storage_setting."""
+    num_vectors = live_vectors(table)
+    table["storage"] = table["storage_setting"]
+    table["metric"] = corpus_metric(table["storage"])
+    trained = index_type == "ivfpq" or needs_training(table["storage"])
+    training = _training_sample(vectors_dir, table) if trained and num_vectors else None
+    index = make_index(index_type, table["dimension"], training, table["storage"])
+    for _, entry, embeddings in _live_embeddings(vectors_dir, table):
+        lo, _ = doc_id_range(entry["doc"])
+        index.add_with_ids(prepare_vectors(embeddings, table["metric"]),
+                           np.arange(lo, lo + len(embeddings), dtype=np.int64))
+    table["index_type"] = index_type
+    table["trained_on"] = len(training) if training is not None else 0
+    table["dead"] = 0
+    table["report"] = index_report(index, vectors_dir, table) if index_type != "flat" else None
+    print(f"✓ Rebuilt {index_type} ({table['storage']}) index for {vectors_dir}: {index.ntotal} of {num_vectors} vectors")
+    return index
+
+
+def _maybe_rebuild(vectors_dir, index, table):
+    """Switch index type or rebuild a degraded one; returns the index to keep."""
+    num_vectors = live_vectors(table)
+    wanted = choose_index_type(table.get("index_setting"), num_vectors)
+    current = table.get("index_type", "flat")
+    trained = current == "ivfpq" or needs_training(table["storage"])
+    if wanted != current:
+        print(f"  Index type {current} -> {wanted} ({num_vectors} vectors)")
+    elif table["storage_setting"] != table["storage"]:
+        print(f"  Vector storage {table['storage']} -> {table['storage_setting']}")
+    elif current == "hnsw" and table["dead"] > DEAD_REBUILD_FRACTION * max(index.ntotal, 1):
+        print(f"  {table['dead']} dead ids in hnsw index, rebuilding")
+    elif trained and num_vectors > IVF_RETRAIN_GROWTH * table["trained_on"]:
+        print(f"  {current} index trained on {table['trained_on']} vectors now holds {num_vectors}, retraining")
+    else:
+        return index
+    return _rebuild_index(vectors_dir, table, wanted)
+
+
+def _build_corpus(vectors_dir, embedder_name, dimension, index_setting=None, storage_setting=None,
+                  exclude_dir=None):
+    """Build a corpus from every document directory embedded with embedder_name,
+    except exclude_dir (the document upsert_document is about to add)."""
+    table = empty_table(embedder_name, dimension, index_setting, storage_setting)
+    index = make_index("flat", dimension, storage=table["storage"])
+    if not os.path.isdir(vectors_dir):
+        return index, table
+
+    for dir_name in sorted(os.listdir(vectors_dir)):
+        doc_dir = os.path.join(vectors_dir, dir_name)
+        metadata_path = os.path.join(doc_dir, "metadata.json")
+        if dir_name == exclude_dir or not os.path.isdir(doc_dir) or not os.path.exists(metadata_path):
+            continue
+        try:
+            with open(metadata_path, "r") as f:
+                metadata = json.load(f)
+            stored = metadata.get("embedder")
+            if stored and stored != embedder_name:
+                print(f"  ⊗ Not indexing {dir_name}: embedded with {stored}")
+                continue
+            embeddings = load_doc_embeddings(doc_dir)
+            if embeddings is None or len(embeddings) == 0 or embeddings.shape[1] != dimension:
+                continue
+            _add_document(index, table, metadata.get("url", dir_name), dir_name, embeddings,
+                          manifest_info(metadata))
+        except Exception as e:
+            print(f"  ✗ Could not add {dir_name} to corpus: {e}")
+
+    print(f"✓ Built corpus for {vectors_dir}: {len(table['docs'])} document(s), {index.ntotal} vectors")
+    return _maybe_rebuild(vectors_dir, index, table), table
+
+
+def ensure_corpus(vectors_dir, embedder_name, dimension):
+    """Return (index, table), building the corpus from the document directories
+    the first time (migrates stores written before the consolidated index)."""
+    if not corpus_exists(vectors_dir):
+        with corpus_lock(vectors_dir):
+            if not corpus_exists(vectors_dir):
+                index, table = _build_corpus(vectors_dir, embedder_name, dimension)
+                _write_corpus(vectors_dir, index, table)
+                return index, table
+    return read_corpus(vectors_dir)
+
+
+def upsert_document(vectors_dir, url, embeddings, embedder_name, index_setting=None, info=None,
+                    storage_setting=None):
+    """Add a document's vectors to the corpus, replacing any it had before.
+    index_setting and storage_setting (VECTOR_INDEX_TYPE and VECTOR_STORAGE values)
+    are remembered for later rebuilds; info (see manifest_info) is stored in the
+    document's manifest entry."""
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    dimension = embeddings.shape[1]
+    with corpus_lock(vectors_dir):
+        if corpus_exists(vectors_dir):
+            index, table = read_corpus(vectors_dir)
+        else:
+            index, table = _build_corpus(vectors_dir, embedder_name, dimension, index_setting, storage_setting,
+                                         exclude_dir=safe_dir_name(url))
+
+        if table["embedder"] != embedder_name or table["dimension"] != dimension:
+            # embedder changed: only documents embedded with the new one can be searched together
+            print(f"⚠ Corpus embedder {table['embedder']} -> {embedder_name}, rebuilding")
+            index, table = _build_corpus(vectors_dir, embedder_name, dimension, index_setting, storage_setting,
+                                         exclude_dir=safe_dir_name(url))
+
+        if index_setting:
+            table["index_setting"] = index_setting
+        if storage_setting:
+            table["storage_setting"] = choose_storage(storage_setting)
+        _remove_document(index, table, url)
+        if len(embeddings):
+            _add_document(index, table, url, safe_dir_name(url), embeddings, info)
+        index = _maybe_rebuild(vectors_dir, index, table)
+        _write_corpus(vectors_dir, index, table)
+    return len(embeddings)
+
+
+def append_document(vectors_dir, url, embeddings, embedder_name, info=None):
+    """Add vectors for new chunks at the end of a document already in the corpus
+    (chunk indexes continue after its current num_chunks), leaving its other vectors
+    in place.  Returns False, changing nothing, if the document is not in the corpus
+    or the corpus was built with another embedder; the caller then upserts it whole."""
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    if not corpus_exists(vectors_dir):
+        return False
+    with corpus_lock(vectors_dir):
+        index, table = read_corpus(vectors_dir)
+        entry = table["docs"].get(url)
+        if (entry is None or table["embedder"] != embedder_name
+                or (len(embeddings) and table["dimension"] != embeddings.shape[1])
+                or entry["num_chunks"] + len(embeddings) > CHUNK_ID_MASK + 1):
+            return False
+        if len(embeddings):
+            lo, _ = doc_id_range(entry["doc"])
+            start = lo + entry["num_chunks"]
+            vectors = prepare_vectors(embeddings, table["metric"])
+            if not index.is_trained:
+                index.train(vectors)
+                table["trained_on"] = len(vectors)
+            index.add_with_ids(vectors, np.arange(start, start + len(vectors), dtype=np.int64))
+            entry["num_chunks"] += len(vectors)
+        entry.update(info or {})
+        index = _maybe_rebuild(vectors_dir, index, table)
+        _write_corpus(vectors_dir, index, table)
+    return True
+
+
+def remove_document(vectors_dir, url):
+    """Drop a document's vectors from the corpus (its directory is removed by the caller)."""
+    if not corpus_exists(vectors_dir):
+        return False
+    with corpus_lock(vectors_dir):
+        index, table = read_corpus(vectors_dir)
+        removed = _remove_document(index, table, url)
+        if removed:
+            index = _maybe_rebuild(vectors_dir, index, table)
+            _write_corpus(vectors_dir, index, table)
+    return removed
+
+
+def compact_corpus(vectors_dir, keep):
+    """
+    Drop every document for which keep(url, entry) is false, or whose directory is
+    gone, then rebuild the index if it holds dead or unaccounted-for ids.  Document
+    directories are left to the caller.  Returns (removed urls, index bytes
+    reclaimed, rebuilt).
+    """
+    if not corpus_exists(vectors_dir):
+        return [], 0, False
+    index_path, _ = corpus_paths(vectors_dir)
+    with corpus_lock(vectors_dir):
+        size_before = os.path.getsize(index_path)
+        index, table = read_corpus(vectors_dir)
+        removed = [url for url, entry in table["docs"].items()
+                   if not keep(url, entry) or not os.path.isdir(os.path.join(vectors_dir, entry["dir"]))]
+        for url in removed:
+            _remove_document(index, table, url)
+        rebuilt = table["dead"] > 0 or index.ntotal != live_vectors(table)
+        if rebuilt:
+            wanted = choose_index_type(table.get("index_setting"), live_vectors(table))
+            index = _rebuild_index(vectors_dir, table, wanted)
+        else:
+            index = _maybe_rebuild(vectors_dir, index, table)
+        if removed or rebuilt:
+            _write_corpus(vectors_dir, index, table)
+        reclaimed = size_before - os.path.getsize(index_path)
+    return removed, reclaimed, rebuilt
+
+
+def index_report(index, vectors_dir, table, k=10, num_queries=100, seed=0):
+    """Recall@k of index against exact search over the same live vectors, with mean
+    per-query latency of each.  Queries are sampled from the stored vectors; the
+    exact answer is computed one document at a time so memory stays bounded."""
+    num_vectors = live_vectors(table)
+    if num_vectors == 0:
+        return None
+    k = min(k, num_vectors)
+    rng = np.random.default_rng(seed)
+    keep = min(1.0, 2 * num_queries / num_vectors)
+    sample = [e[rng.random(len(e)) < keep] for _, _, e in _live_embeddings(vectors_dir, table)]
+    queries = prepare_vectors(np.concatenate(sample)[:num_queries], table["metric"])
+    if len(queries) == 0:
+        return None
+
+    # exact top-k: brute force per document, merged
+    best_d = np.full((len(queries), k), np.inf, dtype=np.float32)
+    best_i = np.full((len(queries), k), -1, dtype=np.int64)
+    start = time.perf_counter()
+    for _, entry, embeddings in _live_embeddings(vectors_dir, table):
+        # on unit vectors the L2 ranking is the inner-product ranking
+        embeddings = prepare_vectors(embeddings, table["metric"])
+        d, i = faiss.knn(queries, embeddings, min(k, len(embeddings)))
+        i = np.where(i >= 0, i + doc_id_range(entry["doc"])[0], -1)
+        all_d = np.hstack([best_d, d])
+        all_i = np.hstack([best_i, i])
+        order = np.argsort(all_d, axis=1)[:, :k]
+        best_d = np.take_along_axis(all_d, order, axis=1)
+        best_i = np.take_along_axis(all_i, order, axis=1)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    start = time.perf_counter()
+    found = [index.search(q.reshape(1, -1), k)[1][0] for q in queries]
+    approx_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    recall = float(np.mean([len(set(t) & set(f)) / k for t, f in zip(best_i, found)]))
+    report = {
+        "index_type": table.get("index_type"),
+        "storage": table.get("storage"),
+        "vectors": int(index.ntotal),
+        "k": k,
+        "queries": len(queries),
+        "recall": round(recall, 4),
+        "latency_ms": round(approx_ms, 3),
+        "exact_latency_ms": round(exact_ms, 3),
+        "index_mb": round(faiss.serialize_index(index).nbytes / 1e6, 2),
+        "exact_mb": round(num_vectors * table["dimension"] * 4 / 1e6, 2),
+    }
+    print(f"  Index report: {report}")
+    return report
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python vector_index.py <vectors dir, e.g. config/<user>/vectors>")
+        sys.exit(1)
+    corpus_index, corpus_table = read_corpus(sys.argv[1])
+    print(json.dumps(index_report(corpus_index, sys.argv[1], corpus_table), indent=2))
@@ -1,9 +1,13 @@
 """
 Enhanced retrieval module with RAG optimization.
 """
+import threading
+from collections import OrderedDict
 from typing import List, Dict, Optional
 from dataclasses import dataclass
+import numpy as np
 from vector_retriever import *
+from chunk_signatures import dedup_indices, minhash_signature
 
 @dataclass
 class SearchResult:
@@ -13,6 +17,8 @@ class SearchResult:
     chunk_index: int
     url: str
     metadata: Dict
+    signature: Optional[np.ndarray] = None  # MinHash of the chunk text, see chunk_signatures.py
+    lexical_rank: Optional[int] = None      # rank in the BM25 results, if it was a BM25 hit
 
 
 def prepare_rag_context(
@@ -46,46 +52,93 @@ def prepare_rag_context(
             - 'sources': List of source information (if include_sources=True)
             - 'metadata': Additional metadata about the retrieval
     """
+    return prepare_rag_contexts(user_id, [query], docs_list, top_k, score_threshold,
+                                include_sources, deduplicate)[query]
+
+
+def prepare_rag_contexts(
+    user_id: str,
+    queries: List[str],
+    docs_list=None,
+    top_k: int = 5,
+    score_threshold: float = None,
+    include_sources: bool = True,
+    deduplicate: bool = True
+) -> Dict[str, Dict]:
+    """
+    prepare_rag_context() for many queries at once.  Identical queries are retrieved
+    once, and all distinct ones are encoded in one batch and searched with one
+    multi-query FAISS search (per document in docs_list, if given).
+    
+    Returns:
+        Dict mapping each query to its prepare_rag_context() result
+    """
+    unique_queries = list(dict.fromkeys(queries))
     print(f"\n{'='*60}")
     print(f"PREPARE RAG CONTEXT - START")
     print(f"{'='*60}")
     print(f"User ID: {user_id}")
-    print(f"Query: {query}")
+    print(f"Queries: {len(unique_queries)} distinct of {len(queries)}")
     print(f"Top K: {top_k}")
     print(f"Score Threshold: {score_threshold}")
     print(f"Include Sources: {include_sources}")
     print(f"Deduplicate: {deduplicate}")
     
-    from vector_retriever import VectorRetriever
-    
-    # Retrieve results
-    print(f"\n[STEP 1] Initializing VectorRetriever...")
+    print(f"\n[STEP 1] Getting VectorRetriever...")
     try:
-        retriever = VectorRetriever(user_id)
-        print(f"✓ VectorRetriever initialized successfully")
+        retriever = _get_retriever(user_id)
     except Exception as e:
         print(f"✗ Failed to initialize VectorRetriever: {e}")
         raise
     
     print(f"\n[STEP 2] Searching for documents (requesting {top_k * 2} results for filtering)...")
     try:
-        results = []
-
-        if docs_list is not None:
-            for doc in docs_list:
-                print(f"calling retriever.search_specific_document '{doc}' in docs_list")
-                doc_results = retriever.search_specific_document(doc, query, top_k=top_k * 2)
-                results.extend(doc_results)
-        else:
-            print("docs_list is None or empty, falling back to general search")
-            results = retriever.search(query, top_k=top_k * 2)
-
-        print(f"✓ Search completed: {len(results)} results retrieved")
-
+        all_results = _retrieve(retriever, unique_queries, docs_list, top_k * 2)
+        print(f"✓ Search completed: {sum(len(r) for r in all_results)} results retrieved")
     except Exception as e:
         print(f"✗ Search failed: {e}")
         raise
 
+    return {
+        query: _build_rag_context(query, results, top_k, score_threshold, include_sources, deduplicate)
+        for query, results in zip(unique_queries, all_results)
+    }
+
+
+_retrievers = {}    # user_id -> VectorRetriever (loaded indexes are cached in vector_retriever)
+
+
+def _get_retriever(user_id: str) -> "VectorRetriever":
+    from vector_retriever import VectorRetriever
+    retriever = _retrievers.get(user_id)
+    if retriever is None:
+        retriever = _retrievers[user_id] = VectorRetriever(user_id)
+    return retriever
+
+
+def _retrieve(retriever, queries: List[str], docs_list, top_k: int) -> List[List[SearchResult]]:
+    """Candidate chunks for each query, best first, from the documents in docs_list
+    (one search restricted to them) or from all of the user's documents."""
+    if docs_list is None:
+        print("docs_list is None or empty, falling back to general search")
+        return retriever.search_batch(queries, top_k=top_k)
+    if not docs_list:
+        return [[] for _ in queries]
+
+    print(f"calling retriever.search_batch for {len(docs_list)} document(s) in docs_list")
+    return retriever.search_batch(queries, top_k=top_k, filter_url=list(docs_list))
+
+
+def _build_rag_context(
+    query: str,
+    results: List[SearchResult],
+    top_k: int,
+    score_threshold: float,
+    include_sources: bool,
+    deduplicate: bool
+) -> Dict[str, any]:
+    """Filter, deduplicate and format one query's search results for an LLM prompt."""
+    print(f"\n[RAG CONTEXT] Query: {query}")
     if not results:
         print(f"\n✗ NO RESULTS FOUND")
         print(f"{'='*60}\n")
@@ -110,7 +163,11 @@ def prepare_rag_context(
     else:
         print(f"  Using provided threshold: {score_threshold:.4f}")
 
-    filtered_results = [r for r in results if r.score <= score_threshold]
+    # a top BM25 hit (exact identifier match) is kept even if its embedding is far off
+    filtered_results = [
+        r for r in results
+        if r.score <= score_threshold or (r.lexical_rank is not None and r.lexical_rank < top_k)
+    ]
     print(f"  Results after threshold filter: {len(filtered_results)}")
     
     # If filtering removed everything, keep at least the top result
@@ -131,9 +188,8 @@ def prepare_rag_context(
         before_dedup = len(filtered_results)
         try:
             filtered_results = _deduplicate_chunks(filtered_results)
-            # If _deduplicate_chunks() changes order, you may lose ranking quality.
-            # Ensure it preserves order, or re-sort after:
-            filtered_results.sort(key=lambda r: r.score)
+            # _deduplicate_chunks() preserves order; results are already ranked (by
+            # fused rank under hybrid search, so don't re-sort by distance)
             
             removed = before_dedup - len(filtered_results)
             if removed > 0:
@@ -206,6 +262,10 @@ def _deduplicate_chunks(results: List[SearchResult], similarity_threshold: float
     """
     Remove near-duplicate chunks based on text similarity.
     
+    Uses the MinHash signatures stored with each document (chunk_signatures.py), so
+    this is a near-linear signature comparison; signatures are computed here only for
+    chunks from stores vectorized before signatures were written.
+    
     Args:
         results: List of search results
         similarity_threshold: Jaccard similarity threshold (0-1) for considering duplicates
@@ -216,42 +276,15 @@ def _deduplicate_chunks(results: List[SearchResult], similarity_threshold: float
     if len(results) <= 1:
         return results
     
-    unique_results = [results[0]]
-    duplicates_found = []
-    
-    for idx, result in enumerate(results[1:], 2):
-        is_duplicate = False
-        
-        for unique_idx, unique_result in enumerate(unique_results, 1):
-            similarity = _jaccard_similarity(
-                result.chunk_text.lower(),
-                unique_result.chunk_text.lower()
-            )
-            
-            if similarity >= similarity_threshold:
-                is_duplicate = True
-                duplicates_found.append((idx, unique_idx, similarity))
-                print(f"    Chunk {idx} is {similarity:.2%} similar to chunk {unique_idx} - removing")
-                break
-        
-        if not is_duplicate:
-            unique_results.append(result)
+    signatures = [
+        r.signature if r.signature is not None else minhash_signature(r.chunk_text)
+        for r in results
+    ]
+    kept, duplicates_found = dedup_indices(signatures, similarity_threshold)
+    for idx, unique_idx, similarity in duplicates_found:
+        print(f"    Chunk {idx + 1} is {similarity:.2%} similar to chunk {unique_idx + 1} - removing")
     
-    return unique_results
-
-
-def _jaccard_similarity(text1: str, text2: str) -> float:
-    """Calculate Jaccard similarity between two texts."""
-    words1 = set(text1.split())
-    words2 = set(text2.split())
-    
-    if not words1 or not words2:
-        return 0.0
-    
-    intersection = len(words1 & words2)
-    union = len(words1 | words2)
-    
-    return intersection / union if union > 0 else 0.0
+    return [results[i] for i in kept]
 
 
 def create_rag_prompt(
@@ -320,26 +353,75 @@ def search_and_prepare_for_llm(
     Returns:
         Dict with 'prompt' ready for LLM and 'metadata' about retrieval
     """
+    return search_and_prepare_for_llm_batch(user_id, [query], docs_list, top_k, include_sources)[query]
+
+
+RAG_MEMO_SIZE = 256
+_rag_memo = OrderedDict()   # (user, query, docs, top_k, include_sources) -> (corpus version, result)
+_rag_memo_lock = threading.Lock()
+
+
+def search_and_prepare_for_llm_batch(
+    user_id: str,
+    queries: List[str],
+    docs_list = None,
+    top_k: int = 5,
+    include_sources: bool = True
+) -> Dict[str, Dict]:
+    """
+    search_and_prepare_for_llm() for many queries, e.g. one AI field prompt for every
+    row of a table.  Results are memoized per process until the user's corpus
+    changes, so repeating a prompt costs one retrieval, not one per row.
+    
+    Returns:
+        Dict mapping each query to its search_and_prepare_for_llm() result
+    """
     print(f"\n{'#'*60}")
     print(f"# RAG PIPELINE - COMPLETE WORKFLOW")
     print(f"{'#'*60}")
-    
-    # Get prepared context
-    try:
-        rag_data = prepare_rag_context(
-            user_id=user_id,
-            query=query,
-            docs_list=docs_list,
-            top_k=top_k,
-            include_sources=include_sources
-        )
-    except Exception as e:
-        print(f"\n✗ RAG PIPELINE FAILED during context preparation: {e}")
-        raise
-    
+
+    version = _get_retriever(user_id).corpus_version()
+    docs_key = tuple(docs_list) if docs_list is not None else None
+    results = {}
+    with _rag_memo_lock:
+        for query in queries:
+            memo = _rag_memo.get((user_id, query, docs_key, top_k, include_sources))
+            if memo and memo[0] == version:
+                results[query] = memo[1]
+    to_run = [q for q in dict.fromkeys(queries) if q not in results]
+    print(f"  {len(results)} memoized, {len(to_run)} to retrieve")
+
+    if to_run:
+        try:
+            rag_data = prepare_rag_contexts(
+                user_id=user_id,
+                queries=to_run,
+                docs_list=docs_list,
+                top_k=top_k,
+                include_sources=include_sources
+            )
+        except Exception as e:
+            print(f"\n✗ RAG PIPELINE FAILED during context preparation: {e}")
+            raise
+
+        with _rag_memo_lock:
+            for query in to_run:
+                results[query] = _finish_rag_result(query, rag_data[query])
+                _rag_memo[(user_id, query, docs_key, top_k, include_sources)] = (version, results[query])
+                _rag_memo.move_to_end((user_id, query, docs_key, top_k, include_sources))
+            while len(_rag_memo) > RAG_MEMO_SIZE:
+                _rag_memo.popitem(last=False)
+
+    print(f"\n{'#'*60}")
+    print(f"# RAG PIPELINE - COMPLETE SUCCESS")
+    print(f"{'#'*60}\n")
+    return results
+
+
+def _finish_rag_result(query: str, rag_data: Dict) -> Dict[str, any]:
+    """Turn prepared context into the search_and_prepare_for_llm() result."""
     if not rag_data['metadata']['found_results']:
         print(f"\n⚠ NO CONTEXT AVAILABLE - Returning query without RAG context")
-        print(f"{'#'*60}\n")
         return {
             'prompt': query,
             'has_context': False,
@@ -353,10 +435,6 @@ def search_and_prepare_for_llm(
         print(f"\n✗ RAG PIPELINE FAILED during prompt creation: {e}")
         raise
     
-    print(f"\n{'#'*60}")
-    print(f"# RAG PIPELINE - COMPLETE SUCCESS")
-    print(f"{'#'*60}\n")
-    
     return {
         'prompt': full_prompt,
         'context': rag_data['context'],
@@ -1,23 +1,112 @@
 """
 Retrieval module for searching vector stores.
+
+A user's documents are searched through their consolidated index (see
+vector_index.py): one FAISS search over every document, with hits mapped back to
+(url, chunk_index) and the chunk text read from that document's directory.
+
+Unless HYBRID_SEARCH=0, the FAISS ranking is fused with a BM25 ranking over each
+document's compact inverted index (sparse_index.py) by reciprocal-rank fusion, so
+exact identifiers such as Jira keys rank well even when embeddings blur them.  An
+unfiltered search uses one index merged from every document's, cached per corpus
+version; only filtered searches read the selected documents' indexes.
+
+On corpora stored as f16/int8 (VECTOR_STORAGE, see vector_index.py) queries are
+L2-normalized and searched by inner product; the cosine is reported as 2 - 2*cos,
+so SearchResult.score is the same lower-is-better squared distance either way.
+
+Filters (url, source type, referrer) and the embedder check are resolved from the
+manifest in corpus.json alone, so documents outside the filter are never opened.
+
+The loaded index and each document's chunks/metadata are kept in a process-level
+LRU cache, so repeated queries from read_jira, aibrief or the MCP server don't
+re-read anything from disk.  A cached entry is reloaded when any of its files
+changes (mtime/size), and least recently used entries are evicted once the cache
+exceeds VECTOR_CACHE_MB (default 512).  Query embeddings are cached as well
+(query_cache.py), so a repeated prompt skips the embedding model.
 """
 import os
 import json
+import math
+import threading
+from collections import OrderedDict
 import faiss
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 from vector_embedder import get_embedder
+from vector_index import (
+    CHUNK_ID_BITS, CORPUS_INDEX_FILE, CORPUS_TABLE_FILE, EMBEDDINGS_FILE, doc_id_range, split_vector_id,
+    ensure_corpus, load_doc_embeddings, prepare_vectors, read_manifest,
+)
+from chunk_store import ChunkStore, chunks_path, open_chunks
+from chunk_signatures import SIGNATURES_FILE, load_signatures
+from sparse_index import SPARSE_INDEX_FILE, bm25_search, load_sparse_index, merge_sparse_indexes
+from query_cache import encode_queries
+
+VECTOR_CACHE_MB = int(os.getenv("VECTOR_CACHE_MB", "512"))
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1") == "1"   # fuse BM25 with FAISS results
+RRF_K = 60                  # reciprocal-rank fusion constant
+HYBRID_DEPTH = 20           # candidates taken from each ranking before fusion (at least)
+
+_store_cache = OrderedDict()     # (kind, directory) -> (signature, nbytes, value)
+_store_cache_bytes = 0
+_store_cache_lock = threading.Lock()
+
+
+def _file_signature(directory: str, names: Tuple[str, ...]) -> Tuple:
+    """(mtime_ns, size) of each file; changes whenever vector_worker rewrites it."""
+    sig = []
+    for name in names:
+        st = os.stat(os.path.join(directory, name))
+        sig.append((st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+
+def _cache_get(key: Tuple, signature: Tuple):
+    with _store_cache_lock:
+        entry = _store_cache.get(key)
+        if entry is None or entry[0] != signature:
+            return None
+        _store_cache.move_to_end(key)
+        return entry[2]
+
+
+def _cache_put(key: Tuple, signature: Tuple, nbytes: int, value) -> None:
+    global _store_cache_bytes
+    budget = VECTOR_CACHE_MB * 1024 * 1024
+    with _store_cache_lock:
+        old = _store_cache.pop(key, None)
+        if old is not None:
+            _store_cache_bytes -= old[1]
+        if nbytes > budget:
+            return
+        _store_cache[key] = (signature, nbytes, value)
+        _store_cache_bytes += nbytes
+        while _store_cache_bytes > budget and len(_store_cache) > 1:
+            evicted_key, evicted = _store_cache.popitem(last=False)
+            _store_cache_bytes -= evicted[1]
+            print(f"    ⊗ Evicted cached vector store: {evicted_key[1]}")
+
+
+def clear_vector_store_cache() -> None:
+    """Drop every cached index and document (e.g. after deleting a user's vectors)."""
+    global _store_cache_bytes
+    with _store_cache_lock:
+        _store_cache.clear()
+        _store_cache_bytes = 0
 
 
 @dataclass
 class SearchResult:
     """A single search result from the vector store."""
     chunk_text: str
-    score: float  # Lower is better for L2 distance
+    score: float  # Lower is better: squared L2 distance (2 - 2*cos on "ip" corpora)
     chunk_index: int
     url: str
     metadata: Dict
+    signature: Optional[np.ndarray] = None  # MinHash of the chunk text, see chunk_signatures.py
+    lexical_rank: Optional[int] = None      # rank in the BM25 results, if it was a BM25 hit
 
 
 class VectorRetriever:
@@ -65,54 +154,126 @@ class VectorRetriever:
         
         print(f"{'='*60}\n")
          
-    def _load_vector_store(self, url_dir: str) -> Tuple[faiss.Index, List[str], Dict]:
-        """Load FAISS index, chunks, and metadata for a single URL."""
-        print(f"  Loading vector store from: {url_dir}")
-        
-        index_path = os.path.join(url_dir, "index.faiss")
-        chunks_path = os.path.join(url_dir, "chunks.json")
-        metadata_path = os.path.join(url_dir, "metadata.json")
-        
-        # Load FAISS index
-        if not os.path.exists(index_path):
-            print(f"    ✗ Index file not found: {index_path}")
-            raise FileNotFoundError(f"Index not found: {index_path}")
-        
-        try:
-            index = faiss.read_index(index_path)
-            print(f"    ✓ FAISS index loaded: {index.ntotal} vectors")
-        except Exception as e:
-            print(f"    ✗ Failed to load FAISS index: {e}")
-            raise
-        
-        # Load chunks
-        if not os.path.exists(chunks_path):
-            print(f"    ✗ Chunks file not found: {chunks_path}")
-            raise FileNotFoundError(f"Chunks not found: {chunks_path}")
-        
-        try:
-            with open(chunks_path, "r") as f:
-                chunks = json.load(f)
-            print(f"    ✓ Chunks loaded: {len(chunks)} chunks")
-        except Exception as e:
-            print(f"    ✗ Failed to load chunks: {e}")
-            raise
-        
-        # Load metadata
-        if not os.path.exists(metadata_path):
-            print(f"    ✗ Metadata file not found: {metadata_path}")
-            raise FileNotFoundError(f"Metadata not found: {metadata_path}")
-        
+    def _load_manifest(self, dimension: int):
+        """Load the user's document manifest (corpus.json, see vector_index.py), cached
+        per process.  Builds the corpus first if the user has none yet.
+
+        Returns (table, urls_by_doc, docs_by_url) or None if nothing is indexed.
+        docs_by_url is keyed by url without a trailing slash, for filter_url lookups.
+        """
+        if not os.path.isdir(self.vectors_dir):
+            return None
+        key = ("manifest", self.vectors_dir)
+        if not os.path.exists(os.path.join(self.vectors_dir, CORPUS_TABLE_FILE)):
+            # first query since the documents were vectorized; migrate them
+            ensure_corpus(self.vectors_dir, self.embedder.get_name(), dimension)
+        signature = _file_signature(self.vectors_dir, (CORPUS_TABLE_FILE,))
+        manifest = _cache_get(key, signature)
+        if manifest is not None:
+            return manifest
+
+        table = read_manifest(self.vectors_dir)
+        urls_by_doc = {entry["doc"]: url for url, entry in table["docs"].items()}
+        docs_by_url = {url.rstrip("/"): entry for url, entry in table["docs"].items()}
+        manifest = (table, urls_by_doc, docs_by_url)
+        print(f"  ✓ Manifest loaded: {len(table['docs'])} document(s)")
+        _cache_put(key, signature, signature[0][1], manifest)
+        return manifest
+
+    def _load_index(self):
+        """Load the user's consolidated FAISS index (cached per process)."""
+        key = ("index", self.vectors_dir)
+        signature = _file_signature(self.vectors_dir, (CORPUS_INDEX_FILE,))
+        index = _cache_get(key, signature)
+        if index is not None:
+            print(f"  ✓ Corpus cached: {index.ntotal} vectors")
+            return index
+
+        print(f"  Loading corpus from: {self.vectors_dir}")
+        index = faiss.read_index(os.path.join(self.vectors_dir, CORPUS_INDEX_FILE))
+        print(f"    ✓ Corpus loaded: {index.ntotal} vectors")
+        _cache_put(key, signature, signature[0][1], index)
+        return index
+
+    def _load_embeddings(self, url_dir: str, metric: str = "l2") -> np.ndarray:
+        """A document's embeddings.npy, for exact search within selected documents
+        (cached; L2-normalized for an "ip" corpus)."""
+        key = ("unit_embeddings" if metric == "ip" else "embeddings", url_dir)
         try:
-            with open(metadata_path, "r") as f:
-                metadata = json.load(f)
-            print(f"    ✓ Metadata loaded: {metadata.get('title', 'Unknown')}")
-            print(f"      URL: {metadata.get('url', 'Unknown')}")
-        except Exception as e:
-            print(f"    ✗ Failed to load metadata: {e}")
-            raise
-            
-        return index, chunks, metadata
+            signature = _file_signature(url_dir, (EMBEDDINGS_FILE,))
+        except OSError:
+            # legacy store, read back out of index.faiss
+            embeddings = load_doc_embeddings(url_dir)
+            return None if embeddings is None else prepare_vectors(embeddings, metric)
+        embeddings = _cache_get(key, signature)
+        if embeddings is None:
+            embeddings = prepare_vectors(load_doc_embeddings(url_dir), metric)
+            _cache_put(key, signature, embeddings.nbytes, embeddings)
+        return embeddings
+
+    def _referred_urls(self, referrer: str) -> set:
+        """URLs in docs.json with referrer (a source sheet URL or file) among their referrers."""
+        docs_json = os.path.join(self.user_dir, "docs.json")
+        if not os.path.exists(docs_json):
+            return set()
+        with open(docs_json, "r") as f:
+            docs = json.load(f).get("docs", [])
+        return {
+            doc["url"].rstrip("/") for doc in docs
+            if any(referrer in (r.get("source_url"), r.get("source_file")) for r in doc.get("referrers", []))
+        }
+
+    def _select_documents(self, docs_by_url: Dict, filter_url=None, source_type=None,
+                          referrer: str = None) -> Optional[List[Dict]]:
+        """Manifest entries a filtered search covers, or None to search everything."""
+        if not (filter_url or source_type or referrer):
+            return None
+        entries = docs_by_url
+        if filter_url:
+            urls = [filter_url] if isinstance(filter_url, str) else filter_url
+            entries = {}
+            for url in urls:
+                entry = docs_by_url.get(url.rstrip("/"))
+                if entry is None:
+                    print(f"⊗ URL not in corpus: {url}")
+                else:
+                    entries[url.rstrip("/")] = entry
+        if source_type:
+            types = {source_type} if isinstance(source_type, str) else set(source_type)
+            entries = {url: e for url, e in entries.items() if e.get("source_type") in types}
+        if referrer:
+            referred = self._referred_urls(referrer)
+            entries = {url: e for url, e in entries.items() if url in referred}
+        return list(entries.values())
+
+    def _load_document(self, url_dir: str) -> Tuple[List[str], Dict, Optional[np.ndarray]]:
+        """Load chunks (memory-mapped, see chunk_store.py), metadata and chunk signatures
+        (None for stores written before them) for a single URL, cached per process."""
+        key = ("document", url_dir)
+        names = (os.path.basename(chunks_path(url_dir)), "metadata.json")
+        if os.path.exists(os.path.join(url_dir, SIGNATURES_FILE)):
+            names += (SIGNATURES_FILE,)
+        signature = _file_signature(url_dir, names)
+        document = _cache_get(key, signature)
+        if document is not None:
+            return document
+
+        print(f"  Loading document from: {url_dir}")
+        chunks = open_chunks(url_dir)
+        with open(os.path.join(url_dir, "metadata.json"), "r") as f:
+            metadata = json.load(f)
+        signatures = load_signatures(url_dir)
+        if signatures is not None and len(signatures) != len(chunks):
+            signatures = None   # written by an interrupted run, don't trust it
+        print(f"    ✓ {len(chunks)} chunks, URL: {metadata.get('url', 'Unknown')}")
+
+        document = (chunks, metadata, signatures)
+        if isinstance(chunks, ChunkStore):
+            nbytes = chunks.nbytes
+        else:
+            nbytes = sum(len(c) for c in chunks)
+        _cache_put(key, signature, nbytes + signature[1][1], document)
+        return document
     
     def _get_all_url_dirs(self) -> List[Tuple[str, str]]:
         """Get all URL directories for this user."""
@@ -144,159 +305,292 @@ class VectorRetriever:
         
         return url_dirs
     
-    def search(self, query: str, top_k: int = 5, filter_url: str = None) -> List[SearchResult]:
+    def search(self, query: str, top_k: int = 5, filter_url: str = None,
+               source_type: str = None, referrer: str = None) -> List[SearchResult]:
         """
         Search across all vector stores for relevant chunks.
         
         Args:
             query: Search query text
-            top_k: Number of results to return per document
-            filter_url: Optional URL to search only in specific document
+            top_k: Number of results to return
+            filter_url: Optional URL (or list of URLs) to search only in specific documents
+            source_type: Optional "web", "confluence" or "local_file" (or a list of them)
+            referrer: Optional sheet URL/file; only documents it references are searched
             
         Returns:
             List of SearchResult objects, sorted by relevance (lowest score first)
         """
+        return self.search_batch([query], top_k, filter_url, source_type, referrer)[0]
+
+    def search_batch(self, queries: List[str], top_k: int = 5, filter_url=None,
+                     source_type=None, referrer: str = None) -> List[List[SearchResult]]:
+        """
+        Search for several queries at once: one encode call and one multi-query FAISS search.
+        Filters are resolved against the manifest, before any index file is read.
+        
+        Args:
+            queries: Search query texts
+            top_k: Number of results to return per query
+            filter_url, source_type, referrer: Optional filters, as for search()
+            
+        Returns:
+            One list of SearchResult objects per query, each sorted by relevance
+        """
         print(f"\n{'='*60}")
         print(f"SEARCHING VECTOR STORES")
         print(f"{'='*60}")
-        print(f"Query: {query}")
+        for query in queries:
+            print(f"Query: {query}")
         print(f"Top K: {top_k}")
         print(f"Filter URL: {filter_url if filter_url else 'None (search all)'}")
+        no_results = [[] for _ in queries]
+        if not queries:
+            return no_results
         
-        # Encode query
-        print(f"\n[STEP 1] Encoding query...")
+        # Encode queries
+        print(f"\n[STEP 1] Encoding {len(queries)} query(s)...")
         try:
-            query_embedding = self.embedder.encode([query])[0]
-            query_embedding = np.array([query_embedding], dtype=np.float32)
-            embedding_dim = query_embedding.shape[1]
-            print(f"✓ Query encoded: {embedding_dim} dimensions")
+            query_embeddings = encode_queries(self.embedder, list(queries))
+            embedding_dim = query_embeddings.shape[1]
+            print(f"✓ Queries encoded: {embedding_dim} dimensions")
         except Exception as e:
             print(f"✗ Failed to encode query: {e}")
             raise
         
-        all_results = []
-        
-        # Get all document directories
-        url_dirs = self._get_all_url_dirs()
-        
-        if not url_dirs:
+        print(f"\n[STEP 2] Searching corpus...")
+        manifest = self._load_manifest(embedding_dim)
+        if manifest is None or not manifest[0]["docs"]:
             print(f"\n✗ No documents found to search")
             print(f"{'='*60}\n")
-            return []
-        
-        # Search each vector store
-        print(f"\n[STEP 2] Searching {len(url_dirs)} document(s)...")
-        docs_searched = 0
-        docs_skipped = 0
-        docs_errored = 0
-        
-        for idx, (url_folder, url_dir) in enumerate(url_dirs, 1):
-            print(f"\n  [{idx}/{len(url_dirs)}] Processing: {url_folder}")
-            
-            try:
-                # Load vector store
-                index, chunks, metadata = self._load_vector_store(url_dir)
-                
-                # Check if we should filter by URL
-                if filter_url:
-                    doc_url = metadata.get("url", "").rstrip("/")
-                    search_url = filter_url.rstrip("/")
-                    if doc_url != search_url:
-                        print(f"    ⊗ Skipping: URL doesn't match filter")
-                        print(f"      Doc URL: {doc_url}")
-                        print(f"      Filter:  {search_url}")
-                        docs_skipped += 1
-                        continue
-                
-                # Verify embedder compatibility
-                stored_embedder = metadata.get("embedder")
-                current_embedder = self.embedder.get_name()
-                
-                if stored_embedder and stored_embedder != current_embedder:
-                    print(f"    ✗ Embedder mismatch!")
-                    print(f"      Stored: {stored_embedder}")
-                    print(f"      Current: {current_embedder}")
-                    print(f"      Skipping this document (re-vectorize to use it)")
-                    docs_skipped += 1
-                    continue
-                
-                print(f"    Embedder: {current_embedder} ✓")
-                
-                # Search FAISS index
-                k_to_search = min(top_k, len(chunks))
-                print(f"    Searching for top {k_to_search} chunks...")
-                
-                try:
-                    distances, indices = index.search(query_embedding, k_to_search)
-                    print(f"    ✓ Search completed")
-                except Exception as e:
-                    print(f"    ✗ FAISS search failed: {e}")
-                    docs_errored += 1
-                    continue
-                
-                # Create results
-                results_from_doc = 0
-                for i, (distance, chunk_idx) in enumerate(zip(distances[0], indices[0])):
-                    #if chunk_idx < len(chunks):  # Valid index
-                    #FAISS returns -1 for unfilled slots when k > ntotal. -1 < len(chunks) is always True in Python, so -1 
-                    #would pass the guard and chunks[-1] would silently return the last chunk instead of being skipped. Fix:
-                    if 0 <= chunk_idx < len(chunks):
-                        result = SearchResult(
-                            chunk_text=chunks[chunk_idx],
-                            score=float(distance),
-                            chunk_index=int(chunk_idx),
-                            url=metadata.get("url", "unknown"),
-                            metadata=metadata
-                        )
-                        all_results.append(result)
-                        results_from_doc += 1
-                        print(f"      Result {i+1}: chunk {chunk_idx}, score {distance:.4f}")
+            return no_results
+        table, urls_by_doc, docs_by_url = manifest
+
+        # Verify embedder compatibility
+        current_embedder = self.embedder.get_name()
+        if table.get("embedder") != current_embedder or table.get("dimension") != embedding_dim:
+            print(f"✗ Embedder mismatch!")
+            print(f"  Stored: {table.get('embedder')}")
+            print(f"  Current: {current_embedder}")
+            print(f"  Skipping search (re-vectorize documents to use them)")
+            print(f"{'='*60}\n")
+            return no_results
+
+        metric = table.get("metric", "l2")
+        if metric == "ip":
+            query_embeddings = prepare_vectors(query_embeddings, metric)
+
+        selected = self._select_documents(docs_by_url, filter_url, source_type, referrer)
+        if selected is not None and not selected:
+            print(f"⊗ No documents match the filter")
+            print(f"{'='*60}\n")
+            return no_results
+
+        # with hybrid search both rankings are taken deeper than top_k, then fused
+        depth = max(2 * top_k, HYBRID_DEPTH) if HYBRID_SEARCH else top_k
+        try:
+            if selected is not None and table.get("index_type", "flat") != "flat":
+                # approximate indexes lose recall under a narrow id filter; the selected
+                # documents are searched exactly from their embeddings instead
+                distances, ids = self._search_exact(query_embeddings, selected, depth, metric)
+            else:
+                index = self._load_index()
+                params = None
+                k_to_search = min(depth, index.ntotal)
+                if selected is not None:
+                    # restrict the search to the selected documents' id ranges
+                    if len(selected) == 1:
+                        lo, hi = doc_id_range(selected[0]["doc"])
+                        sel = faiss.IDSelectorRange(lo, hi)
                     else:
-                        print(f"      ⚠ Invalid chunk index {chunk_idx} (max: {len(chunks)-1})")
-                
-                print(f"    ✓ Added {results_from_doc} result(s) from this document")
-                docs_searched += 1
-                        
-            except Exception as e:
-                print(f"    ✗ Error searching {url_folder}: {e}")
-                docs_errored += 1
-                continue
-        
-        # Summary
-        print(f"\n[SEARCH SUMMARY]")
-        print(f"  Documents found: {len(url_dirs)}")
-        print(f"  Successfully searched: {docs_searched}")
-        print(f"  Skipped: {docs_skipped}")
-        print(f"  Errors: {docs_errored}")
-        print(f"  Total results before sorting: {len(all_results)}")
-        
-        # Sort by score (lower is better for L2 distance)
-        if all_results:
-            print(f"\n[STEP 3] Sorting results by relevance...")
-            all_results.sort(key=lambda x: x.score)
-            
-            # Show score range
-            best_score = all_results[0].score
-            worst_score = all_results[-1].score
-            print(f"  Score range: {best_score:.4f} (best) to {worst_score:.4f} (worst)")
-            
-            # Apply final limit
-            if filter_url:
-                final_results = all_results[:top_k]
+                        sel = faiss.IDSelectorBatch(np.concatenate(
+                            [np.arange(*doc_id_range(e["doc"]))[:e["num_chunks"]] for e in selected]))
+                    params = faiss.SearchParameters(sel=sel)
+                    k_to_search = min(depth, sum(e["num_chunks"] for e in selected))
+                elif table.get("dead"):
+                    # dead hnsw ids are skipped below, so search deeper to keep top_k live hits
+                    live = max(index.ntotal - table["dead"], 1)
+                    k_to_search = min(index.ntotal, depth + math.ceil(depth * table["dead"] / live))
+                print(f"  Searching for top {k_to_search} of {index.ntotal} vectors in {len(table['docs'])} document(s)...")
+                distances, ids = index.search(query_embeddings, max(k_to_search, 1), params=params)
+                if metric == "ip":
+                    distances = 2 - 2 * distances   # cosine -> squared distance of unit vectors
+        except Exception as e:
+            print(f"✗ FAISS search failed: {e}")
+            raise
+
+        lexical_ranks = [None] * len(queries)
+        if HYBRID_SEARCH:
+            distances, ids, lexical_ranks = self._fuse(
+                queries, query_embeddings, distances, ids, selected, urls_by_doc, table, depth)
+
+        all_results = [
+            self._resolve_hits(table, urls_by_doc, d, i, r)[:top_k]
+            for d, i, r in zip(distances, ids, lexical_ranks)
+        ]
+        for query, results in zip(queries, all_results):
+            if results:
+                print(f"✓ {len(results)} result(s), scores {results[0].score:.4f} to {results[-1].score:.4f}: {query[:60]}")
             else:
-                final_results = all_results
-            
-            if len(final_results) < len(all_results):
-                print(f"  Limiting to top {len(final_results)} results")
-            
-            print(f"✓ Returning {len(final_results)} result(s)")
-        else:
-            print(f"\n✗ No results found")
-            final_results = []
-        
+                print(f"✗ No results found: {query[:60]}")
         print(f"{'='*60}\n")
         
-        return final_results if not filter_url else all_results[:top_k]
+        return all_results
+
+    def _search_exact(self, query_embeddings: np.ndarray, selected: List[Dict], top_k: int, metric: str = "l2"):
+        """Exact k-NN over the selected documents' embeddings, returning corpus vector ids."""
+        blocks, id_blocks = [], []
+        for entry in selected:
+            embeddings = self._load_embeddings(os.path.join(self.vectors_dir, entry["dir"]), metric)
+            if embeddings is None:
+                continue
+            lo, _ = doc_id_range(entry["doc"])
+            blocks.append(embeddings)
+            id_blocks.append(np.arange(lo, lo + len(embeddings), dtype=np.int64))
+        if not blocks:
+            return np.zeros((len(query_embeddings), 0), dtype=np.float32), np.zeros((len(query_embeddings), 0), dtype=np.int64)
+        embeddings = blocks[0] if len(blocks) == 1 else np.vstack(blocks)
+        vector_ids = np.concatenate(id_blocks)
+        k = min(top_k, len(embeddings))
+        print(f"  Searching exactly for top {k} of {len(embeddings)} vectors in {len(blocks)} document(s)...")
+        distances, positions = faiss.knn(query_embeddings, embeddings, k)
+        return distances, np.where(positions >= 0, vector_ids[positions], -1)
+
+    def _fuse(self, queries: List[str], query_embeddings: np.ndarray, distances, ids,
+              selected: Optional[List[Dict]], urls_by_doc: Dict, table: Dict, depth: int):
+        """
+        Reciprocal-rank fusion of the FAISS hits with BM25 hits over the same documents
+        (selected, or the whole corpus when None).
+        Returns per query (distances, vector ids, BM25 rank or None), in fused order;
+        BM25-only hits get their L2 distance computed from the document's embeddings,
+        so SearchResult.score stays a distance whatever ranked the hit.
+        """
+        if selected is None:
+            corpus = self._load_corpus_sparse(table)
+            if corpus.num_chunks == 0:
+                return distances, ids, [None] * len(queries)
+            indexes = [(None, corpus)]
+            print(f"  Fusing with BM25 over the corpus ({corpus.num_chunks} chunks)...")
+        else:
+            corpus = None
+            indexes = []
+            for entry in selected:
+                sparse = self._load_sparse(os.path.join(self.vectors_dir, entry["dir"]))
+                if sparse is not None:
+                    indexes.append((entry["doc"], sparse))
+            if not indexes:
+                return distances, ids, [None] * len(queries)
+            print(f"  Fusing with BM25 over {len(indexes)} document(s)...")
+
+        fused_distances, fused_ids, fused_ranks = [], [], []
+        for query, query_embedding, dense_distances, dense_ids in zip(queries, query_embeddings, distances, ids):
+            distance_by_id = {int(v): float(d) for d, v in zip(dense_distances, dense_ids) if v >= 0}
+            dense_rank = {v: r for r, v in enumerate(distance_by_id)}
+            lexical_rank = {}
+            for doc_no, chunk_idx, _ in bm25_search(query, indexes, depth):
+                vector_id = int(corpus.ids[chunk_idx]) if doc_no is None else (doc_no << CHUNK_ID_BITS) | chunk_idx
+                lexical_rank.setdefault(vector_id, len(lexical_rank))
+
+            def rrf(v):
+                return sum(1.0 / (RRF_K + 1 + ranks[v]) for ranks in (dense_rank, lexical_rank) if v in ranks)
+            order = sorted(set(dense_rank) | set(lexical_rank), key=rrf, reverse=True)
+
+            for v in order:
+                if v not in distance_by_id:
+                    distance_by_id[v] = self._distance(query_embedding, v, urls_by_doc, table)
+            fused_distances.append([distance_by_id[v] for v in order])
+            fused_ids.append(order)
+            fused_ranks.append([lexical_rank.get(v) for v in order])
+        return fused_distances, fused_ids, fused_ranks
+
+    def _distance(self, query_embedding: np.ndarray, vector_id: int, urls_by_doc: Dict, table: Dict) -> float:
+        """Squared L2 distance (as FAISS reports it) from the query to one chunk's embedding
+        (both unit length on an "ip" corpus, so 2 - 2*cos)."""
+        doc_no, chunk_idx = split_vector_id(vector_id)
+        url = urls_by_doc.get(doc_no)
+        if url is None:
+            return float("inf")
+        embeddings = self._load_embeddings(os.path.join(self.vectors_dir, table["docs"][url]["dir"]),
+                                           table.get("metric", "l2"))
+        if embeddings is None or chunk_idx >= len(embeddings):
+            return float("inf")
+        return float(np.sum((embeddings[chunk_idx] - query_embedding) ** 2))
+
+    def _load_sparse(self, url_dir: str):
+        """A document's BM25 index (sparse_index.py), cached; None for stores written before them."""
+        key = ("sparse", url_dir)
+        try:
+            signature = _file_signature(url_dir, (SPARSE_INDEX_FILE,))
+        except OSError:
+            return None
+        sparse = _cache_get(key, signature)
+        if sparse is None:
+            sparse = load_sparse_index(url_dir)
+            _cache_put(key, signature, sparse.nbytes, sparse)
+        return sparse
+
+    def _load_corpus_sparse(self, table: Dict):
+        """Every document's BM25 index merged into one (sparse_index.merge_sparse_indexes),
+        cached until the corpus is rewritten.  Documents without bm25.npz are left out."""
+        key = ("corpus_sparse", self.vectors_dir)
+        signature = self.corpus_version()
+        sparse = _cache_get(key, signature)
+        if sparse is not None:
+            return sparse
+
+        parts = []
+        for entry in sorted(table["docs"].values(), key=lambda e: e["doc"]):
+            try:
+                part = load_sparse_index(os.path.join(self.vectors_dir, entry["dir"]))
+            except (OSError, ValueError) as e:
+                print(f"  ⚠ Unreadable BM25 index in {entry['dir']}: {e}")
+                continue
+            if part is not None:
+                parts.append((doc_id_range(entry["doc"])[0], part))
+        sparse = merge_sparse_indexes(parts)
+        print(f"  ✓ BM25 corpus index: {len(parts)} document(s), {sparse.num_chunks} chunks")
+        _cache_put(key, signature, sparse.nbytes, sparse)
+        return sparse
+
+    def _resolve_hits(self, table: Dict, urls_by_doc: Dict, distances, ids, lexical_ranks=None) -> List[SearchResult]:
+        """Map one query's vector ids back to (url, chunk_index) and chunk text."""
+        results = []
+        if lexical_ranks is None:
+            lexical_ranks = [None] * len(ids)
+        for distance, vector_id, lexical_rank in zip(distances, ids, lexical_ranks):
+            # FAISS returns -1 for unfilled slots when k > ntotal
+            if vector_id < 0:
+                continue
+            doc_no, chunk_idx = split_vector_id(vector_id)
+            url = urls_by_doc.get(doc_no)
+            if url is None:
+                continue  # document removed or replaced since the index was written
+            try:
+                chunks, metadata, signatures = self._load_document(
+                    os.path.join(self.vectors_dir, table["docs"][url]["dir"]))
+            except Exception as e:
+                print(f"  ✗ Error loading document {url}: {e}")
+                continue
+            if chunk_idx >= len(chunks):
+                print(f"  ⚠ Invalid chunk index {chunk_idx} (max: {len(chunks)-1}) for {url}")
+                continue
+            results.append(SearchResult(
+                chunk_text=chunks[chunk_idx],
+                score=float(distance),
+                chunk_index=chunk_idx,
+                url=metadata.get("url", url),
+                metadata=metadata,
+                signature=signatures[chunk_idx] if signatures is not None else None,
+                lexical_rank=lexical_rank
+            ))
+            print(f"  Result {len(results)}: {url} chunk {chunk_idx}, score {distance:.4f}")
+        return results
+
+    def corpus_version(self) -> Tuple:
+        """Changes whenever the user's corpus is rewritten (for callers that memoize results)."""
+        try:
+            return _file_signature(self.vectors_dir, (CORPUS_INDEX_FILE, CORPUS_TABLE_FILE))
+        except OSError:
+            return ()
     
     def search_specific_document(self, url: str, query: str, top_k: int = 5) -> List[SearchResult]:
         """
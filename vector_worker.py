@@ -6,11 +6,26 @@ import logging
 from datetime import datetime
 from typing import Dict, Tuple
 from celery import Celery
-import faiss
-from bs4 import BeautifulSoup
+import re
+import unicodedata
+from html import escape
+import numpy as np
+import lxml.html
+from lxml import etree
 from requests.auth import HTTPBasicAuth
-from redis_state import get_url_state, update_url_state
+from redis_state import get_url_state, track_task, update_url_state
+from host_limits import host_slot
 from vector_embedder import get_embedder
+from embedding_cache import encode_chunks
+from chunk_store import CHUNKS_FILE, LEGACY_CHUNKS_FILE, ChunkStore, read_chunk_ids, write_chunk_ids, write_chunks
+from text_chunker import chunk_document
+from sparse_index import build_sparse_index, save_sparse_index
+from chunk_signatures import load_signatures, minhash_signatures, save_signatures
+from confluence_pages import cached_content_id, forget_content_id, page_versions, resolve_content_id
+from vector_index import (
+    LEGACY_INDEX_FILE, VECTOR_INDEX_TYPE, VECTOR_STORAGE, append_document, load_doc_embeddings, safe_dir_name,
+    save_doc_embeddings, upsert_document,
+)
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -101,7 +116,7 @@ def update_embedding_timestamp(user_id, url):
 
 def get_metadata_path(user_id, url):
     """Get metadata file path for a user's URL (stored alongside vectors)."""
-    safe = url.replace("/", "_").replace(":", "_")
+    safe = safe_dir_name(url)
     vectors_dir = get_vectors_dir(user_id)
     vector_dir = os.path.join(vectors_dir, safe)
     os.makedirs(vector_dir, exist_ok=True)
@@ -117,6 +132,11 @@ def load_metadata(user_id, url):
         return json.load(f)
 
 
+def has_vector_store(user_id, url):
+    """True if the URL has been vectorized and its store is still on disk."""
+    return os.path.exists(os.path.join(get_vectors_dir(user_id), safe_dir_name(url), "metadata.json"))
+
+
 def save_metadata(user_id, url, data):
     """Save metadata for a user's URL."""
     path = get_metadata_path(user_id, url)
@@ -155,16 +175,30 @@ def load_user_env(user_id: str) -> Dict[str, str]:
     return env_vars
 
 
+def get_index_setting(user_id: str) -> str:
+    """VECTOR_INDEX_TYPE from the user's env file, else the worker's (see vector_index.py)."""
+    return load_user_env(user_id).get("VECTOR_INDEX_TYPE", VECTOR_INDEX_TYPE).lower()
+
+
+def get_storage_setting(user_id: str) -> str:
+    """VECTOR_STORAGE (f32, f16 or int8) from the user's env file, else the worker's."""
+    return load_user_env(user_id).get("VECTOR_STORAGE", VECTOR_STORAGE).lower()
+
+
 def is_confluence_url(url: str) -> bool:
     """Check if URL is an Atlassian Confluence wiki."""
     return 'atlassian.net/wiki' in url or '/confluence/' in url
 
 
-def fetch_confluence_page(url: str, user_env: Dict[str, str]) -> Tuple[str, str, str]:
+def fetch_confluence_page(url: str, user_env: Dict[str, str], known_etag: str = None) -> Tuple[str, str, str]:
     """
     Fetch Confluence page using v1 to resolve correct content ID,
     then call v2 to retrieve storage format content.
     Includes debug logging of page ID resolution.
+
+    known_etag is the "confluence-v<version>" stored by the previous download.  If
+    given, the page version is asked for first (no body); content is None when it
+    hasn't moved.
     """
     confluence_url = user_env.get('CONFLUENCE_URL')
     api_token = user_env.get('CONFLUENCE_API_TOKEN')
@@ -174,66 +208,34 @@ def fetch_confluence_page(url: str, user_env: Dict[str, str]) -> Tuple[str, str,
         logger.warning("Missing Confluence credentials, falling back to web scraping")
         return fetch_regular_page(url)
 
-    import re
-    # Extract SPACE KEY, LEGACY PAGE ID, TITLE from URL
-    m = re.search(r'/spaces/([^/]+)/pages/(\d+)/(.*)$', url)
-    if not m:
-        logger.warning(f"Could not parse Confluence URL format: {url}")
-        return fetch_regular_page(url)
-
-    space_key = m.group(1)
-    legacy_page_id = m.group(2)
-    title = m.group(3).replace("+", " ")
-
-    logger.info(f"[DEBUG] Extracted from URL:")
-    logger.info(f"        Space Key: {space_key}")
-    logger.info(f"        Legacy Page ID: {legacy_page_id}")
-    logger.info(f"        Title: {title}")
-
     auth = HTTPBasicAuth(email, api_token)
 
-    # --------------------------------------------------------------
-    # FIX: Correct Confluence Cloud v1 endpoint uses /wiki/rest/api/
-    # --------------------------------------------------------------
-    search_url = (
-        f"{confluence_url}/wiki/rest/api/content"
-        f"?title={requests.utils.quote(title)}"
-        f"&spaceKey={requests.utils.quote(space_key)}"
-    )
-
-    logger.info(f"[DEBUG] v1 Search URL: {search_url}")
-
-    resp = requests.get(search_url, auth=auth, timeout=30)
-
-    resolved_id = None
-    v1_ids = []
-
-    if resp.ok:
-        items = resp.json().get("results", [])
-        for entry in items:
-            v1_ids.append(entry.get("id"))
-
-        logger.info(f"[DEBUG] v1 Search returned IDs: {v1_ids}")
-
-        if len(v1_ids) > 0:
-            resolved_id = v1_ids[0]
-
+    # content id from the id cache, else a v1 title search (see confluence_pages.py)
+    resolved_id = resolve_content_id(url, confluence_url, auth)
     if not resolved_id:
-        logger.warning(
-            f"[DEBUG] No v1 search match found for title '{title}' "
-            f"in space '{space_key}', falling back to legacy ID {legacy_page_id}"
-        )
-        resolved_id = legacy_page_id
+        logger.warning(f"Could not parse Confluence URL format: {url}")
+        return fetch_regular_page(url)
 
     logger.info(f"[DEBUG] Final resolved content ID: {resolved_id}")
 
+    headers = {"Accept": "application/json"}
+
+    if known_etag:
+        # version-only probe: the page resource without its body is a few hundred bytes
+        probe = requests.get(f"{confluence_url}/wiki/api/v2/pages/{resolved_id}",
+                             headers=headers, auth=auth, timeout=30)
+        if probe.ok:
+            version = probe.json().get("version", {})
+            if f"confluence-v{version.get('number', '')}" == known_etag:
+                logger.info(f"[DEBUG] Version unchanged ({known_etag}), not downloading body")
+                return None, known_etag, version.get("createdAt", "")
+
     # --------------------------------------------------------------
     # Call Confluence Cloud API v2 with resolved ID
     # --------------------------------------------------------------
     v2_url = f"{confluence_url}/wiki/api/v2/pages/{resolved_id}?body-format=storage"
     logger.info(f"[DEBUG] Calling v2 URL: {v2_url}")
 
-    headers = {"Accept": "application/json"}
     response = requests.get(v2_url, headers=headers, auth=auth, timeout=30)
 
     if not response.ok:
@@ -241,6 +243,8 @@ def fetch_confluence_page(url: str, user_env: Dict[str, str]) -> Tuple[str, str,
             f"[DEBUG] API v2 failed for content ID {resolved_id}. "
             "Falling back to authenticated web scraping."
         )
+        if response.status_code == 404:
+            forget_content_id(url)  # resolve again next time
         return fetch_confluence_web_authenticated(url, email, api_token)
 
     data = response.json()
@@ -390,12 +394,17 @@ def fetch_confluence_web_authenticated(url: str, email: str, api_token: str) ->
         raise
 
 
-@app.task(queue="url_processing_queue")
-def embed_local_file(user_id, filepath):
+@app.task(queue="embed_queue")
+def embed_local_file(user_id, filepath, appended_from=None):
     """
     Embed a local text file directly into a FAISS index, bypassing HTTP fetch.
     Used for Teams chat partition files and any other locally-written content.
     The filepath is used as the vector store identifier (same role as URL in process_url).
+
+    appended_from is the file's size before its latest append, for files that are
+    only ever appended to (teams_chat records it per partition).  If the store
+    already covers the file up to the size recorded in its metadata, only the bytes
+    after that are chunked and embedded (append_vector_store).
     """
     logger.info(f"[{user_id}] embed_local_file: {filepath}")
     update_url_state(user_id, filepath, status="VECTORIZING")
@@ -404,17 +413,25 @@ def embed_local_file(user_id, filepath):
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"Local file not found: {filepath}")
 
-        with open(filepath, "r", encoding="utf-8") as f:
-            text = f.read()
+        if appended_from is not None and has_vector_store(user_id, filepath):
+            result = _append_local_file(user_id, filepath)
+            if result:
+                return result
+
+        with open(filepath, "rb") as f:
+            raw = f.read()
+        text = raw.decode("utf-8")
 
         checksum = checksum_sha256(text)
         prev = get_url_state(user_id, filepath)
         if prev and prev.get("last_checksum") == checksum:
             logger.info(f"[{user_id}] File unchanged, skipping: {filepath}")
+            if has_vector_store(user_id, filepath):
+                save_metadata(user_id, filepath, {**load_metadata(user_id, filepath), "file_size": len(raw)})
             update_url_state(user_id, filepath, status="UNCHANGED")
             return {"status": "unchanged", "filepath": filepath}
 
-        num_chunks = build_vector_store(user_id, filepath, text)
+        num_chunks = build_vector_store(user_id, filepath, text, "local_file", checksum)
 
         metadata = {
             "url": filepath,
@@ -424,6 +441,7 @@ def embed_local_file(user_id, filepath):
             "embedder": embedder.get_name(),
             "embedding_dimension": embedder.get_dimension(),
             "source_type": "local_file",
+            "file_size": len(raw),
         }
         save_metadata(user_id, filepath, metadata)
 
@@ -442,10 +460,46 @@ def embed_local_file(user_id, filepath):
         raise
 
 
-def fetch_regular_page(url: str) -> Tuple[str, str, str]:
+def _append_local_file(user_id, filepath):
+    """Embed only what was appended to filepath since its store was built; returns
+    the task result, or None if the whole file has to be embedded instead."""
+    metadata = load_metadata(user_id, filepath)
+    covered = metadata.get("file_size")
+    size = os.path.getsize(filepath)
+    if covered is None or covered > size or metadata.get("embedder") != embedder.get_name():
+        return None
+    if covered == size:
+        logger.info(f"[{user_id}] Nothing appended, skipping: {filepath}")
+        update_url_state(user_id, filepath, status="UNCHANGED")
+        return {"status": "unchanged", "filepath": filepath}
+
+    with open(filepath, "rb") as f:
+        f.seek(covered)
+        appended = f.read(size - covered)
+    num_chunks = append_vector_store(user_id, filepath, appended.decode("utf-8"), "local_file")
+    if num_chunks is None:
+        return None
+
+    metadata.update({
+        "checksum": None,   # not re-read whole; the next full embed recomputes it
+        "num_chunks": num_chunks,
+        "last_processed": datetime.now().isoformat(),
+        "file_size": covered + len(appended),
+    })
+    save_metadata(user_id, filepath, metadata)
+    update_url_state(user_id, filepath, status="DONE", last_checksum=None, num_chunks=num_chunks)
+    logger.info(f"[{user_id}] embed_local_file appended {len(appended)} bytes: {num_chunks} chunks in {filepath}")
+    return {"status": "appended", "filepath": filepath, "num_chunks": num_chunks, "new_bytes": len(appended)}
+
+
+def fetch_regular_page(url: str, etag: str = None, last_modified: str = None) -> Tuple[str, str, str]:
     """
     Fetch regular web page with browser headers.
     
+    If the etag / last_modified of the previous download are given, the request is
+    conditional (If-None-Match / If-Modified-Since) and content is None when the
+    server answers 304 Not Modified.
+    
     Returns:
         Tuple of (content, etag, last_modified)
     """
@@ -457,8 +511,14 @@ def fetch_regular_page(url: str) -> Tuple[str, str, str]:
         'Connection': 'keep-alive',
         'Upgrade-Insecure-Requests': '1'
     }
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
     
     response = requests.get(url, timeout=10, headers=headers)
+    if response.status_code == 304:
+        return None, etag, last_modified
     response.raise_for_status()
     
     content = response.text
@@ -473,99 +533,144 @@ def content_hash(text: str) -> str:
     return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
 
-def chunk_text(text, chunk_size=500):
-    """Split text into chunks of approximately chunk_size words."""
-    words = text.split()
-    chunks = []
-    for i in range(0, len(words), chunk_size):
-        chunks.append(" ".join(words[i:i + chunk_size]))
-    return chunks
+_BLOCK_TAGS = (
+    "p", "div", "li", "ul", "ol", "table", "tr", "br", "blockquote", "pre", "section",
+    "article", "header", "footer", "dt", "dd", "title",
+    "ac:plain-text-body", "ac:parameter",       # Confluence storage format macros
+)
+_HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+_CDATA_RE = re.compile(r"<!\[CDATA\[(.*?)\]\]>", re.S)
 
 
 def extract_text_from_html(html_content):
-    """Extract clean text from HTML, removing scripts, styles, and tags."""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Remove script and style elements
-    for script in soup(["script", "style", "noscript"]):
-        script.decompose()
-    
-    # Get text
-    text = soup.get_text(separator=' ', strip=True)
-    
-    # Clean up whitespace
-    lines = (line.strip() for line in text.splitlines())
-    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-    text = ' '.join(chunk for chunk in chunks if chunk)
-    
-    return text
-
-
-def build_vector_store(user_id, url, text):
-    """Build FAISS vector store for a user's URL content."""
-    safe = url.replace("/", "_").replace(":", "_")
+    """
+    Visible text of an HTML page (or Confluence storage XHTML) from a single lxml parse,
+    one block per line for text_chunker: headings as "## Title", table rows as
+    "cell | cell", everything else one line per paragraph/list item.  script, style,
+    noscript and comments are dropped, Unicode is NFC-normalized and whitespace within
+    a line collapsed.  The same text is checksummed (checksum_text) and chunked, so a
+    page is parsed once per process_url.
+
+    Confluence code macros keep their text in <ac:plain-text-body><![CDATA[...]]>;
+    the HTML parser drops CDATA, so it is turned into escaped text first.
+    """
+    if not html_content or not html_content.strip():
+        return ""
+    if isinstance(html_content, str) and "<![CDATA[" in html_content:
+        html_content = _CDATA_RE.sub(lambda m: escape(m.group(1), quote=False), html_content)
+    try:
+        try:
+            root = lxml.html.fromstring(html_content)
+        except ValueError:
+            # str with an encoding declaration; lxml only accepts those as bytes
+            root = lxml.html.fromstring(html_content.encode("utf-8"))
+    except etree.ParserError:
+        return ""   # nothing but comments/whitespace
+    if root.tag in ("script", "style", "noscript"):
+        return ""
+    for el in [e for e in root.iter("script", "style", "noscript", etree.Comment) if e is not root]:
+        el.drop_tree()
+
+    # mark block boundaries in the tree so itertext() yields them as line breaks
+    for el in root.iter(*_BLOCK_TAGS, *_HEADING_TAGS, "td", "th"):
+        if el.tag in ("td", "th"):
+            el.tail = "\t" + (el.tail or "")
+        elif el.tag in _HEADING_TAGS:
+            el.text = "\n" + "#" * int(el.tag[1]) + " " + (el.text or "")
+            el.tail = "\n" + (el.tail or "")
+        else:
+            el.text = "\n" + (el.text or "")
+            el.tail = "\n" + (el.tail or "")
+    text = unicodedata.normalize("NFC", "".join(root.itertext()))
+
+    lines = []
+    for line in text.split("\n"):
+        cells = [re.sub(r"\s+", " ", cell).strip() for cell in line.split("\t")]
+        line = " | ".join(cell for cell in cells if cell)
+        if line and line.strip("# "):
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def build_vector_store(user_id, url, text, source_type=None, checksum=None):
+    """Chunk and embed a user's URL content, then replace its vectors (and manifest
+    entry) in the user's consolidated index (see vector_index.py)."""
+    safe = safe_dir_name(url)
     vectors_dir = get_vectors_dir(user_id)
     out_dir = os.path.join(vectors_dir, safe)
     os.makedirs(out_dir, exist_ok=True)
 
-    chunks = chunk_text(text)
-    embeddings = embedder.encode(chunks)
-
-    dim = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dim)
-    index.add(embeddings)
-
-    tmp_path = os.path.join(out_dir, "index.faiss.tmp")
-    final_path = os.path.join(out_dir, "index.faiss")
-
-    faiss.write_index(index, tmp_path)
-    os.replace(tmp_path, final_path)
+    # structure-aware, token-budgeted chunks with stable ids (see text_chunker.py)
+    chunked = chunk_document(text)
+    chunk_ids = [chunk_id for chunk_id, _ in chunked]
+    chunks = [chunk for _, chunk in chunked]
+    # only chunks whose text changed since the last run are actually encoded
+    embeddings = encode_chunks(embedder, chunks)
 
     # Save chunks for retrieval
-    chunks_path = os.path.join(out_dir, "chunks.json")
-    tmp_chunks = chunks_path + ".tmp"
-    with open(tmp_chunks, "w") as f:
-        json.dump(chunks, f, indent=2)
-    os.replace(tmp_chunks, chunks_path)
+    write_chunks(os.path.join(out_dir, CHUNKS_FILE), chunks)
+    write_chunk_ids(out_dir, chunk_ids)
+    # MinHash of each chunk, for near-duplicate removal at query time
+    save_signatures(out_dir, minhash_signatures(chunks))
+    # BM25 inverted index, fused with the FAISS ranking at query time
+    save_sparse_index(out_dir, build_sparse_index(chunks))
+
+    save_doc_embeddings(out_dir, embeddings)
+    info = {"source_type": source_type, "version": checksum, "updated": datetime.now().isoformat()}
+    upsert_document(vectors_dir, url, embeddings, embedder.get_name(), get_index_setting(user_id), info,
+                    get_storage_setting(user_id))
+
+    # files from older store layouts (per-document index, chunks.json), now superseded
+    for legacy in (LEGACY_INDEX_FILE, LEGACY_CHUNKS_FILE):
+        legacy_path = os.path.join(out_dir, legacy)
+        if os.path.exists(legacy_path):
+            os.remove(legacy_path)
 
     return len(chunks)
 
 
-
-import re
-import unicodedata
-from bs4 import BeautifulSoup
-
-def normalize_for_checksum(content):
-    """
-    Normalize HTML content for stable checksums.
-
-    Steps:
-      1. Parse HTML with BeautifulSoup
-      2. Remove script/style/noscript tags
-      3. Extract text
-      4. Unicode NFC normalization
-      5. Collapse whitespace
-    """
-
-    # 1. Parse HTML
-    soup = BeautifulSoup(content, "html.parser")
-
-    # 2. Remove dynamic content tags
-    for tag in soup(["script", "style", "noscript"]):
-        tag.decompose()
-
-    # 3. Extract visible text
-    text = soup.get_text(separator=" ")
-
-    # 4. Unicode normalization
-    text = unicodedata.normalize("NFC", text)
-
-    # 5. Collapse whitespace
-    text = re.sub(r"\s+", " ", text).strip()
-
-    return text
-
+def append_vector_store(user_id, url, text, source_type=None):
+    """Chunk and embed text appended to a document that is already vectorized, adding
+    its chunks after the existing ones; nothing already stored is re-embedded.
+    Returns the document's new chunk count, or None when the store can't be extended
+    (missing or from an older layout), in which case the caller rebuilds it whole."""
+    out_dir = os.path.join(get_vectors_dir(user_id), safe_dir_name(url))
+    chunk_ids = read_chunk_ids(out_dir)
+    signatures = load_signatures(out_dir)
+    embeddings = load_doc_embeddings(out_dir)
+    if chunk_ids is None or signatures is None or embeddings is None \
+            or not os.path.exists(os.path.join(out_dir, CHUNKS_FILE)):
+        return None
+    chunks = list(ChunkStore(os.path.join(out_dir, CHUNKS_FILE)))
+    if not len(chunks) == len(chunk_ids) == len(signatures) == len(embeddings):
+        return None
+
+    # the appended text is chunked on its own: each Teams sync run starts with a
+    # heading, and sections are chunked independently, so these are the chunks a
+    # whole-file rebuild would produce for it
+    seen = set(chunk_ids)
+    new_ids, new_chunks = [], []
+    for chunk_id, chunk in chunk_document(text):
+        unique, n = chunk_id, 1
+        while unique in seen:
+            n += 1
+            unique = f"{chunk_id}-{n}"
+        seen.add(unique)
+        new_ids.append(unique)
+        new_chunks.append(chunk)
+    new_embeddings = encode_chunks(embedder, new_chunks)
+
+    chunks += new_chunks
+    write_chunks(os.path.join(out_dir, CHUNKS_FILE), chunks)
+    write_chunk_ids(out_dir, chunk_ids + new_ids)
+    save_signatures(out_dir, np.concatenate([signatures, minhash_signatures(new_chunks)]))
+    save_sparse_index(out_dir, build_sparse_index(chunks))
+    save_doc_embeddings(out_dir, np.vstack([embeddings, new_embeddings]))
+    info = {"source_type": source_type, "version": None, "updated": datetime.now().isoformat()}
+    if not append_document(get_vectors_dir(user_id), url, new_embeddings, embedder.get_name(), info):
+        return None   # files are rewritten whole by the caller's rebuild
+    logger.info(f"[{user_id}] Appended {len(new_chunks)} chunk(s) to {url} ({len(chunks)} total)")
+    return len(chunks)
 
 
 import hashlib
@@ -601,11 +706,17 @@ def normalize_for_checksum_old(content):
     return content
 
 
-def checksum_sha256(content):
-    normalized = normalize_for_checksum(content)
+def checksum_text(text):
+    """Checksum of text already extracted by extract_text_from_html (line breaks and
+    runs of whitespace don't count)."""
+    normalized = re.sub(r"\s+", " ", text).strip()
     return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
 
 
+def checksum_sha256(content):
+    return checksum_text(extract_text_from_html(content))
+
+
 
 #from celery import shared_task
 from refresh import resync
@@ -662,7 +773,9 @@ def resync_task_worker(self, file_url, userlogin, delegated_auth):
 
 @app.task(bind=True, queue="url_processing_queue")
 def process_url(self, user_id, url, force=False):
-    """Process a URL for a specific user: fetch, check changes, and vectorize."""
+    """Process a URL for a specific user: fetch, check changes, and queue the text
+    for embedding (embed_page).  Fetches are I/O-bound and run many at a time
+    (threads pool), within per-host limits."""
     logger.info(f"[{user_id}] Processing URL: {url}")
     started_at = datetime.now().isoformat()
     self.update_state(state="STARTED", meta={"started_at": started_at})
@@ -682,12 +795,26 @@ def process_url(self, user_id, url, force=False):
             and confluence_base in url
         )
 
-        if is_confluence:
-            logger.info(f"[{user_id}] Detected Confluence URL, using API")
-            content, etag, last_modified = fetch_confluence_page(url, user_env)
-        else:
-            logger.info(f"[{user_id}] Regular web page")
-            content, etag, last_modified = fetch_regular_page(url)
+        # Freshness probe: with a previous successful download still on disk, ask the
+        # server whether the page changed before downloading it again
+        prev = get_url_state(user_id, url)
+        can_probe = not force and prev and prev.get("last_checksum") and has_vector_store(user_id, url)
+        prev_etag = prev.get("last_etag") if can_probe else None
+        prev_modified = prev.get("last_modified") if can_probe else None
+
+        # many fetches run at once; each host gets a capped share (see host_limits.py)
+        with host_slot(url):
+            if is_confluence:
+                logger.info(f"[{user_id}] Detected Confluence URL, using API")
+                content, etag, last_modified = fetch_confluence_page(url, user_env, prev_etag)
+            else:
+                logger.info(f"[{user_id}] Regular web page")
+                content, etag, last_modified = fetch_regular_page(url, prev_etag, prev_modified)
+
+        if content is None:
+            logger.info(f"[{user_id}] Not modified since last download, skipping: {url}")
+            update_url_state(user_id, url, status="UNCHANGED")
+            return {"started_at": started_at, "completed_at": datetime.now().isoformat(), "status": "unchanged"}
         
         '''
         if is_confluence_url(url) and user_env.get('CONFLUENCE_URL') in url: 
@@ -697,13 +824,11 @@ def process_url(self, user_id, url, force=False):
             logger.info(f"[{user_id}] Regular web page")
             content, etag, last_modified = fetch_regular_page(url)
         '''
-        # Extract clean text from HTML
+        # Extract clean text from HTML (one parse, used for both checksum and chunking)
         clean_text = extract_text_from_html(content)
         logger.info(f"[{user_id}] Extracted {len(clean_text)} characters of text")
 
-        #checksum = hashlib.sha256(content.encode("utf-8")).hexdigest()
-        checksum = checksum_sha256(content)
-        prev = get_url_state(user_id, url)
+        checksum = checksum_text(clean_text)
 
         logger.info(f"LATEST [{user_id}] ETag: {etag}, Last-Modified: {last_modified}, Checksum: {checksum}")
 
@@ -721,10 +846,35 @@ def process_url(self, user_id, url, force=False):
         else:
             logger.info(f"[{user_id}] No previous state found, proceeding with vectorization")
         
-        # Vectorize because content changed
-        logger.info(f"[{user_id}] Vectorizing content: {url}")
-        update_url_state(user_id, url, status="VECTORIZING")
-        num_chunks = build_vector_store(user_id, url, clean_text)
+        # Vectorize because content changed: hand the text to the embed stage, so this
+        # (I/O-bound) worker goes on to the next fetch while the embed worker encodes
+        source_type = "confluence" if is_confluence else "web"
+        task = embed_page.apply_async(
+            (user_id, url, clean_text, source_type, checksum, etag, last_modified), compression="zlib")
+        track_task(user_id, task.id)
+        update_url_state(user_id, url, status="EMBED_QUEUED")
+        logger.info(f"[{user_id}] Queued for embedding ({task.id}): {url}")
+        return {"started_at": started_at, "completed_at": datetime.now().isoformat(), "status": "fetched",
+                "embed_task_id": task.id}
+
+    except Exception as e:
+        logger.error(f"[{user_id}] Error processing {url}: {str(e)}")
+        update_url_state(user_id, url, status="ERROR", error=str(e))
+        raise
+
+
+@app.task(bind=True, queue="embed_queue")
+def embed_page(self, user_id, url, clean_text, source_type, checksum, etag=None, last_modified=None):
+    """Embed stage of process_url: chunk and embed a fetched page's text, then record
+    the download (metadata.json, docs.json timestamp, url state).  Runs on its own
+    CPU-bound queue, one task at a time per worker."""
+    started_at = datetime.now().isoformat()
+    self.update_state(state="STARTED", meta={"started_at": started_at})
+    logger.info(f"[{user_id}] Vectorizing content: {url}")
+    update_url_state(user_id, url, status="VECTORIZING")
+
+    try:
+        num_chunks = build_vector_store(user_id, url, clean_text, source_type, checksum)
 
         # Save metadata to file
         metadata = {
@@ -736,7 +886,7 @@ def process_url(self, user_id, url, force=False):
             "last_processed": datetime.now().isoformat(),
             "embedder": embedder.get_name(),
             "embedding_dimension": embedder.get_dimension(),
-            "source_type": "confluence" if is_confluence else "web"
+            "source_type": source_type
         }
         save_metadata(user_id, url, metadata)
 
@@ -758,4 +908,59 @@ def process_url(self, user_id, url, force=False):
     except Exception as e:
         logger.error(f"[{user_id}] Error processing {url}: {str(e)}")
         update_url_state(user_id, url, status="ERROR", error=str(e))
-        raise
\ No newline at end of file
+        raise
+
+
+def queue_changed_urls(user_id, urls):
+    """
+    Queue process_url for each URL, except Confluence pages whose version hasn't moved
+    since they were last vectorized.  Versions of all those pages are fetched with a
+    few bulk CQL requests (confluence_pages.page_versions) instead of one task each.
+    Returns the number of URLs queued.
+    """
+    user_env = load_user_env(user_id)
+    confluence_base = user_env.get("CONFLUENCE_URL")
+    api_token = user_env.get("CONFLUENCE_API_TOKEN")
+    email = user_env.get("CONFLUENCE_EMAIL")
+
+    known = {}      # url -> (content id, etag stored by the last download)
+    versions = {}
+    if confluence_base and api_token and email:
+        for url in urls:
+            if not (is_confluence_url(url) and confluence_base in url):
+                continue
+            prev = get_url_state(user_id, url)
+            if not prev or not prev.get("last_checksum") or not has_vector_store(user_id, url):
+                continue
+            content_id = cached_content_id(url)    # never-resolved pages go through process_url
+            if content_id:
+                known[url] = (content_id, prev.get("last_etag"))
+        if known:
+            versions = page_versions(confluence_base, HTTPBasicAuth(email, api_token),
+                                     [content_id for content_id, _ in known.values()])
+
+    queued = 0
+    for url in urls:
+        if url in known:
+            content_id, etag = known[url]
+            if content_id in versions and f"confluence-v{versions[content_id]}" == etag:
+                logger.info(f"[{user_id}] Confluence version unchanged, not queued: {url}")
+                update_url_state(user_id, url, status="UNCHANGED")
+                continue
+        process_url.delay(user_id, url)
+        queued += 1
+    logger.info(f"[{user_id}] Queued {queued} of {len(urls)} URL(s), {len(known)} checked in bulk")
+    return queued
+
+
+@app.task(queue="embed_queue")
+def compact_vector_stores():
+    """Periodic garbage collection of every user's vector store (see vector_gc.py),
+    and of chunk embeddings not reused for EMBED_CACHE_DAYS (embedding_cache.py).
+    Runs on the embed queue, so it never overlaps a build_vector_store."""
+    from vector_gc import compact_all_stores
+    from embedding_cache import prune_embedding_cache
+    reports = compact_all_stores(os.path.abspath(CONFIG_DIR))
+    pruned = prune_embedding_cache()
+    return {"users": len(reports), "bytes_reclaimed": sum(rep["bytes_reclaimed"] for rep in reports),
+            "pruned_embeddings": pruned}
@@ -13,6 +13,9 @@ import torch
 import httpx
 from rank_bm25 import BM25Okapi
 
+from vector_index import choose_index_type, make_index, INDEX_TYPES
+from text_chunker import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, chunk_document
+
 # ---------------------------
 # Environment / device setup
 # ---------------------------
@@ -103,8 +106,23 @@ def normalize_name(text: str) -> str:
     base = re.sub(r"[^a-z0-9]+", "_", base)
     return base.strip("_")
 
-def chunk_text(text: str, max_chars: int) -> List[str]:
-    return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+def print_index_report(index, xb: np.ndarray, k: int = 10, num_queries: int = 100):
+    """Recall@k and per-query latency of an approximate index vs exact search."""
+    import time
+    rng = np.random.default_rng(0)
+    queries = xb[rng.choice(len(xb), size=min(num_queries, len(xb)), replace=False)]
+    k = min(k, len(xb))
+
+    start = time.perf_counter()
+    _, truth = faiss.knn(queries, xb, k)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    start = time.perf_counter()
+    found = [index.search(q.reshape(1, -1), k)[1][0] for q in queries]
+    approx_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    recall = np.mean([len(set(t) & set(f)) / k for t, f in zip(truth, found)])
+    print(f"📊 recall@{k}={recall:.3f}  latency={approx_ms:.3f} ms/query  (exact {exact_ms:.3f} ms/query)")
 
 # ---------------------------
 # Build vector store
@@ -114,7 +132,10 @@ def build_vector_store(
     filepath: str,
     embedder: Embedder,
     out_root: Path,
-    chunk_size: int
+    chunk_size: int,
+    index_type: str = "flat",
+    report: bool = False,
+    overlap: int = CHUNK_OVERLAP_TOKENS
 ):
     try:
         print("=" * 80)
@@ -141,14 +162,15 @@ def build_vector_store(
 
         # ---- Chunk ----
         print("✂️  Chunking text...")
-        chunks_text = chunk_text(text, chunk_size)
+        chunks_text = chunk_document(text, chunk_size, overlap)
         print(f"✅ Created {len(chunks_text)} chunks")
 
         # ---- Build chunk objects ----
         chunks = []
-        for i, chunk in enumerate(chunks_text):
+        for i, (chunk_id, chunk) in enumerate(chunks_text):
             chunks.append({
                 "id": i,
+                "chunk_id": chunk_id,
                 "text": chunk,
                 "source_file": filepath,
             })
@@ -178,13 +200,17 @@ def build_vector_store(
         print(f"✅ Embeddings complete (dimension={dim})")
 
         # ---- FAISS ----
-        print("📐 Building FAISS index...")
-        index = faiss.IndexFlatL2(dim)
-        index.add(xb)
+        resolved_type = choose_index_type(index_type, len(xb))
+        print(f"📐 Building FAISS index ({resolved_type})...")
+        index = make_index(resolved_type, dim, xb if resolved_type == "ivfpq" else None)
+        index.add_with_ids(xb, np.arange(len(xb), dtype=np.int64))
 
         faiss.write_index(index, str(out_dir / "index.faiss"))
         print("✅ FAISS index saved")
 
+        if report and resolved_type != "flat":
+            print_index_report(index, xb)
+
         # ---- Metadata ----
         print("📝 Writing metadata.json...")
         metadata = {
@@ -194,6 +220,8 @@ def build_vector_store(
             "num_chunks": len(chunks),
             "dimension": dim,
             "chunk_size": chunk_size,
+            "chunk_overlap": overlap,
+            "index_type": resolved_type,
             "has_bm25": True,
         }
 
@@ -221,8 +249,15 @@ def main():
     parser.add_argument("--provider", required=True, choices=["openai", "hf"])
     parser.add_argument("--model", default=None)
     parser.add_argument("--out", default="vectorstore")
-    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_MAX_TOKENS,
+                        help="Maximum tokens per chunk (chunks follow headings, paragraphs and table rows)")
+    parser.add_argument("--overlap", type=int, default=CHUNK_OVERLAP_TOKENS,
+                        help="Tokens shared by consecutive chunks of a section")
     parser.add_argument("--api-key")
+    parser.add_argument("--index-type", default="flat", choices=INDEX_TYPES,
+                        help="FAISS index: flat (exact), hnsw, ivfpq (trained once there are enough chunks) or auto")
+    parser.add_argument("--report", action="store_true",
+                        help="Print recall/latency of an approximate index against exact search")
 
     args = parser.parse_args()
 
@@ -243,6 +278,9 @@ def main():
             embedder=embedder,
             out_root=out_root,
             chunk_size=args.chunk_size,
+            index_type=args.index_type,
+            report=args.report,
+            overlap=args.overlap,
         )
 
     print("✅ All files processed successfully")